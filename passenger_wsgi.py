@@ -4,8 +4,9 @@ import os
 # Adicionar o diretório do projeto ao path
 sys.path.insert(0, os.path.dirname(__file__))
 
-# Importar a aplicação Flask
-from src.main import app as application
+# Criar a aplicação Flask (o schema é criado antes, com `flask init-db`)
+from src.main import create_app
+application = create_app()
 
 if __name__ == "__main__":
     application.run()
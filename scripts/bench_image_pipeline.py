@@ -0,0 +1,154 @@
+"""Compara o pipeline de upload de imagens antigo com o atual
+
+Mede o tempo médio por upload e o pico de memória (RSS) de cada pipeline,
+cada um num subprocesso novo para que um não contamine a medição do outro.
+
+Uso (a partir da raiz do projeto):
+    python scripts/bench_image_pipeline.py [--uploads 20] [--width 2048] [--height 1536] [--with-variants]
+
+Sem --with-variants só o JPEG e o thumbnail são gravados, isolando o custo
+de decodificação/redimensionamento do custo dos encoders WebP/AVIF.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def make_jpeg(width, height, seed):
+    """JPEG de teste com ruído, para não comprimir de forma irreal"""
+    from PIL import Image, ImageDraw
+    rng = random.Random(seed)
+    img = Image.effect_noise((width, height), 40).convert('RGB')
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse((x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                     fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    buffer = io.BytesIO()
+    img.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+def legacy_pipeline(images, data):
+    """Pipeline anterior: verify() completo, decodifica, grava e reabre o JPEG para o thumbnail"""
+    from PIL import Image
+
+    def validate(file):
+        images.check_upload(file)
+        try:
+            with Image.open(file) as img:
+                if img.width > images.MAX_IMAGE_DIMENSION or img.height > images.MAX_IMAGE_DIMENSION:
+                    raise ValueError('Imagem muito grande')
+                img.verify()
+        except Exception:
+            raise ValueError('Arquivo de imagem inválido ou corrompido')
+        file.seek(0)
+
+    def process(file):
+        filename = f"{images.file_hash(file)}.jpg"
+        filepath = os.path.join(images.UPLOAD_FOLDER, filename)
+        with Image.open(file) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            if img.width > 1200 or img.height > 800:
+                img.thumbnail((1200, 800), Image.Resampling.LANCZOS)
+            images.save_image(img, filename, 'JPEG', quality=85, optimize=True)
+            images.save_variants(img, filename)
+        thumbnail_filename = f"thumb_{filename}"
+        with Image.open(filepath) as img:
+            img.thumbnail((300, 200), Image.Resampling.LANCZOS)
+            images.save_variants(img, thumbnail_filename)
+            images.save_image(img, thumbnail_filename, 'JPEG', quality=80, optimize=True)
+
+    file = io.BytesIO(data)
+    validate(file)
+    process(file)
+
+def current_pipeline(images, data):
+    file = io.BytesIO(data)
+    images.validate_image_file(file)
+    images.process_image(file)
+
+PIPELINES = {'legacy': legacy_pipeline, 'current': current_pipeline}
+
+def peak_rss_kb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def run_worker(args):
+    """Executa um pipeline neste processo e imprime o resultado em JSON"""
+    import src.utils.images as images
+    from PIL import Image
+
+    paths = sorted(os.path.join(args.input, name) for name in os.listdir(args.input))
+    images.UPLOAD_FOLDER = tempfile.mkdtemp(prefix='bench-images-')
+    if not args.with_variants:
+        images.available_formats = lambda: []
+
+    pipeline = PIPELINES[args.worker]
+    # Aquecimento: carrega os plugins do Pillow antes de fixar a base de memória
+    with open(paths[0], 'rb') as file:
+        Image.open(file).load()
+    baseline = peak_rss_kb()
+    durations = []
+    for path in paths:
+        with open(path, 'rb') as file:
+            data = file.read()
+        started = time.perf_counter()
+        pipeline(images, data)
+        durations.append(time.perf_counter() - started)
+        # Cada amostra é única; limpar evita que o disco cheio distorça a medição
+        for name in os.listdir(images.UPLOAD_FOLDER):
+            os.remove(os.path.join(images.UPLOAD_FOLDER, name))
+    os.rmdir(images.UPLOAD_FOLDER)
+
+    print(json.dumps({
+        'mean_ms': sum(durations) / len(durations) * 1000,
+        'min_ms': min(durations) * 1000,
+        'peak_rss_delta_kb': peak_rss_kb() - baseline,
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--uploads', type=int, default=20)
+    parser.add_argument('--width', type=int, default=2048)
+    parser.add_argument('--height', type=int, default=1536)
+    parser.add_argument('--with-variants', action='store_true')
+    parser.add_argument('--worker', choices=PIPELINES, help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    input_path = tempfile.mkdtemp(prefix='bench-samples-')
+    for seed in range(args.uploads):
+        with open(os.path.join(input_path, f'{seed:04d}.jpg'), 'wb') as file:
+            file.write(make_jpeg(args.width, args.height, seed))
+
+    print(f"{args.uploads} uploads JPEG {args.width}x{args.height}"
+          f"{' com variantes WebP/AVIF' if args.with_variants else ''}")
+    try:
+        for name in PIPELINES:
+            command = [sys.executable, os.path.abspath(__file__), '--worker', name, '--input', input_path]
+            if args.with_variants:
+                command.append('--with-variants')
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{name:>8}: {result['mean_ms']:8.1f} ms/upload (mín. {result['min_ms']:.1f} ms), "
+                  f"pico de RSS +{result['peak_rss_delta_kb'] / 1024:.1f} MB")
+    finally:
+        shutil.rmtree(input_path)
+
+if __name__ == '__main__':
+    main()
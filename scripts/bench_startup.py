@@ -0,0 +1,93 @@
+"""Mede o tempo de partida de um worker (como o Passenger ao criar um processo)
+
+Cada rodada é um subprocesso novo, que mede:
+- import: importar src.main
+- create_app: montar a aplicação
+- 1ª requisição: GET /api/vehicles logo após a partida
+- 1º upload: carga do PIL/python-magic, paga só por quem processa imagens
+
+Uso (a partir da raiz do projeto):
+    python scripts/bench_startup.py [--runs 5]
+
+O banco é criado antes num diretório temporário (flask init-db), fora da
+medição, como em produção.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STEPS = ('import', 'create_app', 'first_request', 'image_modules')
+LABELS = {
+    'import': 'import src.main',
+    'create_app': 'create_app()',
+    'first_request': '1ª requisição',
+    'image_modules': 'PIL + magic (1º upload)',
+}
+
+def measure():
+    """Executado no subprocesso: mede cada etapa da partida"""
+    import warnings
+    warnings.filterwarnings('ignore')
+    timings = {}
+
+    started = time.perf_counter()
+    from src.main import create_app
+    timings['import'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    app = create_app()
+    timings['create_app'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    status = app.test_client().get('/api/vehicles').status_code
+    timings['first_request'] = time.perf_counter() - started
+
+    lazy = 'PIL.Image' not in sys.modules and 'magic' not in sys.modules
+    started = time.perf_counter()
+    from PIL import Image
+    import magic
+    timings['image_modules'] = time.perf_counter() - started
+
+    return {'timings': timings, 'status': status, 'lazy_images': lazy}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure()))
+        return
+
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'app.db')}")
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'src.main', 'init-db'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker'],
+                                cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{args.runs} partidas (mediana, mín-máx)")
+    for step in STEPS:
+        values = [result['timings'][step] * 1000 for result in results]
+        print(f"  {LABELS[step]:<26} {statistics.median(values):8.1f} ms  "
+              f"({min(values):.1f}-{max(values):.1f})")
+    total = [sum(result['timings'][step] for step in STEPS[:3]) * 1000 for result in results]
+    print(f"  {'até a 1ª resposta':<26} {statistics.median(total):8.1f} ms")
+    print(f"  status da 1ª requisição: {results[0]['status']}; "
+          f"PIL/magic fora da partida: {'sim' if all(r['lazy_images'] for r in results) else 'não'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""Teste de carga do SQLite com vários processos lendo e escrevendo ao mesmo tempo
+
+Simula os workers do Passenger: processos leitores consultam o catálogo
+público (listagem e detalhe) enquanto processos escritores atualizam e criam
+veículos pelas rotas administrativas, todos no mesmo arquivo de banco. Ao
+final mostra a vazão de leitura, as latências e os erros (500 / "database is
+locked") de cada perfil SQLite.
+
+Uso (a partir da raiz do projeto):
+    python scripts/stress_sqlite.py [--profile default|production|both] [--readers 4]
+                                    [--writers 1] [--duration 10] [--vehicles 2000]
+
+O cache de respostas é desligado para que toda leitura chegue ao banco. Cada
+perfil roda num banco temporário novo.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PROFILES = ('default', 'production')
+PER_PAGE = 20
+
+def load_app():
+    import warnings
+    warnings.filterwarnings('ignore')
+    from src.main import create_app
+    return create_app({'RATELIMIT_ENABLED': False})
+
+def seed(count):
+    app = load_app()
+    from src.models.db import db
+    from src.models.migrations import init_database
+    from src.models.vehicle import Vehicle
+    from src.models.cache import bump_cache_version
+    rng = random.Random(0)
+    with app.app_context():
+        init_database()
+        for i in range(count):
+            db.session.add(Vehicle(
+                marca=rng.choice(['Fiat', 'Ford', 'Honda', 'Toyota', 'Volkswagen']),
+                modelo=f'Modelo {i}', ano=rng.randint(2005, 2024),
+                preco=rng.randint(20, 300) * 1000, quilometragem=rng.randint(0, 200000),
+                categoria=rng.choice(['Hatch', 'Sedan', 'SUV', 'Picape'])
+            ))
+        bump_cache_version()
+        db.session.commit()
+
+def wait_until(start_at):
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def reader(duration, start_at, vehicles, seed_value):
+    client = load_app().test_client()
+    rng = random.Random(seed_value)
+    pages = max(1, vehicles // PER_PAGE)
+    latencies, errors = [], 0
+    wait_until(start_at)
+    end = time.time() + duration
+    while time.time() < end:
+        if rng.random() < 0.5:
+            url = f'/api/vehicles?page={rng.randint(1, pages)}&per_page={PER_PAGE}'
+        else:
+            url = f'/api/vehicles/{rng.randint(1, vehicles)}'
+        started = time.perf_counter()
+        status = client.get(url).status_code
+        latencies.append(time.perf_counter() - started)
+        errors += status != 200
+    return {'ops': len(latencies), 'errors': errors, 'latencies': latencies}
+
+def writer(duration, start_at, vehicles, seed_value):
+    app = load_app()
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        token = create_access_token(identity='1', additional_claims={'role': 'admin'})
+    headers = {'Authorization': f'Bearer {token}'}
+    client = app.test_client()
+    rng = random.Random(seed_value)
+    latencies, errors = [], 0
+    wait_until(start_at)
+    end = time.time() + duration
+    while time.time() < end:
+        data = {'marca': 'Fiat', 'modelo': 'Carga', 'ano': 2020, 'preco': rng.randint(20, 300) * 1000}
+        started = time.perf_counter()
+        if rng.random() < 0.8:
+            response = client.put(f'/api/admin/vehicles/{rng.randint(1, vehicles)}', json=data, headers=headers)
+        else:
+            response = client.post('/api/admin/vehicles', json=data, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        errors += response.status_code not in (200, 201)
+    return {'ops': len(latencies), 'errors': errors, 'latencies': latencies}
+
+def run_profile(profile, args):
+    """Roda leitores e escritores em paralelo num banco novo com o perfil dado"""
+    workdir = tempfile.mkdtemp(prefix='stress-sqlite-')
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'app.db')}",
+        SQLITE_PROFILE=profile,
+        RESPONSE_CACHE_ENABLED='False',
+    )
+    env.pop('DATABASE_REPLICA_URL', None)
+    command = [sys.executable, os.path.abspath(__file__), '--vehicles', str(args.vehicles),
+               '--duration', str(args.duration)]
+    subprocess.run(command + ['--worker', 'seed'], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+    start_at = time.time() + args.startup
+    roles = ['read'] * args.readers + ['write'] * args.writers
+    processes = [
+        subprocess.Popen(command + ['--worker', role, '--start-at', str(start_at), '--seed', str(index)],
+                         env=env, stdout=subprocess.PIPE, text=True)
+        for index, role in enumerate(roles)
+    ]
+    results = {'read': [], 'write': []}
+    for role, process in zip(roles, processes):
+        output, _ = process.communicate()
+        results[role].append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def summary(results, duration):
+    latencies = [value for result in results for value in result['latencies']]
+    ops = sum(result['ops'] for result in results)
+    return (f"{ops / duration:8.1f} ops/s  p50 {percentile(latencies, 0.5) * 1000:6.1f} ms  "
+            f"p95 {percentile(latencies, 0.95) * 1000:6.1f} ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:6.1f} ms  "
+            f"erros {sum(result['errors'] for result in results)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=PROFILES + ('both',), default='both')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--vehicles', type=int, default=2000)
+    parser.add_argument('--startup', type=float, default=5,
+                        help='segundos para os processos carregarem a aplicação antes do início')
+    parser.add_argument('--worker', choices=('seed', 'read', 'write'), help=argparse.SUPPRESS)
+    parser.add_argument('--start-at', type=float, help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker == 'seed':
+        seed(args.vehicles)
+        return
+    if args.worker:
+        run = reader if args.worker == 'read' else writer
+        result = run(args.duration, args.start_at, args.vehicles, args.seed)
+        print(json.dumps(result))
+        return
+
+    profiles = PROFILES if args.profile == 'both' else (args.profile,)
+    print(f"{args.readers} leitor(es), {args.writers} escritor(es), {args.duration:g}s, "
+          f"{args.vehicles} veículos")
+    for profile in profiles:
+        results = run_profile(profile, args)
+        print(f"[{profile}]")
+        print(f"  leitura: {summary(results['read'], args.duration)}")
+        print(f"  escrita: {summary(results['write'], args.duration)}")
+
+if __name__ == '__main__':
+    main()
@@ -34,6 +34,7 @@ DEBUG=False
 
 # Banco de dados
 DATABASE_URL=sqlite:///src/database/app.db
+SQLITE_PROFILE=production
 
 # Upload
 MAX_CONTENT_LENGTH=5242880
@@ -81,7 +82,7 @@ def set_permissions():
 def create_htaccess_uploads():
     """Cria .htaccess para proteger diretório de uploads"""
     htaccess_content = """# Permitir apenas imagens
-<FilesMatch "\\.(jpg|jpeg|png|webp)$">
+<FilesMatch "\\.(jpg|jpeg|png|webp|avif)$">
     Order allow,deny
     Allow from all
 </FilesMatch>
@@ -109,28 +110,19 @@ def initialize_database():
         # Adicionar o diretório atual ao path
         sys.path.insert(0, os.path.dirname(__file__))
         
-        from src.main import app
-        from src.models.user import db as user_db, User
-        from src.models.vehicle import db as vehicle_db
+        from src.main import create_app
+        from src.models.migrations import init_database, DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_PASSWORD
         
+        app = create_app()
         with app.app_context():
-            # Criar tabelas
-            user_db.create_all()
-            vehicle_db.create_all()
+            # Criar tabelas, aplicar migrações e o usuário admin padrão
+            version, admin_created = init_database()
+            print(f"✓ Schema na versão {version}")
             
-            # Verificar se já existe usuário admin
-            admin_user = User.query.filter_by(email='admin@concessionaria.com').first()
-            if not admin_user:
-                admin_user = User(
-                    email='admin@concessionaria.com',
-                    role='admin'
-                )
-                admin_user.set_password('admin123')
-                user_db.session.add(admin_user)
-                user_db.session.commit()
+            if admin_created:
                 print("✓ Usuário administrador criado")
-                print("  Email: admin@concessionaria.com")
-                print("  Senha: admin123")
+                print(f"  Email: {DEFAULT_ADMIN_EMAIL}")
+                print(f"  Senha: {DEFAULT_ADMIN_PASSWORD}")
                 print("  ⚠ ALTERE ESTAS CREDENCIAIS IMEDIATAMENTE!")
             else:
                 print("✓ Usuário administrador já existe")
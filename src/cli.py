@@ -0,0 +1,127 @@
+import os
+import sys
+import click
+from src.models.db import db
+from src.models.migrations import (
+    run_migrations, explain_query_plans, init_database, DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_PASSWORD
+)
+from src.models.stats import rebuild_vehicle_stats
+from src.models.sqlite_profile import checkpoint
+from src.utils.images import UPLOAD_FOLDER, available_formats, backfill_variants
+from src.utils.image_jobs import recover_image_jobs, wait_image_jobs
+from src.utils.inventory import (
+    FORMATS, DEFAULT_BATCH_SIZE, detect_format, read_rows, import_vehicles, export_vehicles
+)
+
+def register_commands(app):
+    """Registra os comandos `flask` de manutenção"""
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Cria as tabelas, aplica as migrações e cria o admin padrão"""
+        version, admin_created = init_database()
+        click.echo(f"Schema na versão {version}")
+        if admin_created:
+            click.echo(f"Usuário admin criado: {DEFAULT_ADMIN_EMAIL} / {DEFAULT_ADMIN_PASSWORD}")
+            click.echo("ALTERE ESTA SENHA IMEDIATAMENTE!")
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade():
+        """Aplica as migrações de schema pendentes"""
+        version = run_migrations()
+        click.echo(f"Schema na versão {version}")
+
+    @app.cli.command('db-check-plans')
+    def db_check_plans():
+        """Falha se alguma consulta comum fizer varredura completa da tabela"""
+        if db.engine.dialect.name != 'sqlite':
+            click.echo("Verificação disponível apenas para SQLite")
+            return
+
+        failures = 0
+        for name, (details, full_scan) in explain_query_plans().items():
+            status = 'FULL SCAN' if full_scan else 'ok'
+            click.echo(f"[{status}] {name}: {' | '.join(details)}")
+            failures += full_scan
+
+        if failures:
+            click.echo(f"{failures} consulta(s) sem índice adequado")
+            sys.exit(1)
+
+    @app.cli.command('db-checkpoint')
+    def db_checkpoint():
+        """Copia o WAL para o banco e trunca o arquivo -wal (SQLite)"""
+        if db.engine.dialect.name != 'sqlite':
+            click.echo("Checkpoint disponível apenas para SQLite")
+            return
+
+        with db.engine.connect() as connection:
+            busy, log_pages, checkpointed = checkpoint(connection)
+        if log_pages < 0:
+            click.echo("Banco fora do modo WAL: nada a fazer")
+            return
+        click.echo(f"Checkpoint: {checkpointed}/{log_pages} páginas copiadas")
+        if busy:
+            click.echo("Checkpoint incompleto: havia leitores ou escritor ativos")
+            sys.exit(1)
+
+    @app.cli.command('stats-rebuild')
+    def stats_rebuild():
+        """Recalcula os agregados do dashboard a partir dos veículos"""
+        rebuild_vehicle_stats()
+        db.session.commit()
+        click.echo("Agregados do dashboard reconstruídos")
+
+    @app.cli.command('images-backfill-formats')
+    def images_backfill_formats():
+        """Gera variantes WebP/AVIF para os JPEG já enviados"""
+        formats = ', '.join(entry[1] for entry in available_formats())
+        click.echo(f"Formatos disponíveis: {formats or 'nenhum'}")
+
+        created = failed = 0
+        for filename in sorted(os.listdir(UPLOAD_FOLDER)):
+            if not filename.endswith('.jpg'):
+                continue
+            try:
+                created += backfill_variants(filename)
+            except Exception as e:
+                failed += 1
+                click.echo(f"Falha em {filename}: {e}")
+
+        click.echo(f"{created} variante(s) criada(s), {failed} falha(s)")
+
+    @app.cli.command('image-jobs-recover')
+    def image_jobs_recover():
+        """Retoma os processamentos de imagem interrompidos (para cron)"""
+        resumed = recover_image_jobs()
+        if resumed:
+            wait_image_jobs()
+        click.echo(f"{resumed} job(s) retomado(s)")
+
+    @app.cli.command('vehicles-import')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'format_name', type=click.Choice(FORMATS), help='Padrão: extensão do arquivo')
+    @click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True)
+    def vehicles_import(path, format_name, batch_size):
+        """Importa veículos de um arquivo CSV ou NDJSON"""
+        from src.routes.vehicles import VehicleSchema
+
+        format_name = detect_format(format_name, filename=path)
+        with open(path, encoding='utf-8-sig', newline='') as file:
+            report = import_vehicles(read_rows(file, format_name), VehicleSchema(), batch_size)
+
+        for error in report.errors:
+            click.echo(f"Linha {error['row']}: {error['errors']}")
+        if report.failed > len(report.errors):
+            click.echo(f"... e mais {report.failed - len(report.errors)} linha(s) com erro")
+        click.echo(f"{report.created} criado(s), {report.updated} atualizado(s), {report.failed} com erro")
+        if report.failed:
+            sys.exit(1)
+
+    @app.cli.command('vehicles-export')
+    @click.option('--format', 'format_name', type=click.Choice(FORMATS), default='csv', show_default=True)
+    @click.option('--output', '-o', type=click.File('wb'), default='-', help='Padrão: saída padrão')
+    def vehicles_export(format_name, output):
+        """Exporta o estoque completo em CSV ou NDJSON"""
+        for chunk in export_vehicles(format_name):
+            output.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
@@ -0,0 +1,19 @@
+from flask_jwt_extended import JWTManager
+from flask_cors import CORS
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from src.models.db import db
+from src.utils.rate_limit import request_cost  # registra o armazenamento sqlite://
+
+# Extensões criadas sem aplicação e ligadas a ela em create_app()
+# (src/main.py), para que importar um módulo não monte a aplicação inteira.
+
+jwt = JWTManager()
+cors = CORS()
+
+# Rate limiting (armazenamento e estratégia vêm de RATELIMIT_* na configuração)
+limiter = Limiter(
+    key_func=get_remote_address,
+    default_limits=["1000 per day", "100 per hour"],
+    default_limits_cost=request_cost
+)
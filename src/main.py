@@ -3,58 +3,242 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
-from flask_jwt_extended import JWTManager
-from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Flask, jsonify, request
 from datetime import timedelta
 
-# Importar modelos
-from src.models.user import db as user_db, User
-from src.models.vehicle import db as vehicle_db, Vehicle, VehicleImage
+# Variáveis do .env gerado pelo setup.py (python-dotenv é opcional)
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
+except ImportError:
+    pass
+
+from src.extensions import db, jwt, cors, limiter
+
+# Importar modelos (registram as tabelas no metadata do db)
+from src.models.db import configure_database, normalize_database_url
+from src.models.sqlite_profile import init_sqlite_profile
+from src.models.user import User
+from src.models.vehicle import Vehicle, VehicleImage
+from src.models.cache import CacheVersion
+from src.models.stats import VehicleStat, VehicleDailyStat
+from src.models.image_job import ImageJob
+from src.models.auth_event import AuthEvent
+from src.models.migrations import init_database, DEFAULT_ADMIN_EMAIL, DEFAULT_ADMIN_PASSWORD
 
 # Importar blueprints
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.vehicles import vehicles_bp
 from src.routes.uploads import uploads_bp
+from src.routes.metrics import metrics_bp
+from src.cli import register_commands
+from src.utils.image_jobs import sweep_image_jobs
+from src.utils.delivery import DELIVERY_MODES
+from src.utils.static_manifest import get_static_manifest
+from src.utils.compression import compress_response
+from src.utils.json_provider import init_json_provider
+from src.utils.auth_cache import is_token_revoked, get_principal
+from src.utils.metrics import init_metrics
+
+# A aplicação é montada por create_app(): importar este módulo não abre o
+# banco nem carrega PIL/python-magic (importados só nas rotas de upload).
+# O schema e o admin padrão são criados por `flask --app src.main init-db`.
+
+def load_config(app):
+    """Configuração a partir das variáveis de ambiente"""
+    # Configurações de segurança
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua-chave-secreta-super-forte-aqui-mude-em-producao')
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-chave-secreta-super-forte-aqui-mude-em-producao')
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+    app.config['JWT_ALGORITHM'] = 'HS256'
+
+    # Configuração do banco de dados: DATABASE_URL (padrão: SQLite local), pool
+    # (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE) e réplica
+    # de leitura opcional (DATABASE_REPLICA_URL)
+    configure_database(
+        app,
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    )
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Criação do schema e do admin padrão: explícita com `flask init-db`;
+    # AUTO_INIT_DB=True repete isso a cada inicialização (desenvolvimento)
+    app.config['AUTO_INIT_DB'] = os.environ.get('AUTO_INIT_DB', 'False').lower() == 'true'
+
+    # Perfil SQLite (vários workers no mesmo arquivo): 'production' ativa WAL,
+    # pragmas de cache/mmap e checkpoints periódicos; 'default' só o busy_timeout
+    app.config['SQLITE_PROFILE'] = os.environ.get('SQLITE_PROFILE', 'production').lower()
+    app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    app.config['SQLITE_CACHE_SIZE'] = int(os.environ.get('SQLITE_CACHE_SIZE', 16 * 1024))
+    app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    app.config['SQLITE_WAL_AUTOCHECKPOINT'] = int(os.environ.get('SQLITE_WAL_AUTOCHECKPOINT', 1000))
+    app.config['SQLITE_CHECKPOINT_INTERVAL'] = int(os.environ.get('SQLITE_CHECKPOINT_INTERVAL', 60))
+
+    # Rate limiting compartilhado entre os workers (arquivo SQLite próprio,
+    # janela deslizante); 'memory://' volta aos contadores por processo.
+    # Caminhos sqlite:/// relativos partem da raiz do projeto, como DATABASE_URL
+    app.config['RATELIMIT_STORAGE_URI'] = normalize_database_url(
+        os.environ.get(
+            'RATELIMIT_STORAGE_URI', f"sqlite:///{os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'ratelimit.db')}"
+        ),
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    app.config['RATELIMIT_STRATEGY'] = os.environ.get('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    app.config['RATELIMIT_SEARCH_COST'] = int(os.environ.get('RATELIMIT_SEARCH_COST', 5))
+
+    # Autenticação: intervalo de leitura das revogações de token e validade
+    # do usuário em cache em cada worker (segundos)
+    app.config['AUTH_REVOCATION_REFRESH_INTERVAL'] = float(os.environ.get('AUTH_REVOCATION_REFRESH_INTERVAL', 2))
+    app.config['AUTH_PRINCIPAL_TTL'] = float(os.environ.get('AUTH_PRINCIPAL_TTL', 30))
+
+    # Métricas por requisição (/metrics, formato Prometheus): arquivos por
+    # processo em METRICS_DIR, somados na coleta; METRICS_TOKEN permite coletar
+    # sem JWT de admin. SERVER_TIMING_ENABLED adiciona o header Server-Timing
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    app.config['METRICS_DIR'] = os.environ.get('METRICS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'metrics'))
+    app.config['METRICS_FLUSH_INTERVAL'] = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+    # Vazio (como no .env.example) desativa o acesso por token
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN', '').strip() or None
+    app.config['SERVER_TIMING_ENABLED'] = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+
+    # Cache de respostas do catálogo público (por worker, invalidado via banco)
+    app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', 'True').lower() == 'true'
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Configurações de upload
+    app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB
+
+    # Processamento de imagens em segundo plano (pool local de processos)
+    app.config['IMAGE_PROCESSING_ASYNC'] = os.environ.get('IMAGE_PROCESSING_ASYNC', 'False').lower() == 'true'
+    app.config['IMAGE_WORKERS'] = int(os.environ.get('IMAGE_WORKERS', 2))
+    app.config['IMAGE_JOB_TIMEOUT'] = int(os.environ.get('IMAGE_JOB_TIMEOUT', 300))
+    app.config['IMAGE_JOB_SWEEP_INTERVAL'] = int(os.environ.get('IMAGE_JOB_SWEEP_INTERVAL', 30))
+
+    # Upload em lote (várias imagens por requisição)
+    app.config['BATCH_UPLOAD_MAX_FILES'] = int(os.environ.get('BATCH_UPLOAD_MAX_FILES', 30))
+    app.config['BATCH_UPLOAD_MAX_CONTENT_LENGTH'] = int(os.environ.get('BATCH_UPLOAD_MAX_CONTENT_LENGTH', 60 * 1024 * 1024))
+
+    # Importação em lote do estoque (CSV/NDJSON)
+    app.config['IMPORT_MAX_CONTENT_LENGTH'] = int(os.environ.get('IMPORT_MAX_CONTENT_LENGTH', 50 * 1024 * 1024))
+    app.config['IMPORT_BATCH_SIZE'] = int(os.environ.get('IMPORT_BATCH_SIZE', 500))
+
+    # Operações administrativas em lote (/api/admin/vehicles/batch)
+    app.config['BATCH_MUTATION_MAX_OPERATIONS'] = int(os.environ.get('BATCH_MUTATION_MAX_OPERATIONS', 500))
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    # Entrega dos arquivos de upload: 'flask', 'x-sendfile' (Apache) ou 'x-accel-redirect' (nginx)
+    app.config['UPLOADS_DELIVERY_MODE'] = os.environ.get('UPLOADS_DELIVERY_MODE', 'flask').lower()
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.environ.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+    app.config['UPLOADS_CACHE_MAX_AGE'] = int(os.environ.get('UPLOADS_CACHE_MAX_AGE', 365 * 24 * 60 * 60))
 
-# Configurações de segurança
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'sua-chave-secreta-super-forte-aqui-mude-em-producao')
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-chave-secreta-super-forte-aqui-mude-em-producao')
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-app.config['JWT_ALGORITHM'] = 'HS256'
+    # Compressão gzip/brotli das respostas JSON
+    app.config['COMPRESSION_ENABLED'] = os.environ.get('COMPRESSION_ENABLED', 'True').lower() == 'true'
+    app.config['COMPRESSION_MIN_SIZE'] = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+    app.config['COMPRESSION_GZIP_LEVEL'] = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+    app.config['COMPRESSION_BROTLI_QUALITY'] = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
 
-# Configuração do banco de dados
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Cache de fragmentos JSON de veículos (entradas por worker)
+    app.config['VEHICLE_FRAGMENT_CACHE_SIZE'] = int(os.environ.get('VEHICLE_FRAGMENT_CACHE_SIZE', 5000))
 
-# Configurações de upload
-app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB
+def create_app(config=None):
+    """Cria e configura a aplicação (`config` sobrescreve o ambiente)"""
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    load_config(app)
+    if config:
+        app.config.update(config)
+    if app.config['UPLOADS_DELIVERY_MODE'] not in DELIVERY_MODES:
+        raise RuntimeError(f"UPLOADS_DELIVERY_MODE inválido: use {', '.join(DELIVERY_MODES)}")
 
-# Inicializar extensões
-jwt = JWTManager(app)
-cors = CORS(app, origins="*")  # Em produção, especificar domínios específicos
+    # Métricas primeiro: a medição inclui os hooks das demais extensões
+    init_metrics(app)
 
-# Rate limiting
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["1000 per day", "100 per hour"]
-)
+    # Inicializar extensões
+    init_json_provider(app)
+    jwt.init_app(app)
+    cors.init_app(app, origins="*")  # Em produção, especificar domínios específicos
+    limiter.init_app(app)
 
-# Inicializar banco de dados
-user_db.init_app(app)
-vehicle_db.init_app(app)
+    # Inicializar banco de dados
+    db.init_app(app)
+    init_sqlite_profile(app, db)
 
-# Registrar blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(auth_bp, url_prefix='/api/auth')
-app.register_blueprint(vehicles_bp, url_prefix='/api')
-app.register_blueprint(uploads_bp, url_prefix='/api')
+    # Registrar blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(vehicles_bp, url_prefix='/api')
+    app.register_blueprint(uploads_bp, url_prefix='/api')
+    app.register_blueprint(metrics_bp)
+
+    # Comandos de manutenção (flask init-db, flask db-upgrade, ...)
+    register_commands(app)
+
+    register_routes(app)
+    register_hooks(app)
+
+    if app.config['AUTO_INIT_DB']:
+        with app.app_context():
+            version, admin_created = init_database()
+            if admin_created:
+                print(f"Usuário admin criado: {DEFAULT_ADMIN_EMAIL} / {DEFAULT_ADMIN_PASSWORD}")
+
+    return app
+
+def register_routes(app):
+    # Rota para servir o frontend React (manifesto montado no primeiro acesso)
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        manifest = get_static_manifest()
+        if manifest.folder is None:
+            return "Static folder not configured", 404
+
+        asset = manifest.get(path) if path else None
+        if asset is None:
+            asset = manifest.index
+            if asset is None:
+                return "index.html not found", 404
+        return asset.send()
+
+def register_hooks(app):
+    # Retomar processamentos de imagem interrompidos por reinício: só nas
+    # rotas administrativas (uploads e consulta de jobs), para que as
+    # requisições públicas não consultem a tabela de jobs
+    @app.before_request
+    def resume_image_jobs():
+        if request.path.startswith('/api/admin/'):
+            sweep_image_jobs()
+
+    # Compressão das respostas JSON que não vieram comprimidas do cache
+    @app.after_request
+    def compress_json_response(response):
+        return compress_response(response)
+
+    # Headers de segurança
+    @app.after_request
+    def set_security_headers(response):
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['X-Frame-Options'] = 'DENY'
+        response.headers['X-XSS-Protection'] = '1; mode=block'
+        response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+        return response
+
+    # Tratamento de erros
+    @app.errorhandler(413)
+    def too_large(e):
+        return jsonify({'error': 'Arquivo muito grande'}), 413
+
+    @app.errorhandler(429)
+    def rate_limited(e):
+        return jsonify({'error': 'Muitas requisições. Tente novamente mais tarde'}), 429
+
+    @app.errorhandler(404)
+    def not_found(e):
+        return jsonify({'error': 'Recurso não encontrado'}), 404
+
+    @app.errorhandler(500)
+    def internal_error(e):
+        return jsonify({'error': 'Erro interno do servidor'}), 500
 
 # Handlers de erro JWT
 @jwt.expired_token_loader
@@ -69,68 +253,24 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return jsonify({'error': 'Token de acesso necessário'}), 401
 
-# Rate limiting para login
-@limiter.limit("5 per minute")
-@app.route('/api/auth/login', methods=['POST'])
-def login_rate_limited():
-    from src.routes.auth import login
-    return login()
-
-# Criar tabelas e usuário admin padrão
-with app.app_context():
-    user_db.create_all()
-    vehicle_db.create_all()
-    
-    # Criar usuário admin padrão se não existir
-    admin_user = User.query.filter_by(email='admin@concessionaria.com').first()
-    if not admin_user:
-        admin_user = User(
-            email='admin@concessionaria.com',
-            role='admin'
-        )
-        admin_user.set_password('admin123')  # MUDE ESTA SENHA EM PRODUÇÃO!
-        user_db.session.add(admin_user)
-        user_db.session.commit()
-        print("Usuário admin criado: admin@concessionaria.com / admin123")
-
-# Rota para servir o frontend React
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
-
-# Headers de segurança
-@app.after_request
-def set_security_headers(response):
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'DENY'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    return response
-
-# Tratamento de erros
-@app.errorhandler(413)
-def too_large(e):
-    return jsonify({'error': 'Arquivo muito grande'}), 413
-
-@app.errorhandler(404)
-def not_found(e):
-    return jsonify({'error': 'Recurso não encontrado'}), 404
-
-@app.errorhandler(500)
-def internal_error(e):
-    return jsonify({'error': 'Erro interno do servidor'}), 500
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    return jsonify({'error': 'Token revogado'}), 401
+
+@jwt.user_lookup_error_loader
+def user_lookup_error_callback(jwt_header, jwt_payload):
+    return jsonify({'error': 'Usuário não encontrado ou inativo'}), 401
+
+# Revogação (logout) e usuário atual a partir do cache em memória do worker
+@jwt.token_in_blocklist_loader
+def check_if_token_revoked(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload['jti'])
+
+@jwt.user_lookup_loader
+def user_lookup_callback(jwt_header, jwt_payload):
+    return get_principal(jwt_payload['sub'])
 
 if __name__ == '__main__':
+    # Em desenvolvimento o banco é criado/atualizado automaticamente
+    app = create_app({'AUTO_INIT_DB': os.environ.get('AUTO_INIT_DB', 'True').lower() == 'true'})
     app.run(host='0.0.0.0', port=5000, debug=True)
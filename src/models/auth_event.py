@@ -0,0 +1,22 @@
+from datetime import datetime
+from src.models.db import db
+
+# Eventos de autenticação lidos incrementalmente por cada worker
+# (src/utils/auth_cache.py): tokens revogados no logout e usuários cujo
+# acesso mudou (desativados, removidos ou com outro papel).
+TOKEN_REVOKED = 'token'
+USER_CHANGED = 'user'
+
+class AuthEvent(db.Model):
+    __tablename__ = 'auth_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    jti = db.Column(db.String(64))
+    user_id = db.Column(db.Integer)
+    # Até quando o evento importa (expiração do token revogado)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<AuthEvent {self.kind} {self.jti or self.user_id}>'
@@ -0,0 +1,29 @@
+from src.models.db import db
+
+# Versões de cache gravadas no banco. Toda escrita no catálogo incrementa a
+# versão na mesma transação; cada worker do Passenger compara a versão atual
+# com a do seu cache local e o descarta quando ela muda, sem precisar de
+# comunicação entre processos.
+CATALOG = 'catalog'
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<CacheVersion {self.name}={self.version}>'
+
+def get_cache_version(name=CATALOG):
+    """Retorna a versão atual do cache `name` (0 se nunca invalidado)"""
+    return db.session.query(CacheVersion.version).filter_by(name=name).scalar() or 0
+
+def bump_cache_version(name=CATALOG):
+    """Invalida o cache `name` em todos os processos (na transação atual)"""
+    updated = CacheVersion.query.filter_by(name=name).update(
+        {CacheVersion.version: CacheVersion.version + 1},
+        synchronize_session=False
+    )
+    if not updated:
+        db.session.add(CacheVersion(name=name, version=1))
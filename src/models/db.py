@@ -0,0 +1,83 @@
+import os
+from functools import wraps
+from flask import g, has_request_context
+from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+
+# Instância única do SQLAlchemy, compartilhada por todos os modelos.
+#
+# Com DATABASE_REPLICA_URL configurada, as rotas marcadas com
+# @use_read_replica enviam seus SELECTs para a réplica (bind 'replica');
+# escritas, e qualquer leitura fora dessas rotas, vão sempre ao primário.
+
+REPLICA_BIND = 'replica'
+
+class RoutingSession(Session):
+    """Sessão que direciona leituras para a réplica quando a rota permite"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replica_allowed(self, clause):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _replica_allowed(session, clause):
+    return (
+        has_request_context()
+        and g.get('use_read_replica', False)
+        and not session._flushing
+        and isinstance(clause, Select)
+    )
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+def use_read_replica(f):
+    """Decorator de rota pública somente leitura: consultas vão para a réplica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.use_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+def normalize_database_url(url, base_dir):
+    """Caminhos SQLite relativos passam a ser relativos à raiz do projeto
+
+    (o Flask-SQLAlchemy os resolveria a partir da pasta instance/)
+    """
+    prefix = 'sqlite:///'
+    if url.startswith(prefix):
+        path = url[len(prefix):]
+        if path and path != ':memory:' and not path.startswith('file:') and not os.path.isabs(path):
+            return prefix + os.path.join(base_dir, path)
+    return url
+
+def engine_options(url, config):
+    """Opções do pool de conexões (bancos cliente/servidor)"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': int(config.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(config.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(config.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(config.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
+def configure_database(app, base_dir, default_url):
+    """Preenche a configuração do SQLAlchemy a partir do ambiente"""
+    env = os.environ
+    settings = {name: env[name] for name in
+                ('DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT', 'DB_POOL_RECYCLE') if name in env}
+
+    url = normalize_database_url(env.get('DATABASE_URL') or default_url, base_dir)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url, settings)
+
+    replica_url = env.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        replica_url = normalize_database_url(replica_url, base_dir)
+        app.config['SQLALCHEMY_BINDS'] = {
+            REPLICA_BIND: {'url': replica_url, **engine_options(replica_url, settings)}
+        }
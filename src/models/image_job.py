@@ -0,0 +1,35 @@
+from datetime import datetime
+from src.models.db import db
+
+class ImageJob(db.Model):
+    """Processamento assíncrono de uma imagem enviada (ver src/utils/image_jobs.py)"""
+    __tablename__ = 'image_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    vehicle_id = db.Column(db.Integer, db.ForeignKey('vehicles.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    raw_path = db.Column(db.String(500), nullable=False)
+    original_filename = db.Column(db.String(255))
+    image_id = db.Column(db.Integer, db.ForeignKey('vehicle_images.id'))
+    error = db.Column(db.String(255))
+    worker = db.Column(db.String(50))  # processo que assumiu o job
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    image = db.relationship('VehicleImage')
+
+    def to_dict(self, progress=None):
+        """`progress` substitui o valor gravado (ver image_jobs.job_progress)"""
+        return {
+            'id': self.id,
+            'vehicle_id': self.vehicle_id,
+            'status': self.status,
+            'progress': self.progress if progress is None else progress,
+            'error': self.error,
+            'image': self.image.to_dict() if self.image else None,
+            'status_url': f'/api/admin/image-jobs/{self.id}',
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
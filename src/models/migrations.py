@@ -0,0 +1,168 @@
+from datetime import datetime
+from sqlalchemy import inspect
+from sqlalchemy.exc import IntegrityError, OperationalError
+from src.models.db import db
+from src.models.user import User
+from src.models.vehicle import Vehicle, VehicleImage
+from src.models.search import create_search_index
+from src.models.stats import rebuild_vehicle_stats
+
+# create_all() só cria tabelas novas; mudanças em tabelas existentes
+# (índices, colunas, triggers) entram aqui como migrações versionadas.
+# Cada migração deve ser idempotente, pois num banco novo create_all()
+# já pode ter criado parte do que ela faz.
+
+class SchemaMigration(db.Model):
+    __tablename__ = 'schema_migrations'
+
+    version = db.Column(db.Integer, primary_key=True)
+    description = db.Column(db.String(200))
+    applied_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def _migration_search_index():
+    if db.engine.dialect.name != 'sqlite':
+        return
+    try:
+        create_search_index()
+    except OperationalError:
+        # SQLite sem FTS5: a busca continua usando LIKE
+        db.session.rollback()
+        print("⚠ SQLite sem suporte a FTS5, índice de busca não criado")
+
+def _create_indexes(model, names):
+    """Cria os índices `names` do modelo que ainda não existem
+
+    Cada migração lista os próprios índices: o modelo atual pode ter índices
+    sobre colunas que só uma migração posterior adiciona.
+    """
+    connection = db.session.connection()
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+def _add_column(model, name):
+    connection = db.session.connection()
+    table = model.__table__
+    if name in {column['name'] for column in inspect(connection).get_columns(table.name)}:
+        return
+    column_type = table.c[name].type.compile(dialect=connection.dialect)
+    connection.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {name} {column_type}'))
+
+def _migration_vehicle_indexes():
+    _create_indexes(Vehicle, (
+        'ix_vehicles_active_created',
+        'ix_vehicles_active_categoria_preco',
+        'ix_vehicles_active_preco',
+        'ix_vehicles_active_combustivel_preco',
+        'ix_vehicles_active_ano',
+        'ix_vehicles_created_at',
+    ))
+
+def _migration_vehicle_image_indexes():
+    _create_indexes(VehicleImage, ('ix_vehicle_images_filename', 'ix_vehicle_images_vehicle_order'))
+
+def _migration_vehicle_external_id():
+    _add_column(Vehicle, 'external_id')
+    _create_indexes(Vehicle, ('ux_vehicles_external_id',))
+
+MIGRATIONS = [
+    (1, 'Índice de busca textual (FTS5) de veículos', _migration_search_index),
+    (2, 'Índices compostos e parciais de veículos', _migration_vehicle_indexes),
+    (3, 'Agregados incrementais do dashboard', rebuild_vehicle_stats),
+    (4, 'Índices de imagens (contagem de referências por arquivo)', _migration_vehicle_image_indexes),
+    (5, 'Código externo de veículos (importação em lote)', _migration_vehicle_external_id),
+]
+
+def current_version():
+    """Retorna a última versão de schema aplicada (0 se nenhuma)"""
+    return db.session.query(db.func.max(SchemaMigration.version)).scalar() or 0
+
+def run_migrations():
+    """Aplica as migrações pendentes, em ordem, uma transação por migração"""
+    applied = {version for (version,) in db.session.query(SchemaMigration.version)}
+
+    for version, description, upgrade in MIGRATIONS:
+        if version in applied:
+            continue
+
+        try:
+            upgrade()
+            db.session.add(SchemaMigration(version=version, description=description))
+            db.session.commit()
+            print(f"✓ Migração {version} aplicada: {description}")
+        except IntegrityError:
+            # Outro worker aplicou a mesma migração ao mesmo tempo
+            db.session.rollback()
+
+    return current_version()
+
+DEFAULT_ADMIN_EMAIL = 'admin@concessionaria.com'
+DEFAULT_ADMIN_PASSWORD = 'admin123'  # MUDE ESTA SENHA EM PRODUÇÃO!
+
+def init_database():
+    """Cria as tabelas, aplica as migrações e cria o usuário admin padrão
+
+    Executado por `flask init-db` (ou na inicialização com AUTO_INIT_DB).
+    Retorna (versão do schema, se o admin foi criado agora).
+    """
+    # Só o banco primário: a réplica recebe o schema pela replicação
+    db.create_all(bind_key=None)
+    version = run_migrations()
+
+    if User.query.filter_by(email=DEFAULT_ADMIN_EMAIL).first():
+        return version, False
+    admin_user = User(email=DEFAULT_ADMIN_EMAIL, role='admin')
+    admin_user.set_password(DEFAULT_ADMIN_PASSWORD)
+    db.session.add(admin_user)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outro processo criou o admin ao mesmo tempo
+        db.session.rollback()
+        return version, False
+    return version, True
+
+# Combinações de filtros mais comuns da API (ver get_vehicles/get_admin_vehicles)
+QUERY_PLAN_CASES = {
+    'listagem pública': lambda q: q.filter(Vehicle.is_active == True).order_by(Vehicle.created_at.desc()),
+    'categoria': lambda q: q.filter(Vehicle.is_active == True, Vehicle.categoria == 'SUV')
+        .order_by(Vehicle.created_at.desc()),
+    'categoria + preço': lambda q: q.filter(Vehicle.is_active == True, Vehicle.categoria == 'SUV',
+                                            Vehicle.preco >= 50000, Vehicle.preco <= 100000),
+    'combustível': lambda q: q.filter(Vehicle.is_active == True, Vehicle.combustivel == 'Flex')
+        .order_by(Vehicle.created_at.desc()),
+    'combustível + preço': lambda q: q.filter(Vehicle.is_active == True, Vehicle.combustivel == 'Flex',
+                                              Vehicle.preco <= 80000),
+    'faixa de ano': lambda q: q.filter(Vehicle.is_active == True, Vehicle.ano >= 2015, Vehicle.ano <= 2020),
+    'faixa de preço': lambda q: q.filter(Vehicle.is_active == True, Vehicle.preco >= 30000,
+                                         Vehicle.preco <= 60000),
+    'listagem admin': lambda q: q.order_by(Vehicle.created_at.desc()),
+}
+
+def is_full_scan(detail, table='vehicles'):
+    """Indica se uma linha do EXPLAIN QUERY PLAN varre `table` sem índice
+
+    SQLite anterior à 3.36 escreve "SCAN TABLE vehicles"; as versões novas,
+    "SCAN vehicles".
+    """
+    words = detail.split()
+    if words[:1] != ['SCAN']:
+        return False
+    words = words[2:] if words[1:2] == ['TABLE'] else words[1:]
+    return words[:1] == [table] and 'INDEX' not in words
+
+def explain_query_plans():
+    """Executa EXPLAIN QUERY PLAN nas consultas comuns
+
+    Retorna {nome: (linhas_do_plano, full_scan)}, onde full_scan indica
+    uma varredura completa de `vehicles` sem índice.
+    """
+    results = {}
+    for name, build in QUERY_PLAN_CASES.items():
+        statement = build(Vehicle.query).limit(12).statement
+        sql = str(statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        details = [row[-1] for row in rows]
+        full_scan = any(is_full_scan(detail) for detail in details)
+        results[name] = (details, full_scan)
+    return results
@@ -0,0 +1,99 @@
+import re
+from flask import current_app
+from src.models.db import db
+
+# Índice de busca textual (SQLite FTS5) sobre marca, modelo e descrição.
+# A tabela guarda apenas veículos ativos e é mantida por triggers, então
+# qualquer INSERT/UPDATE/soft delete em `vehicles` atualiza o índice na
+# mesma transação.
+FTS_TABLE = 'vehicles_fts'
+
+# unicode61 + remove_diacritics: "automático" encontra "automatico"
+FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "marca, modelo, descricao, "
+    "tokenize = 'unicode61 remove_diacritics 2')"
+)
+
+FTS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_ai AFTER INSERT ON vehicles
+    WHEN new.is_active
+    BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, marca, modelo, descricao)
+        VALUES (new.id, new.marca, new.modelo, new.descricao);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_au
+    AFTER UPDATE OF marca, modelo, descricao, is_active ON vehicles
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, marca, modelo, descricao)
+        SELECT new.id, new.marca, new.modelo, new.descricao WHERE new.is_active;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS vehicles_fts_ad AFTER DELETE ON vehicles
+    BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+]
+
+# Pesos do bm25 por coluna (marca, modelo, descricao)
+RANK_WEIGHTS = (10.0, 10.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def create_search_index():
+    """Cria o índice FTS5 e os triggers, populando-o a partir dos veículos"""
+    db.session.execute(db.text(FTS_DDL))
+    for trigger in FTS_TRIGGERS:
+        db.session.execute(db.text(trigger))
+    rebuild_search_index()
+
+def init_search_index():
+    """Detecta se o índice FTS5 existe neste banco"""
+    enabled = False
+    if db.engine.dialect.name == 'sqlite':
+        enabled = db.session.execute(
+            db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+    current_app.extensions['vehicle_search'] = enabled
+    return enabled
+
+def rebuild_search_index():
+    """Reconstrói o índice a partir da tabela de veículos"""
+    db.session.execute(db.text(f"DELETE FROM {FTS_TABLE}"))
+    db.session.execute(db.text(
+        f"INSERT INTO {FTS_TABLE}(rowid, marca, modelo, descricao) "
+        "SELECT id, marca, modelo, descricao FROM vehicles WHERE is_active"
+    ))
+
+def search_enabled():
+    """Indica se o índice FTS5 está disponível nesta aplicação
+
+    Detectado na primeira consulta de cada processo.
+    """
+    if 'vehicle_search' not in current_app.extensions:
+        return init_search_index()
+    return current_app.extensions['vehicle_search']
+
+def build_match_query(term):
+    """Converte o texto digitado em uma expressão MATCH segura
+
+    Cada palavra vira um prefixo entre aspas ("gol"*), combinadas com AND.
+    Retorna None se não houver nenhuma palavra pesquisável.
+    """
+    tokens = TOKEN_RE.findall(term or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+def search_subquery(match_query):
+    """Subquery com (vehicle_id, score) dos veículos que casam com a busca"""
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    stmt = db.text(
+        f"SELECT rowid AS vehicle_id, bm25({FTS_TABLE}, {weights}) AS score "
+        f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match_query"
+    ).bindparams(match_query=match_query).columns(
+        db.column('vehicle_id', db.Integer),
+        db.column('score', db.Float)
+    )
+    return stmt.subquery('fts')
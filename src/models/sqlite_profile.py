@@ -0,0 +1,102 @@
+import threading
+import time
+from sqlalchemy import event
+
+# Perfil SQLite para vários workers do Passenger no mesmo arquivo.
+#
+# - WAL: leitores não bloqueiam o escritor, nem o escritor os leitores
+# - synchronous=NORMAL: seguro com WAL (só o último commit pode se perder
+#   numa queda de energia), sem fsync a cada transação
+# - mmap_size/cache_size: leituras a partir da memória
+# - busy_timeout: espera o lock em vez de falhar com "database is locked"
+# - checkpoint: além do automático (wal_autocheckpoint), um checkpoint
+#   PASSIVE periódico na devolução das conexões ao pool, para o WAL não
+#   crescer quando sempre há leitores ativos
+#
+# Os pragmas valem por conexão, por isso são aplicados no evento `connect`
+# de cada engine (primário e réplica).
+
+PROFILES = ('default', 'production')
+
+DEFAULT_BUSY_TIMEOUT = 5000             # ms
+DEFAULT_CACHE_SIZE = 16 * 1024          # KiB por conexão
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024   # bytes
+DEFAULT_WAL_AUTOCHECKPOINT = 1000       # páginas
+DEFAULT_CHECKPOINT_INTERVAL = 60        # segundos
+DEFAULT_JOURNAL_SIZE_LIMIT = 64 * 1024 * 1024
+
+def profile_pragmas(profile, config):
+    """Pragmas aplicados em cada nova conexão, na ordem"""
+    busy_timeout = int(config.get('SQLITE_BUSY_TIMEOUT', DEFAULT_BUSY_TIMEOUT))
+    if profile != 'production':
+        return [('busy_timeout', busy_timeout)]
+    return [
+        ('busy_timeout', busy_timeout),
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -int(config.get('SQLITE_CACHE_SIZE', DEFAULT_CACHE_SIZE))),
+        ('mmap_size', int(config.get('SQLITE_MMAP_SIZE', DEFAULT_MMAP_SIZE))),
+        ('wal_autocheckpoint', int(config.get('SQLITE_WAL_AUTOCHECKPOINT', DEFAULT_WAL_AUTOCHECKPOINT))),
+        ('journal_size_limit', DEFAULT_JOURNAL_SIZE_LIMIT),
+        ('temp_store', 'MEMORY'),
+    ]
+
+class CheckpointTimer:
+    """Dispara um checkpoint PASSIVE no máximo a cada `interval` segundos"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def due(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
+
+def apply_sqlite_profile(engine, profile, config):
+    """Registra os pragmas do perfil nas conexões de um engine SQLite"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = profile_pragmas(profile, config)
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    interval = int(config.get('SQLITE_CHECKPOINT_INTERVAL', DEFAULT_CHECKPOINT_INTERVAL))
+    if profile != 'production' or interval <= 0:
+        return
+    timer = CheckpointTimer(interval)
+
+    @event.listens_for(engine, 'checkin')
+    def periodic_checkpoint(dbapi_connection, connection_record):
+        if dbapi_connection is None or not timer.due():
+            return
+        try:
+            dbapi_connection.execute('PRAGMA wal_checkpoint(PASSIVE)')
+        except Exception:
+            # Checkpoint é só manutenção: nunca derruba a requisição
+            pass
+
+def init_sqlite_profile(app, db):
+    """Aplica SQLITE_PROFILE a todos os engines SQLite da aplicação"""
+    profile = app.config.get('SQLITE_PROFILE', 'production')
+    if profile not in PROFILES:
+        raise RuntimeError(f"SQLITE_PROFILE inválido: use {', '.join(PROFILES)}")
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_profile(engine, profile, app.config)
+
+def checkpoint(connection, mode='TRUNCATE'):
+    """Executa um checkpoint do WAL e retorna (busy, páginas no log, páginas copiadas)"""
+    return tuple(connection.exec_driver_sql(f'PRAGMA wal_checkpoint({mode})').one())
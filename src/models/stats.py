@@ -0,0 +1,174 @@
+from datetime import datetime, timedelta
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from src.models.db import db
+from src.models.vehicle import Vehicle
+
+# Agregados do dashboard mantidos incrementalmente. Cada flush que cria,
+# altera ou remove veículos aplica o delta das contagens na mesma transação,
+# então o dashboard lê poucas linhas em vez de varrer `vehicles`.
+
+class VehicleStat(db.Model):
+    __tablename__ = 'vehicle_stats'
+
+    # dimension: 'status' (active/inactive), 'categoria' ou 'marca' (só ativos)
+    dimension = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class VehicleDailyStat(db.Model):
+    __tablename__ = 'vehicle_daily_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    added = db.Column(db.Integer, nullable=False, default=0)
+    removed = db.Column(db.Integer, nullable=False, default=0)
+
+STAT_FIELDS = ('is_active', 'categoria', 'marca')
+
+UPSERT_STAT = db.text(
+    "INSERT INTO vehicle_stats (dimension, value, count) VALUES (:dimension, :value, :delta) "
+    "ON CONFLICT (dimension, value) DO UPDATE SET count = vehicle_stats.count + excluded.count"
+)
+
+UPSERT_DAILY = db.text(
+    "INSERT INTO vehicle_daily_stats (day, added, removed) VALUES (:day, :added, :removed) "
+    "ON CONFLICT (day) DO UPDATE SET "
+    "added = vehicle_daily_stats.added + excluded.added, "
+    "removed = vehicle_daily_stats.removed + excluded.removed"
+)
+
+def vehicle_state(vehicle, previous=False):
+    """Campos que afetam os agregados; previous=True usa os valores antes do flush"""
+    state = {}
+    attrs = inspect(vehicle).attrs
+    for field in STAT_FIELDS:
+        history = attrs[field].history
+        if previous and history.deleted:
+            state[field] = history.deleted[0]
+        else:
+            state[field] = getattr(vehicle, field)
+    # is_active só recebe o default do banco no INSERT
+    if state['is_active'] is None:
+        state['is_active'] = True
+    return state
+
+def _contributions(state):
+    if state is None:
+        return {}
+    active = bool(state['is_active'])
+    keys = {('status', 'active' if active else 'inactive'): 1}
+    if active:
+        for field in ('categoria', 'marca'):
+            if state[field]:
+                keys[(field, state[field])] = 1
+    return keys
+
+def apply_vehicle_changes(connection, changes, day=None):
+    """Aplica aos agregados uma lista de (estado_anterior, estado_novo)
+
+    Estado None representa veículo inexistente (criação ou exclusão física).
+    """
+    deltas = {}
+    added = removed = 0
+    for old, new in changes:
+        for key, value in _contributions(old).items():
+            deltas[key] = deltas.get(key, 0) - value
+        for key, value in _contributions(new).items():
+            deltas[key] = deltas.get(key, 0) + value
+
+        was_active = old is not None and bool(old['is_active'])
+        is_active = new is not None and bool(new['is_active'])
+        if is_active and not was_active:
+            added += 1
+        elif was_active and not is_active:
+            removed += 1
+
+    params = [
+        {'dimension': dimension, 'value': value, 'delta': delta}
+        for (dimension, value), delta in deltas.items() if delta
+    ]
+    if params:
+        connection.execute(UPSERT_STAT, params)
+    if added or removed:
+        connection.execute(UPSERT_DAILY, {
+            'day': day or datetime.utcnow().date(),
+            'added': added,
+            'removed': removed
+        })
+
+@event.listens_for(Session, 'before_flush')
+def track_vehicle_changes(session, flush_context, instances):
+    """Acumula as mudanças de veículos do flush e atualiza os agregados"""
+    changes = []
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, Vehicle):
+                changes.append((None, vehicle_state(obj)))
+        for obj in session.dirty:
+            if isinstance(obj, Vehicle) and session.is_modified(obj):
+                old, new = vehicle_state(obj, previous=True), vehicle_state(obj)
+                if old != new:
+                    changes.append((old, new))
+        for obj in session.deleted:
+            if isinstance(obj, Vehicle):
+                changes.append((vehicle_state(obj, previous=True), None))
+
+    if changes:
+        apply_vehicle_changes(session.connection(), changes)
+
+def rebuild_vehicle_stats():
+    """Recalcula todos os agregados a partir da tabela de veículos (reparo)"""
+    VehicleStat.query.delete()
+    VehicleDailyStat.query.delete()
+
+    rows = []
+    for is_active, count in db.session.query(Vehicle.is_active, db.func.count(Vehicle.id)) \
+            .group_by(Vehicle.is_active):
+        rows.append({'dimension': 'status', 'value': 'active' if is_active else 'inactive', 'count': count})
+    for field in ('categoria', 'marca'):
+        column = getattr(Vehicle, field)
+        for value, count in db.session.query(column, db.func.count(Vehicle.id)) \
+                .filter(Vehicle.is_active == True, column.isnot(None)).group_by(column):
+            rows.append({'dimension': field, 'value': value, 'count': count})
+    if rows:
+        db.session.execute(VehicleStat.__table__.insert(), rows)
+
+    # Histórico: entradas pela data de criação; saídas (soft delete) pela
+    # última atualização dos inativos, que é a melhor estimativa disponível
+    history = {}
+    for created_at, in db.session.query(Vehicle.created_at).filter(Vehicle.created_at.isnot(None)):
+        entry = history.setdefault(created_at.date(), {'added': 0, 'removed': 0})
+        entry['added'] += 1
+    for updated_at, in db.session.query(Vehicle.updated_at) \
+            .filter(Vehicle.is_active == False, Vehicle.updated_at.isnot(None)):
+        entry = history.setdefault(updated_at.date(), {'added': 0, 'removed': 0})
+        entry['removed'] += 1
+    if history:
+        db.session.execute(VehicleDailyStat.__table__.insert(), [
+            {'day': day, **counts} for day, counts in history.items()
+        ])
+
+def get_stat_counts(dimension):
+    """Contagens positivas de uma dimensão, da maior para a menor"""
+    return VehicleStat.query.filter(
+        VehicleStat.dimension == dimension, VehicleStat.count > 0
+    ).order_by(VehicleStat.count.desc(), VehicleStat.value).all()
+
+def get_daily_history(days):
+    """Veículos adicionados/removidos por dia nos últimos `days` dias"""
+    today = datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        row.day: row
+        for row in VehicleDailyStat.query.filter(VehicleDailyStat.day >= start)
+    }
+    history = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        row = rows.get(day)
+        history.append({
+            'date': day.isoformat(),
+            'added': row.added if row else 0,
+            'removed': row.removed if row else 0
+        })
+    return history
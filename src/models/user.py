@@ -1,8 +1,6 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import bcrypt
-
-db = SQLAlchemy()
+from src.models.db import db
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -1,13 +1,19 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
+from src.models.db import db
 
-db = SQLAlchemy()
+# Campos de Vehicle.to_dict() por padrão; 'imagem' (primeira imagem) só é
+# incluído quando pedido explicitamente
+VEHICLE_FIELDS = (
+    'id', 'marca', 'modelo', 'ano', 'preco', 'descricao', 'combustivel', 'cambio',
+    'cor', 'quilometragem', 'categoria', 'imagens', 'is_active', 'created_at', 'updated_at'
+)
 
 class Vehicle(db.Model):
     __tablename__ = 'vehicles'
     
     id = db.Column(db.Integer, primary_key=True)
+    external_id = db.Column(db.String(100))  # código do veículo no feed do fornecedor (importação)
     marca = db.Column(db.String(100), nullable=False)
     modelo = db.Column(db.String(100), nullable=False)
     ano = db.Column(db.Integer, nullable=False)
@@ -23,24 +29,39 @@ class Vehicle(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        return {
-            'id': str(self.id),
-            'marca': self.marca,
-            'modelo': self.modelo,
-            'ano': self.ano,
-            'preco': self.preco,
-            'descricao': self.descricao,
-            'combustivel': self.combustivel,
-            'cambio': self.cambio,
-            'cor': self.cor,
-            'quilometragem': self.quilometragem,
-            'categoria': self.categoria,
-            'imagens': json.loads(self.imagens) if self.imagens else [],
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None
-        }
+    # Índices alinhados com os filtros/ordenações de get_vehicles e da listagem admin.
+    # Bancos existentes recebem estes índices pelas migrações 2 e 5 (src/models/migrations.py).
+    __table_args__ = (
+        db.Index('ix_vehicles_active_created', 'is_active', 'created_at'),
+        db.Index('ix_vehicles_active_categoria_preco', 'is_active', 'categoria', 'preco'),
+        db.Index('ix_vehicles_active_preco', 'is_active', 'preco'),
+        db.Index('ix_vehicles_active_combustivel_preco', 'combustivel', 'preco',
+                 sqlite_where=db.text('is_active = 1'),
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_vehicles_active_ano', 'ano',
+                 sqlite_where=db.text('is_active = 1'),
+                 postgresql_where=db.text('is_active')),
+        db.Index('ix_vehicles_created_at', 'created_at'),
+        db.Index('ux_vehicles_external_id', 'external_id', unique=True),
+    )
+    
+    def to_dict(self, fields=None):
+        """Representação JSON; `fields` limita a saída (ver src/utils/fields.py)"""
+        return {field: self._field_value(field) for field in (fields or VEHICLE_FIELDS)}
+    
+    def _field_value(self, field):
+        if field == 'id':
+            return str(self.id)
+        if field == 'imagens':
+            return self.get_imagens()
+        if field == 'imagem':
+            # Primeira imagem, usada nos cards da listagem
+            images = self.get_imagens()
+            return images[0] if images else None
+        if field in ('created_at', 'updated_at'):
+            value = getattr(self, field)
+            return value.isoformat() if value else None
+        return getattr(self, field)
     
     def set_imagens(self, imagens_list):
         """Define as imagens como JSON string"""
@@ -49,6 +70,24 @@ class Vehicle(db.Model):
     def get_imagens(self):
         """Retorna as imagens como lista"""
         return json.loads(self.imagens) if self.imagens else []
+    
+    def add_image(self, filename, original_filename, file_path, file_size, mime_type='image/jpeg'):
+        """Registra uma imagem já processada e a adiciona ao fim da lista de URLs"""
+        vehicle_image = VehicleImage(
+            vehicle_id=self.id,
+            filename=filename,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            mime_type=mime_type,
+            image_order=len(self.vehicle_images)
+        )
+        self.vehicle_images.append(vehicle_image)
+        
+        current_images = self.get_imagens()
+        current_images.append(f'/api/uploads/{filename}')
+        self.set_imagens(current_images)
+        return vehicle_image
 
 class VehicleImage(db.Model):
     __tablename__ = 'vehicle_images'
@@ -65,6 +104,13 @@ class VehicleImage(db.Model):
     
     vehicle = db.relationship('Vehicle', backref=db.backref('vehicle_images', lazy=True, cascade='all, delete-orphan'))
     
+    # filename é o hash do conteúdo (src/utils/images.py): vários registros
+    # podem apontar para o mesmo arquivo, contados por este índice
+    __table_args__ = (
+        db.Index('ix_vehicle_images_filename', 'filename'),
+        db.Index('ix_vehicle_images_vehicle_order', 'vehicle_id', 'image_order'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
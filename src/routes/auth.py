@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt, current_user
 from marshmallow import Schema, fields, ValidationError
-from src.models.user import User, db
+from src.models.db import db
+from src.models.user import User
+from src.extensions import limiter
+from src.utils.auth_cache import revoke_token
 from datetime import timedelta
 
 auth_bp = Blueprint('auth', __name__)
@@ -12,6 +15,7 @@ class LoginSchema(Schema):
                          error_messages={'required': 'Senha é obrigatória'})
 
 @auth_bp.route('/login', methods=['POST'])
+@limiter.limit("5 per minute")
 def login():
     """Endpoint de login do administrador"""
     try:
@@ -44,7 +48,7 @@ def login():
         
         # Criar token JWT
         access_token = create_access_token(
-            identity=user.id,
+            identity=str(user.id),
             expires_delta=timedelta(hours=24),
             additional_claims={'role': user.role, 'email': user.email}
         )
@@ -65,13 +69,9 @@ def login():
 def get_current_user():
     """Retorna informações do usuário logado"""
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
-        
-        if not user or not user.is_active:
-            return jsonify({'error': 'Usuário não encontrado'}), 404
-        
-        return jsonify({'user': user.to_dict()}), 200
+        # Carregado pelo user_lookup_loader (cache do worker); usuários
+        # inativos ou removidos já recebem 401 em @jwt_required
+        return jsonify({'user': current_user.to_dict()}), 200
         
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -79,6 +79,13 @@ def get_current_user():
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
-    """Endpoint de logout (cliente deve descartar o token)"""
-    return jsonify({'message': 'Logout realizado com sucesso'}), 200
+    """Endpoint de logout: revoga o token em todos os workers"""
+    try:
+        revoke_token(get_jwt())
+        db.session.commit()
+        return jsonify({'message': 'Logout realizado com sucesso'}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
 
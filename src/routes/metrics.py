@@ -0,0 +1,44 @@
+import hmac
+from flask import Blueprint, Response, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_current_user
+from src.extensions import limiter
+from src.utils.metrics import export
+
+metrics_bp = Blueprint('metrics', __name__)
+
+def require_admin():
+    """Decorator para verificar se o usuário é admin
+
+    Aceita também `Authorization: Bearer <METRICS_TOKEN>`, para o Prometheus
+    coletar sem um JWT (que expira).
+    """
+    def decorator(f):
+        from functools import wraps
+        @jwt_required()
+        def admin_only(*args, **kwargs):
+            # Papel atual do usuário (cache do worker), não o gravado no token
+            if get_current_user().role != 'admin':
+                return jsonify({'error': 'Acesso negado'}), 403
+            return f(*args, **kwargs)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Sem METRICS_TOKEN (ou vazio) só o JWT de admin é aceito. A
+            # comparação é em bytes: com str, compare_digest rejeita não-ASCII
+            token = current_app.config.get('METRICS_TOKEN')
+            authorization = request.headers.get('Authorization', '').encode('utf-8')
+            if token and hmac.compare_digest(authorization, f'Bearer {token}'.encode('utf-8')):
+                return f(*args, **kwargs)
+            return admin_only(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+@metrics_bp.route('/metrics', methods=['GET'])
+@limiter.exempt  # coletado a cada poucos segundos
+@require_admin()
+def get_metrics():
+    """Métricas de todos os workers no formato de texto do Prometheus"""
+    try:
+        return Response(export(), content_type='text/plain; version=0.0.4; charset=utf-8')
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
@@ -1,25 +1,26 @@
-from flask import Blueprint, request, jsonify, send_from_directory
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_current_user
+from werkzeug.exceptions import HTTPException, NotFound
 from werkzeug.utils import secure_filename
-from PIL import Image
-import magic
 import os
-import uuid
 from datetime import datetime
-from src.models.vehicle import Vehicle, VehicleImage, db
+from src.models.db import db
+from src.models.vehicle import Vehicle, VehicleImage
+from src.models.image_job import ImageJob
+from src.models.cache import bump_cache_version
+from src.utils.images import (
+    UPLOAD_FOLDER, allowed_file, check_upload, validate_image_file, process_image,
+    process_image_bytes, file_hash, find_processed, references_lock, confirm_processed,
+    MODERN_FORMATS, variant_filename, related_filenames
+)
+from src.utils.image_jobs import (
+    create_image_job, dispatch_image_job, resume_if_stale, job_progress, get_image_executor
+)
+from src.utils.delivery import send_upload
+from src.utils.mutations import apply_vehicle_operations
 
 uploads_bp = Blueprint('uploads', __name__)
 
-# Configurações de upload
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
-ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
-MAX_IMAGE_DIMENSION = 2048
-
-# Criar diretório de uploads se não existir
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
 def require_admin():
     """Decorator para verificar se o usuário é admin"""
     def decorator(f):
@@ -27,79 +28,34 @@ def require_admin():
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            claims = get_jwt()
-            if claims.get('role') != 'admin':
+            # Papel atual do usuário (cache do worker), não o gravado no token
+            if get_current_user().role != 'admin':
                 return jsonify({'error': 'Acesso negado'}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
-def allowed_file(filename):
-    """Verifica se a extensão do arquivo é permitida"""
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def validate_image_file(file):
-    """Valida o arquivo de imagem"""
-    # Verificar tamanho
-    file.seek(0, os.SEEK_END)
-    size = file.tell()
-    if size > MAX_FILE_SIZE:
-        raise ValueError(f'Arquivo muito grande. Máximo permitido: {MAX_FILE_SIZE // (1024*1024)}MB')
-    
-    file.seek(0)
-    
-    # Verificar tipo MIME
-    mime_type = magic.from_buffer(file.read(1024), mime=True)
-    if mime_type not in ALLOWED_MIME_TYPES:
-        raise ValueError('Tipo de arquivo não permitido. Use apenas JPEG, PNG ou WebP')
-    
-    file.seek(0)
-    
-    # Verificar se é uma imagem válida
-    try:
-        with Image.open(file) as img:
-            # Verificar dimensões
-            if img.width > MAX_IMAGE_DIMENSION or img.height > MAX_IMAGE_DIMENSION:
-                raise ValueError(f'Imagem muito grande. Máximo: {MAX_IMAGE_DIMENSION}x{MAX_IMAGE_DIMENSION} pixels')
-            
-            # Verificar se não é um arquivo malicioso
-            img.verify()
-    except Exception as e:
-        raise ValueError('Arquivo de imagem inválido ou corrompido')
-    
-    file.seek(0)
+def remove_unreferenced_files(filename):
+    """Remove os arquivos de uma imagem se nenhum VehicleImage ainda a usa"""
+    # Contagem e remoção sob a trava: nenhum worker referencia o arquivo no meio
+    with references_lock():
+        if VehicleImage.query.filter_by(filename=filename).count():
+            return False
+        
+        # Original, thumbnail e variantes WebP/AVIF
+        for name in related_filenames(filename):
+            try:
+                os.remove(os.path.join(UPLOAD_FOLDER, name))
+            except OSError:
+                pass  # Arquivo pode não existir
     return True
 
-def process_image(file, vehicle_id):
-    """Processa e salva a imagem"""
-    # Gerar nome único
-    file_extension = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{uuid.uuid4().hex}.jpg"  # Sempre salvar como JPEG
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    
-    # Processar imagem
-    with Image.open(file) as img:
-        # Converter para RGB se necessário
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Redimensionar mantendo proporção se necessário
-        if img.width > 1200 or img.height > 800:
-            img.thumbnail((1200, 800), Image.Resampling.LANCZOS)
-        
-        # Salvar com qualidade otimizada
-        img.save(filepath, 'JPEG', quality=85, optimize=True)
-    
-    # Gerar thumbnail
-    thumbnail_filename = f"thumb_{filename}"
-    thumbnail_path = os.path.join(UPLOAD_FOLDER, thumbnail_filename)
-    
-    with Image.open(filepath) as img:
-        img.thumbnail((300, 200), Image.Resampling.LANCZOS)
-        img.save(thumbnail_path, 'JPEG', quality=80, optimize=True)
-    
-    return filename, thumbnail_filename, os.path.getsize(filepath)
+def wants_async():
+    """Upload assíncrono via ?async=1 (ou por padrão com IMAGE_PROCESSING_ASYNC)"""
+    value = request.args.get('async', request.form.get('async'))
+    if value is None:
+        return current_app.config.get('IMAGE_PROCESSING_ASYNC', False)
+    return value.lower() in ('1', 'true', 'yes')
 
 @uploads_bp.route('/admin/vehicles/<int:vehicle_id>/upload', methods=['POST'])
 @require_admin()
@@ -122,31 +78,41 @@ def upload_vehicle_image(vehicle_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'Tipo de arquivo não permitido'}), 400
         
-        # Validar arquivo
-        validate_image_file(file)
-        
-        # Processar e salvar imagem
-        filename, thumbnail_filename, file_size = process_image(file, vehicle_id)
-        
-        # Salvar informações no banco
-        vehicle_image = VehicleImage(
-            vehicle_id=vehicle_id,
-            filename=filename,
-            original_filename=secure_filename(file.filename),
-            file_path=os.path.join(UPLOAD_FOLDER, filename),
-            file_size=file_size,
-            mime_type='image/jpeg',
-            image_order=len(vehicle.vehicle_images)
-        )
+        # Conteúdo já processado antes (ex.: anúncio copiado) é apenas referenciado
+        content_hash = file_hash(file)
+        processed = find_processed(content_hash)
         
-        db.session.add(vehicle_image)
+        # Modo assíncrono: salva o arquivo bruto e processa no pool de imagens
+        if processed is None and wants_async():
+            check_upload(file)
+            job = create_image_job(vehicle_id, file)
+            dispatch_image_job(job.id)
+            return jsonify({
+                'message': 'Imagem recebida, processamento em andamento',
+                'job': job.to_dict()
+            }), 202
         
-        # Atualizar lista de imagens do veículo
-        current_images = vehicle.get_imagens()
-        current_images.append(f'/api/uploads/{filename}')
-        vehicle.set_imagens(current_images)
+        if processed is None:
+            # Validar arquivo
+            validate_image_file(file)
+            
+            # Processar e salvar imagem
+            processed = process_image(file, content_hash)
         
-        db.session.commit()
+        # Arquivos confirmados e registro gravado sem um DELETE concorrente no meio
+        with references_lock():
+            filename, thumbnail_filename, file_size = confirm_processed(processed, file)
+            
+            # Salvar informações no banco e atualizar lista de imagens do veículo
+            vehicle_image = vehicle.add_image(
+                filename=filename,
+                original_filename=secure_filename(file.filename),
+                file_path=os.path.join(UPLOAD_FOLDER, filename),
+                file_size=file_size
+            )
+            
+            bump_cache_version()
+            db.session.commit()
         
         return jsonify({
             'message': 'Imagem enviada com sucesso',
@@ -160,6 +126,111 @@ def upload_vehicle_image(vehicle_id):
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@uploads_bp.route('/admin/vehicles/<int:vehicle_id>/upload/batch', methods=['POST'])
+@require_admin()
+def upload_vehicle_images_batch(vehicle_id):
+    """Upload de várias imagens, processadas em paralelo e gravadas numa transação"""
+    try:
+        # O lote pode ultrapassar o limite de um upload individual
+        request.max_content_length = current_app.config.get('BATCH_UPLOAD_MAX_CONTENT_LENGTH')
+        
+        vehicle = Vehicle.query.get(vehicle_id)
+        if not vehicle:
+            return jsonify({'error': 'Veículo não encontrado'}), 404
+        
+        files = [file for file in request.files.getlist('images') if file.filename]
+        if not files:
+            return jsonify({'error': 'Nenhum arquivo enviado'}), 400
+        
+        max_files = current_app.config.get('BATCH_UPLOAD_MAX_FILES', 30)
+        if len(files) > max_files:
+            return jsonify({'error': f'Máximo de {max_files} arquivos por envio'}), 400
+        
+        # Verificações baratas aqui; decodificação e redimensionamento no pool.
+        # Conteúdos repetidos (no lote ou já em disco) não são reprocessados.
+        executor = get_image_executor()
+        submitted = {}
+        results = []
+        for file in files:
+            result = {'filename': secure_filename(file.filename), 'success': False}
+            results.append(result)
+            try:
+                if not allowed_file(file.filename):
+                    raise ValueError('Tipo de arquivo não permitido')
+                check_upload(file)
+                content_hash = file_hash(file)
+                existing = find_processed(content_hash)
+                if existing is not None:
+                    result['processed'] = existing
+                else:
+                    if content_hash not in submitted:
+                        submitted[content_hash] = executor.submit(process_image_bytes, file.read())
+                    result['future'] = submitted[content_hash]
+            except ValueError as e:
+                result['error'] = str(e)
+        
+        processed = []
+        for file, result in zip(files, results):
+            future = result.pop('future', None)
+            existing = result.pop('processed', None)
+            if existing is not None:
+                processed.append((result, file, existing))
+            if future is None:
+                continue
+            try:
+                processed.append((result, file, future.result()))
+            except ValueError as e:
+                result['error'] = str(e)
+            except Exception:
+                result['error'] = 'Erro ao processar imagem'
+        
+        # Uma única transação para todos os VehicleImage e a lista de URLs
+        try:
+            with references_lock():
+                for index, (result, file, files_processed) in enumerate(processed):
+                    files_processed = confirm_processed(files_processed, file)
+                    processed[index] = (result, file, files_processed)
+                    filename, thumbnail_filename, file_size = files_processed
+                    vehicle_image = vehicle.add_image(
+                        filename=filename,
+                        original_filename=result['filename'],
+                        file_path=os.path.join(UPLOAD_FOLDER, filename),
+                        file_size=file_size
+                    )
+                    result.update({
+                        'success': True,
+                        'image': vehicle_image,
+                        'url': f'/api/uploads/{filename}',
+                        'thumbnail_url': f'/api/uploads/{thumbnail_filename}'
+                    })
+                
+                if processed:
+                    bump_cache_version()
+                    db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for _, _, (filename, _, _) in processed:
+                remove_unreferenced_files(filename)
+            raise
+        
+        for result in results:
+            if result['success']:
+                result['image'] = result['image'].to_dict()
+        
+        succeeded = sum(1 for result in results if result['success'])
+        return jsonify({
+            'message': f'{succeeded} de {len(results)} imagens enviadas com sucesso',
+            'results': results
+        }), 201 if succeeded else 400
+        
+    except HTTPException:
+        # Lote acima de BATCH_UPLOAD_MAX_CONTENT_LENGTH: 413 do handler do app
+        raise
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @uploads_bp.route('/admin/images/<int:image_id>', methods=['DELETE'])
 @require_admin()
 def delete_vehicle_image(image_id):
@@ -170,41 +241,67 @@ def delete_vehicle_image(image_id):
             return jsonify({'error': 'Imagem não encontrada'}), 404
         
         vehicle = vehicle_image.vehicle
-        
-        # Remover arquivos do disco
-        try:
-            if os.path.exists(vehicle_image.file_path):
-                os.remove(vehicle_image.file_path)
-            
-            # Remover thumbnail
-            thumbnail_path = os.path.join(UPLOAD_FOLDER, f"thumb_{vehicle_image.filename}")
-            if os.path.exists(thumbnail_path):
-                os.remove(thumbnail_path)
-        except OSError:
-            pass  # Arquivo pode não existir
+        filename = vehicle_image.filename
         
         # Atualizar lista de imagens do veículo
         current_images = vehicle.get_imagens()
-        image_url = f'/api/uploads/{vehicle_image.filename}'
+        image_url = f'/api/uploads/{filename}'
         if image_url in current_images:
             current_images.remove(image_url)
             vehicle.set_imagens(current_images)
         
         # Remover do banco
         db.session.delete(vehicle_image)
+        bump_cache_version()
         db.session.commit()
         
+        # Arquivos são compartilhados entre registros com o mesmo conteúdo;
+        # só saem do disco quando a última referência é removida
+        remove_unreferenced_files(filename)
+        
         return jsonify({'message': 'Imagem removida com sucesso'}), 200
         
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@uploads_bp.route('/admin/image-jobs/<job_id>', methods=['GET'])
+@require_admin()
+def get_image_job(job_id):
+    """Status de um processamento assíncrono de imagem"""
+    try:
+        job = ImageJob.query.get(job_id)
+        if not job:
+            return jsonify({'error': 'Job não encontrado'}), 404
+        
+        # Jobs abandonados (ex.: worker reiniciado) são retomados na consulta
+        if resume_if_stale(job):
+            db.session.refresh(job)
+        
+        return jsonify({'job': job.to_dict(job_progress(job))}), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
 @uploads_bp.route('/uploads/<filename>')
 def serve_upload(filename):
-    """Serve arquivos de upload"""
+    """Serve arquivos de upload, preferindo AVIF/WebP quando o cliente aceita"""
     try:
-        return send_from_directory(UPLOAD_FOLDER, filename)
-    except FileNotFoundError:
+        if not filename.endswith('.jpg'):
+            return send_upload(UPLOAD_FOLDER, filename)
+        
+        # Só conta o que o cliente declara explicitamente (*/* não basta)
+        accepted = {mimetype for mimetype, quality in request.accept_mimetypes if quality > 0}
+        chosen = filename
+        for extension, _, mimetype, _ in MODERN_FORMATS:
+            variant = variant_filename(filename, extension)
+            if mimetype in accepted and os.path.isfile(os.path.join(UPLOAD_FOLDER, variant)):
+                chosen = variant
+                break
+        
+        response = send_upload(UPLOAD_FOLDER, chosen)
+        response.vary.add('Accept')
+        return response
+    except NotFound:
         return jsonify({'error': 'Arquivo não encontrado'}), 404
 
 @uploads_bp.route('/admin/vehicles/<int:vehicle_id>/images', methods=['GET'])
@@ -237,19 +334,12 @@ def reorder_vehicle_images(vehicle_id):
         data = request.get_json()
         image_ids = data.get('image_ids', [])
         
-        if not isinstance(image_ids, list):
-            return jsonify({'error': 'Lista de IDs de imagens inválida'}), 400
-        
-        # Atualizar ordem das imagens
-        for index, image_id in enumerate(image_ids):
-            image = VehicleImage.query.filter_by(id=image_id, vehicle_id=vehicle_id).first()
-            if image:
-                image.image_order = index
-        
-        # Atualizar lista de URLs no veículo
-        images = VehicleImage.query.filter_by(vehicle_id=vehicle_id).order_by(VehicleImage.image_order).all()
-        image_urls = [f'/api/uploads/{img.filename}' for img in images]
-        vehicle.set_imagens(image_urls)
+        # Uma única atualização (CASE) para as imagens e a lista de URLs
+        result, = apply_vehicle_operations(
+            [{'op': 'reorder_images', 'id': vehicle_id, 'image_ids': image_ids}], None
+        )
+        if result['status'] != 'ok':
+            return jsonify({'error': result['error']}), 400
         
         db.session.commit()
         
@@ -1,13 +1,29 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_current_user
 from marshmallow import Schema, fields, ValidationError, validate
-from src.models.vehicle import Vehicle, db
-from src.models.user import User
-from sqlalchemy import or_, and_
+from src.models.db import db, use_read_replica
+from src.models.vehicle import Vehicle
+from src.models.search import search_enabled, build_match_query, search_subquery
+from src.models.cache import bump_cache_version, get_cache_version
+from src.models.stats import get_stat_counts, get_daily_history
+from src.utils.pagination import keyset_paginate, CURSOR_SORT_KEYS
+from src.utils.facets import parse_facets, compute_facets, catalog_facets
+from src.utils.cache import cached_response, cache_key
+from src.utils.http import make_etag, is_not_modified, not_modified, set_validators
+from src.utils.serialization import vehicles_response, vehicle_response
+from src.utils.fields import parse_fields, load_fields
+from src.utils.mutations import apply_vehicle_operations
+from src.utils.inventory import ImportReport, detect_format, read_rows, import_vehicles, export_vehicles
+from sqlalchemy import false, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import HTTPException
+import csv
+import io
 
 vehicles_bp = Blueprint('vehicles', __name__)
 
 class VehicleSchema(Schema):
+    external_id = fields.Str(validate=validate.Length(min=1, max=100))
     marca = fields.Str(required=True, validate=validate.Length(min=2, max=100))
     modelo = fields.Str(required=True, validate=validate.Length(min=2, max=100))
     ano = fields.Int(required=True, validate=validate.Range(min=1900, max=2030))
@@ -27,106 +43,183 @@ def require_admin():
         @wraps(f)
         @jwt_required()
         def decorated_function(*args, **kwargs):
-            claims = get_jwt()
-            if claims.get('role') != 'admin':
+            # Papel atual do usuário (cache do worker), não o gravado no token
+            if get_current_user().role != 'admin':
                 return jsonify({'error': 'Acesso negado'}), 403
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+# Parâmetros que restringem o conjunto de veículos listados
+FILTER_PARAMS = (
+    'marca', 'modelo', 'ano_min', 'ano_max', 'preco_min', 'preco_max',
+    'combustivel', 'categoria', 'search'
+)
+
+def build_vehicles_query(args):
+    """Monta a query de veículos ativos a partir dos filtros da requisição
+
+    Retorna (query, fts), onde fts é a subquery de busca textual (ou None).
+    """
+    # Parâmetros de filtro
+    marca = args.get('marca')
+    modelo = args.get('modelo')
+    ano_min = args.get('ano_min', type=int)
+    ano_max = args.get('ano_max', type=int)
+    preco_min = args.get('preco_min', type=float)
+    preco_max = args.get('preco_max', type=float)
+    combustivel = args.get('combustivel')
+    categoria = args.get('categoria')
+    search = args.get('search')
+    
+    # Query base
+    query = Vehicle.query.filter_by(is_active=True)
+    
+    # Aplicar filtros
+    if marca:
+        query = query.filter(Vehicle.marca.ilike(f'%{marca}%'))
+    if modelo:
+        query = query.filter(Vehicle.modelo.ilike(f'%{modelo}%'))
+    if ano_min:
+        query = query.filter(Vehicle.ano >= ano_min)
+    if ano_max:
+        query = query.filter(Vehicle.ano <= ano_max)
+    if preco_min:
+        query = query.filter(Vehicle.preco >= preco_min)
+    if preco_max:
+        query = query.filter(Vehicle.preco <= preco_max)
+    if combustivel:
+        query = query.filter(Vehicle.combustivel == combustivel)
+    if categoria:
+        query = query.filter(Vehicle.categoria == categoria)
+    fts = None
+    if search and search_enabled():
+        # Busca pelo índice FTS5 (sem acentos, ordenada por relevância)
+        match_query = build_match_query(search)
+        if match_query:
+            fts = search_subquery(match_query)
+            query = query.join(fts, fts.c.vehicle_id == Vehicle.id)
+        else:
+            # Busca sem nenhuma palavra pesquisável (ex.: só pontuação): nada casa
+            query = query.filter(false())
+    elif search:
+        search_filter = or_(
+            Vehicle.marca.ilike(f'%{search}%'),
+            Vehicle.modelo.ilike(f'%{search}%'),
+            Vehicle.descricao.ilike(f'%{search}%')
+        )
+        query = query.filter(search_filter)
+    
+    return query, fts
+
+def wants_total(args):
+    """No modo cursor o total só é calculado se o cliente pedir"""
+    return args.get('include_total', '').lower() in ('1', 'true', 'yes')
+
 # Rotas públicas (sem autenticação)
 @vehicles_bp.route('/vehicles', methods=['GET'])
+@use_read_replica
+@cached_response()
 def get_vehicles():
-    """Lista veículos ativos com filtros e paginação"""
+    """Lista veículos ativos com filtros e paginação (por página ou por cursor)"""
     try:
-        # Parâmetros de filtro
-        marca = request.args.get('marca')
-        modelo = request.args.get('modelo')
-        ano_min = request.args.get('ano_min', type=int)
-        ano_max = request.args.get('ano_max', type=int)
-        preco_min = request.args.get('preco_min', type=float)
-        preco_max = request.args.get('preco_max', type=float)
-        combustivel = request.args.get('combustivel')
-        categoria = request.args.get('categoria')
-        search = request.args.get('search')
+        query, fts = build_vehicles_query(request.args)
+        facet_names = parse_facets(request.args.get('facets', '')) if request.args.get('facets') else []
+        selected_fields = parse_fields(request.args.get('fields'))
+        
+        # Validador do GET condicional sem consultar os veículos: toda escrita
+        # no catálogo incrementa a versão (a mesma que invalida o cache)
+        etag = make_etag('vehicles', get_cache_version(), cache_key())
+        if is_not_modified(etag):
+            return not_modified(etag)
         
         # Parâmetros de paginação
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 12, type=int), 50)  # Máximo 50 por página
         
-        # Query base
-        query = Vehicle.query.filter_by(is_active=True)
-        
-        # Aplicar filtros
-        if marca:
-            query = query.filter(Vehicle.marca.ilike(f'%{marca}%'))
-        if modelo:
-            query = query.filter(Vehicle.modelo.ilike(f'%{modelo}%'))
-        if ano_min:
-            query = query.filter(Vehicle.ano >= ano_min)
-        if ano_max:
-            query = query.filter(Vehicle.ano <= ano_max)
-        if preco_min:
-            query = query.filter(Vehicle.preco >= preco_min)
-        if preco_max:
-            query = query.filter(Vehicle.preco <= preco_max)
-        if combustivel:
-            query = query.filter(Vehicle.combustivel == combustivel)
-        if categoria:
-            query = query.filter(Vehicle.categoria == categoria)
-        if search:
-            search_filter = or_(
-                Vehicle.marca.ilike(f'%{search}%'),
-                Vehicle.modelo.ilike(f'%{search}%'),
-                Vehicle.descricao.ilike(f'%{search}%')
-            )
-            query = query.filter(search_filter)
-        
         # Ordenação
         sort_by = request.args.get('sort_by', 'created_at')
         sort_order = request.args.get('sort_order', 'desc')
         
-        if hasattr(Vehicle, sort_by):
-            if sort_order == 'asc':
-                query = query.order_by(getattr(Vehicle, sort_by).asc())
-            else:
-                query = query.order_by(getattr(Vehicle, sort_by).desc())
-        
-        # Paginação
-        pagination = query.paginate(
-            page=page, 
-            per_page=per_page, 
-            error_out=False
-        )
-        
-        vehicles = [vehicle.to_dict() for vehicle in pagination.items]
-        
-        return jsonify({
-            'vehicles': vehicles,
-            'pagination': {
+        # Modo cursor (?cursor= vazio inicia na primeira página)
+        if 'cursor' in request.args:
+            # A coluna de ordenação é lida dos itens para montar o próximo cursor
+            sort_columns = [sort_by] if sort_by in CURSOR_SORT_KEYS else []
+            items, pagination = keyset_paginate(
+                load_fields(query, selected_fields, *sort_columns), Vehicle, sort_by, sort_order, per_page,
+                cursor=request.args.get('cursor'),
+                include_total=wants_total(request.args)
+            )
+        else:
+            if fts is not None and 'sort_by' not in request.args:
+                # Sem ordenação explícita, resultados mais relevantes primeiro
+                query = query.order_by(fts.c.score.asc(), Vehicle.created_at.desc())
+            elif hasattr(Vehicle, sort_by):
+                if sort_order == 'asc':
+                    query = query.order_by(getattr(Vehicle, sort_by).asc())
+                else:
+                    query = query.order_by(getattr(Vehicle, sort_by).desc())
+            
+            # Paginação
+            page_result = load_fields(query, selected_fields).paginate(
+                page=page, 
+                per_page=per_page, 
+                error_out=False
+            )
+            items = page_result.items
+            pagination = {
                 'page': page,
                 'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
+                'total': page_result.total,
+                'pages': page_result.pages,
+                'has_next': page_result.has_next,
+                'has_prev': page_result.has_prev
             }
-        }), 200
         
+        result = {'pagination': pagination}
+        
+        # Facetas para a barra de filtros (opcional: ?facets=marca,preco ou ?facets=all)
+        if facet_names:
+            if any(request.args.get(name) for name in FILTER_PARAMS):
+                result['facets'] = compute_facets(query, facet_names)
+            else:
+                result['facets'] = catalog_facets(facet_names)
+        
+        response = vehicles_response(items, selected_fields, **result)
+        return set_validators(response, etag), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
 @vehicles_bp.route('/vehicles/<int:vehicle_id>', methods=['GET'])
+@use_read_replica
+@cached_response()
 def get_vehicle(vehicle_id):
     """Retorna detalhes de um veículo específico"""
     try:
-        vehicle = Vehicle.query.filter_by(id=vehicle_id, is_active=True).first()
+        selected_fields = parse_fields(request.args.get('fields'))
         
-        if not vehicle:
+        # Só o updated_at é lido antes de decidir se o corpo precisa ser montado
+        last_modified = db.session.query(Vehicle.updated_at).filter_by(
+            id=vehicle_id, is_active=True
+        ).first()
+        
+        if not last_modified:
             return jsonify({'error': 'Veículo não encontrado'}), 404
         
-        return jsonify({'vehicle': vehicle.to_dict()}), 200
+        last_modified = last_modified[0]
+        etag = make_etag('vehicle', vehicle_id, last_modified.isoformat() if last_modified else None, selected_fields)
+        if is_not_modified(etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        vehicle = load_fields(Vehicle.query, selected_fields).filter_by(id=vehicle_id).first()
+        response = vehicle_response(vehicle, selected_fields)
+        return set_validators(response, etag, last_modified), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -138,27 +231,34 @@ def get_admin_vehicles():
     try:
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        selected_fields = parse_fields(request.args.get('fields'))
+        query = load_fields(Vehicle.query, selected_fields, 'created_at')
+        
+        if 'cursor' in request.args:
+            items, pagination = keyset_paginate(
+                query, Vehicle, 'created_at', 'desc', per_page,
+                cursor=request.args.get('cursor'),
+                include_total=wants_total(request.args)
+            )
+            return vehicles_response(items, selected_fields, pagination=pagination), 200
         
-        pagination = Vehicle.query.order_by(Vehicle.created_at.desc()).paginate(
+        pagination = query.order_by(Vehicle.created_at.desc()).paginate(
             page=page, 
             per_page=per_page, 
             error_out=False
         )
         
-        vehicles = [vehicle.to_dict() for vehicle in pagination.items]
-        
-        return jsonify({
-            'vehicles': vehicles,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'has_next': pagination.has_next,
-                'has_prev': pagination.has_prev
-            }
+        return vehicles_response(pagination.items, selected_fields, pagination={
+            'page': page,
+            'per_page': per_page,
+            'total': pagination.total,
+            'pages': pagination.pages,
+            'has_next': pagination.has_next,
+            'has_prev': pagination.has_prev
         }), 200
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -171,6 +271,7 @@ def create_vehicle():
         data = schema.load(request.get_json() or {})
         
         vehicle = Vehicle(
+            external_id=data.get('external_id'),
             marca=data['marca'],
             modelo=data['modelo'],
             ano=data['ano'],
@@ -188,6 +289,7 @@ def create_vehicle():
             vehicle.set_imagens(data['imagens'])
         
         db.session.add(vehicle)
+        bump_cache_version()
         db.session.commit()
         
         return jsonify({
@@ -197,6 +299,9 @@ def create_vehicle():
         
     except ValidationError as e:
         return jsonify({'errors': e.messages}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Já existe um veículo com este external_id'}), 409
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -224,11 +329,14 @@ def update_vehicle(vehicle_id):
         vehicle.cor = data.get('cor')
         vehicle.quilometragem = data.get('quilometragem', 0)
         vehicle.categoria = data.get('categoria')
+        if 'external_id' in data:
+            vehicle.external_id = data['external_id']
         
         # Atualizar imagens se fornecidas
         if 'imagens' in data:
             vehicle.set_imagens(data['imagens'])
         
+        bump_cache_version()
         db.session.commit()
         
         return jsonify({
@@ -238,6 +346,9 @@ def update_vehicle(vehicle_id):
         
     except ValidationError as e:
         return jsonify({'errors': e.messages}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Já existe um veículo com este external_id'}), 409
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
@@ -253,6 +364,7 @@ def delete_vehicle(vehicle_id):
         
         # Soft delete
         vehicle.is_active = False
+        bump_cache_version()
         db.session.commit()
         
         return jsonify({'message': 'Veículo excluído com sucesso'}), 200
@@ -260,33 +372,104 @@ def delete_vehicle(vehicle_id):
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
 
+@vehicles_bp.route('/admin/vehicles/batch', methods=['POST'])
+@require_admin()
+def batch_update_vehicles():
+    """Aplica várias operações (atualização parcial, exclusão, reativação, ordem das imagens) numa transação"""
+    try:
+        data = request.get_json(silent=True) or {}
+        operations = data.get('operations')
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'Informe a lista de operações'}), 400
+        
+        max_operations = current_app.config.get('BATCH_MUTATION_MAX_OPERATIONS', 500)
+        if len(operations) > max_operations:
+            return jsonify({'error': f'Máximo de {max_operations} operações por envio'}), 400
+        
+        schema = VehicleSchema(partial=True, exclude=('external_id',))
+        results = apply_vehicle_operations(operations, schema)
+        db.session.commit()
+        
+        succeeded = sum(1 for result in results if result['status'] == 'ok')
+        return jsonify({
+            'results': results,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded
+        }), 200 if succeeded else 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Erro interno do servidor'}), 500
+
+@vehicles_bp.route('/admin/vehicles/import', methods=['POST'])
+@require_admin()
+def import_vehicles_feed():
+    """Importa veículos em lote (CSV ou NDJSON), como arquivo `file` ou corpo da requisição"""
+    report = ImportReport()
+    try:
+        request.max_content_length = current_app.config.get('IMPORT_MAX_CONTENT_LENGTH')
+        batch_size = min(request.args.get('batch_size', current_app.config.get('IMPORT_BATCH_SIZE', 500), type=int), 5000)
+        if batch_size < 1:
+            return jsonify({'error': 'batch_size deve ser positivo'}), 400
+        
+        upload = request.files.get('file') if request.mimetype == 'multipart/form-data' else None
+        if upload:
+            format_name = detect_format(request.args.get('format'), filename=upload.filename)
+            stream = upload.stream
+        else:
+            format_name = detect_format(request.args.get('format'), mimetype=request.mimetype)
+            stream = request.stream
+        
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+        import_vehicles(read_rows(text, format_name), VehicleSchema(), batch_size, report)
+        return jsonify(report.to_dict()), 200
+        
+    except HTTPException:
+        # Corpo acima de IMPORT_MAX_CONTENT_LENGTH: 413 do handler do app
+        raise
+    except UnicodeDecodeError:
+        return jsonify({'error': 'O arquivo deve estar em UTF-8', **report.to_dict()}), 400
+    except (ValueError, csv.Error) as e:
+        return jsonify({'error': str(e), **report.to_dict()}), 400
+    except Exception as e:
+        return jsonify({'error': 'Erro interno do servidor', **report.to_dict()}), 500
+
+@vehicles_bp.route('/admin/vehicles/export', methods=['GET'])
+@require_admin()
+def export_vehicles_feed():
+    """Exporta todo o estoque (CSV ou NDJSON) em fluxo"""
+    try:
+        format_name = detect_format(request.args.get('format', 'csv'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    mimetype = 'text/csv' if format_name == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(export_vehicles(format_name)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=veiculos.{format_name}'
+    return response
+
 @vehicles_bp.route('/admin/dashboard/stats', methods=['GET'])
 @require_admin()
 def get_dashboard_stats():
-    """Retorna estatísticas para o dashboard administrativo"""
+    """Retorna estatísticas para o dashboard administrativo
+
+    As contagens vêm dos agregados incrementais (src/models/stats.py);
+    `?days=N` define a janela do histórico diário (padrão 30, máximo 365).
+    """
     try:
-        total_vehicles = Vehicle.query.filter_by(is_active=True).count()
-        total_inactive = Vehicle.query.filter_by(is_active=False).count()
-        
-        # Estatísticas por categoria
-        categories = db.session.query(
-            Vehicle.categoria, 
-            db.func.count(Vehicle.id)
-        ).filter_by(is_active=True).group_by(Vehicle.categoria).all()
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
         
-        # Estatísticas por marca
-        brands = db.session.query(
-            Vehicle.marca, 
-            db.func.count(Vehicle.id)
-        ).filter_by(is_active=True).group_by(Vehicle.marca).all()
+        status = {stat.value: stat.count for stat in get_stat_counts('status')}
+        categories = get_stat_counts('categoria')
+        brands = get_stat_counts('marca')
         
         return jsonify({
-            'total_vehicles': total_vehicles,
-            'total_inactive': total_inactive,
-            'categories': [{'name': cat[0], 'count': cat[1]} for cat in categories if cat[0]],
-            'brands': [{'name': brand[0], 'count': brand[1]} for brand in brands if brand[0]]
+            'total_vehicles': status.get('active', 0),
+            'total_inactive': status.get('inactive', 0),
+            'categories': [{'name': stat.value, 'count': stat.count} for stat in categories],
+            'brands': [{'name': stat.value, 'count': stat.count} for stat in brands],
+            'history': get_daily_history(days)
         }), 200
         
     except Exception as e:
         return jsonify({'error': 'Erro interno do servidor'}), 500
-
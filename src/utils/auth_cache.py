@@ -0,0 +1,169 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from src.models.db import db
+from src.models.user import User
+from src.models.auth_event import AuthEvent, TOKEN_REVOKED, USER_CHANGED
+
+# Estado de autenticação em memória, por worker: os `jti` revogados e os
+# usuários autenticados recentemente. As verificações de @jwt_required são
+# consultas O(1) a esses dicionários; o banco só é lido para buscar os
+# eventos novos (no máximo a cada AUTH_REVOCATION_REFRESH_INTERVAL
+# segundos) e para carregar um usuário fora do cache.
+#
+# Os eventos são lidos por created_at com uma margem de sobreposição, para
+# não perder um evento gravado por uma transação que terminou depois da
+# leitura anterior. Aplicar o mesmo evento duas vezes não tem efeito.
+
+DEFAULT_REFRESH_INTERVAL = 2    # segundos entre leituras de eventos novos
+DEFAULT_PRINCIPAL_TTL = 30      # segundos que um usuário fica em cache
+MAX_PRINCIPALS = 1000
+REFRESH_OVERLAP = timedelta(seconds=5)
+PRUNE_INTERVAL = 60
+USER_EVENT_RETENTION = timedelta(days=1)
+
+# Mudanças no usuário que alteram o que o token autoriza
+PRINCIPAL_FIELDS = ('role', 'is_active')
+
+class Principal:
+    """Usuário autenticado, desacoplado da sessão do banco"""
+
+    def __init__(self, user):
+        self.id = user.id
+        self.email = user.email
+        self.role = user.role
+        self.is_active = user.is_active
+        self._data = user.to_dict()
+
+    def to_dict(self):
+        return dict(self._data)
+
+class AuthState:
+    """Tokens revogados e usuários em cache de um worker"""
+
+    def __init__(self, refresh_interval=DEFAULT_REFRESH_INTERVAL, principal_ttl=DEFAULT_PRINCIPAL_TTL):
+        self.refresh_interval = refresh_interval
+        self.principal_ttl = principal_ttl
+        self.revoked = {}       # jti -> expiração do token
+        self.principals = {}    # user_id -> (Principal, monotonic do carregamento)
+        self._since = None
+        self._next_refresh = 0.0
+        self._next_prune = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Aplica os eventos gravados desde a última leitura"""
+        if time.monotonic() < self._next_refresh:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_refresh:
+                return
+            self._next_refresh = now + self.refresh_interval
+
+            utcnow = datetime.utcnow()
+            query = db.session.query(AuthEvent.kind, AuthEvent.jti, AuthEvent.user_id, AuthEvent.expires_at)
+            if self._since is None:
+                # Primeira leitura do processo: só os tokens revogados ainda válidos
+                query = query.filter(AuthEvent.kind == TOKEN_REVOKED, AuthEvent.expires_at > utcnow)
+            else:
+                query = query.filter(AuthEvent.created_at >= self._since - REFRESH_OVERLAP)
+            for kind, jti, user_id, expires_at in query:
+                if kind == TOKEN_REVOKED:
+                    self.revoked[jti] = expires_at
+                else:
+                    self.principals.pop(user_id, None)
+            self._since = utcnow
+
+            if now >= self._next_prune:
+                self._next_prune = now + PRUNE_INTERVAL
+                self.revoked = {jti: expires_at for jti, expires_at in self.revoked.items() if expires_at > utcnow}
+
+    def is_revoked(self, jti):
+        self.refresh()
+        return jti in self.revoked
+
+    def principal(self, user_id):
+        """Usuário ativo em cache, carregado do banco se ausente ou expirado"""
+        self.refresh()
+        cached = self.principals.get(user_id)
+        if cached is not None and time.monotonic() - cached[1] < self.principal_ttl:
+            return cached[0]
+
+        user = User.query.get(user_id)
+        if user is None or not user.is_active:
+            self.principals.pop(user_id, None)
+            return None
+
+        principal = Principal(user)
+        if len(self.principals) >= MAX_PRINCIPALS:
+            self.principals.clear()
+        self.principals[user_id] = (principal, time.monotonic())
+        return principal
+
+def get_auth_state():
+    """Retorna o estado de autenticação desta aplicação (um por processo)"""
+    state = current_app.extensions.get('auth_state')
+    if state is None:
+        state = AuthState(
+            current_app.config.get('AUTH_REVOCATION_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL),
+            current_app.config.get('AUTH_PRINCIPAL_TTL', DEFAULT_PRINCIPAL_TTL)
+        )
+        current_app.extensions['auth_state'] = state
+    return state
+
+def is_token_revoked(jti):
+    return get_auth_state().is_revoked(jti)
+
+def get_principal(identity):
+    """Principal do `sub` do token (None se o usuário não existe ou está inativo)"""
+    try:
+        user_id = int(identity)
+    except (TypeError, ValueError):
+        return None
+    return get_auth_state().principal(user_id)
+
+def get_principal_id(jwt_payload):
+    try:
+        return int(jwt_payload.get('sub'))
+    except (TypeError, ValueError):
+        return None
+
+def revoke_token(jwt_payload):
+    """Revoga o token em todos os workers (na transação atual)"""
+    utcnow = datetime.utcnow()
+    expires_at = datetime.utcfromtimestamp(jwt_payload['exp']) if 'exp' in jwt_payload else utcnow + USER_EVENT_RETENTION
+    db.session.add(AuthEvent(
+        kind=TOKEN_REVOKED,
+        jti=jwt_payload['jti'],
+        user_id=get_principal_id(jwt_payload),
+        expires_at=expires_at
+    ))
+    # Eventos que já não importam a nenhum token
+    AuthEvent.query.filter(AuthEvent.expires_at <= utcnow).delete(synchronize_session=False)
+    # Neste worker vale imediatamente
+    get_auth_state().revoked[jwt_payload['jti']] = expires_at
+
+def _principal_changed(user):
+    state = inspect(user)
+    return any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS)
+
+@event.listens_for(Session, 'before_flush')
+def track_user_changes(session, flush_context, instances):
+    """Registra um evento para cada usuário desativado, removido ou com outro papel"""
+    user_ids = {user.id for user in session.dirty if isinstance(user, User) and _principal_changed(user)}
+    user_ids.update(user.id for user in session.deleted if isinstance(user, User))
+    user_ids.discard(None)
+    if not user_ids:
+        return
+
+    expires_at = datetime.utcnow() + USER_EVENT_RETENTION
+    for user_id in user_ids:
+        session.add(AuthEvent(kind=USER_CHANGED, user_id=user_id, expires_at=expires_at))
+    if has_app_context():
+        principals = get_auth_state().principals
+        for user_id in user_ids:
+            principals.pop(user_id, None)
@@ -0,0 +1,154 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request, make_response
+from src.models.cache import CATALOG, get_cache_version
+from src.utils.compression import (
+    should_compress, negotiate_encoding, compress, compression_level, apply_encoding
+)
+
+# Cache de respostas públicas do catálogo, por processo, limitado em bytes
+# com descarte LRU. A validade é controlada pela versão gravada no banco
+# (src/models/cache.py), então escritas feitas por qualquer worker invalidam
+# o cache de todos. As versões comprimidas de cada entrada são guardadas
+# junto dela, então cada página é comprimida uma vez por codificação.
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_ENTRY_BYTES = 1024 * 1024
+
+# Parâmetros cuja presença muda a resposta mesmo quando vazios
+_KEEP_EMPTY_PARAMS = {'cursor'}
+
+class CachedResponse:
+    __slots__ = ('body', 'status', 'headers', 'encoded', 'size')
+
+    def __init__(self, body, status, headers):
+        self.body = body
+        self.status = status
+        self.headers = headers
+        self.encoded = {}  # codificação -> corpo comprimido
+        self.size = len(body)
+
+class ResponseCache:
+    """Cache LRU limitado pelo total de bytes armazenados"""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_entry_bytes=DEFAULT_MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.version = None
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sync_version(self, version):
+        if version != self.version:
+            self._entries.clear()
+            self.size = 0
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._sync_version(version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, version, entry):
+        if entry.size > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._sync_version(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous.size
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def add_encoded(self, key, entry, encoding, body):
+        """Guarda o corpo comprimido de uma entrada que ainda está no cache"""
+        with self._lock:
+            if self._entries.get(key) is not entry or encoding in entry.encoded:
+                return
+            entry.encoded[encoding] = body
+            entry.size += len(body)
+            self.size += len(body)
+            while self.size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+def get_response_cache():
+    """Retorna o cache de respostas desta aplicação (um por processo)"""
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        cache = ResponseCache(
+            max_bytes=current_app.config.get('RESPONSE_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES),
+            max_entry_bytes=current_app.config.get('RESPONSE_CACHE_MAX_ENTRY_BYTES', DEFAULT_MAX_ENTRY_BYTES)
+        )
+        current_app.extensions['response_cache'] = cache
+    return cache
+
+def cache_key():
+    """Chave da requisição: caminho + query string normalizada"""
+    params = sorted(
+        (name, value)
+        for name, value in request.args.items(multi=True)
+        if value != '' or name in _KEEP_EMPTY_PARAMS
+    )
+    return f'{request.path}?{urlencode(params)}'
+
+def encode_from_cache(cache, key, entry, response):
+    """Comprime a resposta reaproveitando o corpo comprimido da entrada"""
+    if not should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding:
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = compress(entry.body, encoding, compression_level(encoding))
+            cache.add_encoded(key, entry, encoding, body)
+        apply_encoding(response, encoding, body)
+    return response
+
+def cached_response(name=CATALOG):
+    """Decorator que guarda respostas 200 de GETs públicos no cache"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('RESPONSE_CACHE_ENABLED', True):
+                return f(*args, **kwargs)
+
+            cache = get_response_cache()
+            key = cache_key()
+            version = get_cache_version(name)
+
+            entry = cache.get(key, version)
+            if entry is not None:
+                response = current_app.response_class(
+                    entry.body, status=entry.status, headers=entry.headers
+                )
+                response.headers['X-Cache'] = 'HIT'
+                encode_from_cache(cache, key, entry, response)
+                # Respostas em cache com ETag também atendem GETs condicionais
+                return response.make_conditional(request)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                headers = [(k, v) for k, v in response.headers.items() if k != 'Content-Length']
+                entry = CachedResponse(response.get_data(), 200, headers)
+                cache.set(key, version, entry)
+                response.headers['X-Cache'] = 'MISS'
+                encode_from_cache(cache, key, entry, response)
+            return response
+        return decorated_function
+    return decorator
@@ -0,0 +1,87 @@
+import gzip
+from flask import current_app, request
+
+# Compressão de respostas (gzip sempre; brotli se o pacote estiver instalado).
+# Arquivos estáticos são pré-comprimidos no nível máximo; respostas JSON são
+# comprimidas na hora, acima de COMPRESSION_MIN_SIZE, com níveis configuráveis.
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional
+    brotli = None
+
+# Em ordem de preferência do servidor
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+# Tipos que valem a pena comprimir (imagens e fontes já são comprimidas)
+COMPRESSIBLE_TYPES = {
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'application/xml', 'image/svg+xml', 'image/x-icon', 'image/vnd.microsoft.icon',
+}
+
+def is_compressible(mimetype):
+    return bool(mimetype) and (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES)
+
+def negotiate_encoding(available=ENCODINGS):
+    """Melhor codificação aceita pelo cliente entre as disponíveis
+
+    Retorna None quando a resposta deve ir sem compressão.
+    """
+    accepted = request.accept_encodings
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = accepted.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(data, encoding, level=None):
+    """Comprime `data`; sem `level` usa o nível máximo (para pré-compressão)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if level is None else level)
+    if encoding == 'gzip':
+        # mtime fixo: o mesmo conteúdo gera sempre os mesmos bytes
+        return gzip.compress(data, compresslevel=9 if level is None else level, mtime=0)
+    raise ValueError(f'Codificação não suportada: {encoding}')
+
+def compression_level(encoding):
+    """Nível configurado para compressão dinâmica"""
+    if encoding == 'br':
+        return current_app.config.get('COMPRESSION_BROTLI_QUALITY', DEFAULT_BROTLI_QUALITY)
+    return current_app.config.get('COMPRESSION_GZIP_LEVEL', DEFAULT_GZIP_LEVEL)
+
+def should_compress(response):
+    """Indica se uma resposta JSON deve ser comprimida dinamicamente"""
+    return (
+        current_app.config.get('COMPRESSION_ENABLED', True)
+        and response.status_code == 200
+        and response.mimetype == 'application/json'
+        and not response.is_streamed
+        and not response.direct_passthrough
+        and 'Content-Encoding' not in response.headers
+        and len(response.get_data()) >= current_app.config.get('COMPRESSION_MIN_SIZE', DEFAULT_MIN_SIZE)
+    )
+
+def apply_encoding(response, encoding, body):
+    """Troca o corpo pela versão comprimida e ajusta ETag e cabeçalhos"""
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        # Cada codificação é uma representação distinta (ver http.is_not_modified)
+        response.set_etag(f'{etag}-{encoding}', weak)
+    return response
+
+def compress_response(response):
+    """Comprime a resposta JSON conforme o Accept-Encoding do cliente"""
+    if not should_compress(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding:
+        apply_encoding(response, encoding, compress(response.get_data(), encoding, compression_level(encoding)))
+    return response
@@ -0,0 +1,52 @@
+import mimetypes
+import os
+from urllib.parse import quote
+from flask import current_app, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+# Entrega dos arquivos de upload. Os nomes são únicos (hash do conteúdo),
+# então o arquivo nunca muda e pode ficar em cache indefinidamente.
+#
+# UPLOADS_DELIVERY_MODE:
+#   'flask'            - o próprio worker envia o arquivo (Range e 304 inclusos)
+#   'x-sendfile'       - Apache com mod_xsendfile envia o caminho em X-Sendfile
+#   'x-accel-redirect' - nginx envia o arquivo da location interna
+#                        UPLOADS_ACCEL_PREFIX (ex.: `location /protected-uploads/ { internal; alias .../uploads/; }`)
+
+DELIVERY_MODES = ('flask', 'x-sendfile', 'x-accel-redirect')
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # 1 ano
+
+# Versões antigas do Python não conhecem o tipo do AVIF
+mimetypes.add_type('image/avif', '.avif')
+
+def set_immutable(response):
+    """Cache público de longa duração, sem revalidação"""
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config.get('UPLOADS_CACHE_MAX_AGE', IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+def send_upload(directory, filename):
+    """Envia um arquivo de upload conforme UPLOADS_DELIVERY_MODE
+
+    Levanta NotFound se o arquivo não existir.
+    """
+    mode = current_app.config.get('UPLOADS_DELIVERY_MODE', 'flask')
+    if mode == 'flask':
+        return set_immutable(send_from_directory(directory, filename, conditional=True))
+
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        raise NotFound()
+
+    # Corpo vazio: o servidor web lê o arquivo e cuida de Range/304
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    response = current_app.response_class(None, mimetype=mimetype, direct_passthrough=True)
+    if mode == 'x-sendfile':
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    else:
+        prefix = current_app.config.get('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
+        response.headers['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{quote(filename)}"
+    return set_immutable(response)
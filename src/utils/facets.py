@@ -0,0 +1,95 @@
+from flask import current_app
+from src.models.db import db
+from src.models.vehicle import Vehicle
+from src.models.cache import get_cache_version
+
+# Contagens por valor (facetas) para a barra de filtros do catálogo.
+# Todas as facetas pedidas saem de um único GROUP BY sobre o conjunto
+# filtrado; sem filtros, o resultado depende só do inventário e fica
+# pré-calculado por versão do catálogo.
+
+FACET_COLUMNS = {
+    'marca': Vehicle.marca,
+    'categoria': Vehicle.categoria,
+    'combustivel': Vehicle.combustivel,
+    'cambio': Vehicle.cambio,
+    'ano': Vehicle.ano,
+}
+
+# Limites superiores (exclusivos) das faixas de preço
+PRICE_BUCKETS = (30000, 50000, 75000, 100000, 150000, 200000, 300000)
+
+FACET_NAMES = tuple(FACET_COLUMNS) + ('preco',)
+
+def parse_facets(value):
+    """Converte o parâmetro `facets` em uma lista de nomes válidos"""
+    if value in ('1', 'true', 'all'):
+        return list(FACET_NAMES)
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    invalid = [name for name in names if name not in FACET_NAMES]
+    if invalid:
+        raise ValueError(f"Faceta inválida: {', '.join(invalid)}")
+    return names
+
+def price_bucket():
+    """Índice da faixa de preço de cada veículo"""
+    return db.case(
+        *[(Vehicle.preco < limit, index) for index, limit in enumerate(PRICE_BUCKETS)],
+        else_=len(PRICE_BUCKETS)
+    )
+
+def _bucket_bounds(index):
+    low = PRICE_BUCKETS[index - 1] if index > 0 else 0
+    high = PRICE_BUCKETS[index] if index < len(PRICE_BUCKETS) else None
+    return low, high
+
+def _format(name, counts):
+    if name == 'preco':
+        return [
+            {'min': low, 'max': high, 'count': counts[index]}
+            for index in sorted(counts)
+            for low, high in [_bucket_bounds(index)]
+        ]
+    if name == 'ano':
+        values = sorted(counts, reverse=True)
+        return {
+            'min': values[-1] if values else None,
+            'max': values[0] if values else None,
+            'values': [{'value': value, 'count': counts[value]} for value in values]
+        }
+    return [
+        {'value': value, 'count': count}
+        for value, count in sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+    ]
+
+def compute_facets(query, names):
+    """Conta os valores de cada faceta em `names` numa única consulta agrupada"""
+    if not names:
+        return {}
+
+    columns = [
+        price_bucket().label('preco') if name == 'preco' else FACET_COLUMNS[name]
+        for name in names
+    ]
+    rows = query.order_by(None).with_entities(
+        *columns, db.func.count(Vehicle.id)
+    ).group_by(*columns).all()
+
+    counts = {name: {} for name in names}
+    for row in rows:
+        count = row[-1]
+        for name, value in zip(names, row[:-1]):
+            if value is not None:
+                counts[name][value] = counts[name].get(value, 0) + count
+
+    return {name: _format(name, counts[name]) for name in names}
+
+def catalog_facets(names):
+    """Facetas do inventário ativo sem filtros, pré-calculadas por versão"""
+    version = get_cache_version()
+    cached = current_app.extensions.get('catalog_facets')
+    if cached is None or cached[0] != version:
+        facets = compute_facets(Vehicle.query.filter_by(is_active=True), list(FACET_NAMES))
+        cached = (version, facets)
+        current_app.extensions['catalog_facets'] = cached
+    return {name: cached[1][name] for name in names}
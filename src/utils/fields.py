@@ -0,0 +1,51 @@
+from sqlalchemy.orm import load_only
+from src.models.vehicle import Vehicle, VEHICLE_FIELDS
+
+# Projeção de campos (`fields=`) das listagens e detalhes de veículos.
+# Só as colunas necessárias são lidas do banco (load_only), e só os campos
+# pedidos são serializados; `descricao` (Text) fica de fora dos cards.
+
+FIELD_PRESETS = {
+    'card': ('id', 'marca', 'modelo', 'ano', 'preco', 'quilometragem', 'imagem'),
+    'full': VEHICLE_FIELDS,
+}
+
+SELECTABLE_FIELDS = VEHICLE_FIELDS + ('imagem',)
+
+# Campos calculados a partir de outra coluna
+_FIELD_COLUMNS = {'imagem': 'imagens'}
+
+def parse_fields(value):
+    """Converte `fields` (nomes e/ou presets separados por vírgula) em uma tupla
+
+    Retorna None quando todos os campos padrão são pedidos.
+    """
+    if not value:
+        return None
+    fields = []
+    for name in (name.strip() for name in value.split(',')):
+        if not name:
+            continue
+        names = FIELD_PRESETS.get(name, (name,))
+        invalid = [field for field in names if field not in SELECTABLE_FIELDS]
+        if invalid:
+            raise ValueError(f"Campo inválido: {', '.join(invalid)}")
+        fields.extend(field for field in names if field not in fields)
+    if not fields or set(fields) == set(VEHICLE_FIELDS):
+        return None
+    # Ordenados: a mesma projeção sempre gera a mesma chave de cache
+    return tuple(sorted(fields))
+
+def load_fields(query, fields, *extra_columns):
+    """Restringe as colunas carregadas aos campos pedidos
+
+    `extra_columns` são colunas usadas fora da serialização (ordenação do
+    cursor, por exemplo). id e updated_at sempre são carregados: formam a
+    chave do cache de fragmentos.
+    """
+    if fields is None:
+        return query
+    names = {'id', 'updated_at', *extra_columns}
+    names.update(_FIELD_COLUMNS.get(field, field) for field in fields)
+    columns = [getattr(Vehicle, name) for name in sorted(names)]
+    return query.options(load_only(*columns))
@@ -0,0 +1,53 @@
+import hashlib
+from datetime import timezone
+from flask import request, current_app
+from src.utils.compression import ENCODINGS
+
+# Validadores HTTP (ETag / Last-Modified) para GETs condicionais.
+# As datas do banco são UTC sem timezone (datetime.utcnow).
+# Respostas comprimidas usam a ETag com sufixo da codificação ("<etag>-gzip").
+
+def make_etag(*parts):
+    """ETag forte a partir das partes que identificam a representação"""
+    raw = '|'.join('' if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def matching_etag(etag):
+    """ETag (com ou sem sufixo de codificação) que o cliente já possui, se houver"""
+    for candidate in (etag, *(f'{etag}-{encoding}' for encoding in ENCODINGS)):
+        if request.if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+def is_not_modified(etag, last_modified=None):
+    """Indica se o cliente já possui a representação atual
+
+    If-None-Match tem precedência sobre If-Modified-Since (RFC 9110).
+    """
+    if request.if_none_match:
+        return matching_etag(etag) is not None
+    if last_modified is not None and request.if_modified_since is not None:
+        return _as_utc(last_modified) <= request.if_modified_since
+    return False
+
+def set_validators(response, etag, last_modified=None):
+    """Adiciona ETag/Last-Modified e força revalidação a cada uso"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.no_cache = True
+    return response
+
+def not_modified(etag, last_modified=None):
+    """Resposta 304 sem corpo, com os mesmos validadores"""
+    response = current_app.response_class(status=304)
+    if request.if_none_match:
+        etag = matching_etag(etag) or etag
+    return set_validators(response, etag, last_modified)
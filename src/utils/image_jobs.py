@@ -0,0 +1,328 @@
+import os
+import queue
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from flask import current_app
+from sqlalchemy import or_, and_
+from werkzeug.utils import secure_filename
+from src.models.db import db
+from src.models.vehicle import Vehicle
+from src.models.image_job import ImageJob
+from src.models.cache import bump_cache_version
+from src.utils.images import (
+    UPLOAD_FOLDER, process_image_file, read_progress, references_lock, confirm_processed
+)
+
+# Processamento assíncrono de uploads. O arquivo bruto é salvo em disco e
+# registrado em `image_jobs`; um pool local de processos (limitado por
+# IMAGE_WORKERS) valida e redimensiona a imagem, e o processo web grava o
+# VehicleImage ao final, numa thread própria (a thread interna do pool só
+# repassa o resultado). Como o estado fica no banco, jobs interrompidos por
+# reinício do worker são retomados por sweep_image_jobs(), chamado nas
+# rotas administrativas (no máximo a cada IMAGE_JOB_SWEEP_INTERVAL segundos)
+# e pelo comando `flask image-jobs-recover` (cron). Um job cujo worker
+# (neste host) não existe mais é retomado na hora; nos demais casos, após
+# IMAGE_JOB_TIMEOUT sem conclusão. Depois de MAX_ATTEMPTS tentativas o job
+# é marcado como 'failed'.
+#
+# Durante o processamento o pool grava o progresso de cada etapa em
+# <raw_path>.progress, lido por job_progress().
+
+PENDING_FOLDER = os.path.join(UPLOAD_FOLDER, '.pending')
+MAX_ATTEMPTS = 3
+DEFAULT_JOB_TIMEOUT = 300  # segundos até um job 'processing' ser considerado abandonado
+DEFAULT_SWEEP_INTERVAL = 30  # segundos entre buscas por jobs a retomar
+PROGRESS_CLAIMED = 10
+EXHAUSTED_ERROR = 'Erro ao processar imagem (tentativas esgotadas)'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Resultados do pool aguardando gravação: (app, job_id, future)
+_results = queue.Queue()
+_finisher_pid = None
+_finisher_lock = threading.Lock()
+# Jobs enviados ao pool por este processo ainda sem resultado gravado
+_in_flight = 0
+_in_flight_done = threading.Condition()
+
+def _worker_id():
+    # Calculado a cada uso: o Passenger cria workers por fork
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+def _worker_alive(worker):
+    """Indica se o processo que assumiu um job ainda existe
+
+    Só dá para saber no mesmo host; de outros hosts vale o IMAGE_JOB_TIMEOUT.
+    """
+    host, _, pid = (worker or '').rpartition(':')
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _orphaned_workers():
+    """Workers deste host que assumiram jobs e já encerraram"""
+    workers = db.session.query(ImageJob.worker).filter(
+        ImageJob.status == 'processing',
+        ImageJob.worker.like(f'{socket.gethostname()}:%')
+    ).distinct()
+    return [worker for (worker,) in workers if not _worker_alive(worker)]
+
+def progress_path(job):
+    return f'{job.raw_path}.progress'
+
+def job_progress(job):
+    """Progresso do job, incluindo a última etapa reportada pelo pool"""
+    if job.status != 'processing':
+        return job.progress
+    return max(job.progress, read_progress(progress_path(job)) or 0)
+
+def get_image_executor():
+    """Pool de processos deste worker, criado sob demanda"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config.get('IMAGE_WORKERS', 2),
+                mp_context=get_context('spawn')
+            )
+        return _executor
+
+def _reset_executor():
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+def create_image_job(vehicle_id, file):
+    """Salva o upload bruto e registra um job pendente"""
+    job_id = uuid.uuid4().hex
+    os.makedirs(PENDING_FOLDER, exist_ok=True)
+    raw_path = os.path.join(PENDING_FOLDER, f'{job_id}.raw')
+    file.save(raw_path)
+
+    job = ImageJob(
+        id=job_id,
+        vehicle_id=vehicle_id,
+        raw_path=raw_path,
+        original_filename=secure_filename(file.filename)
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def _stale_before():
+    timeout = current_app.config.get('IMAGE_JOB_TIMEOUT', DEFAULT_JOB_TIMEOUT)
+    return datetime.utcnow() - timedelta(seconds=timeout)
+
+def _abandoned(orphaned_workers=()):
+    """Jobs 'processing' sem conclusão no prazo ou cujo worker encerrou"""
+    conditions = [ImageJob.updated_at < _stale_before()]
+    if orphaned_workers:
+        conditions.append(ImageJob.worker.in_(orphaned_workers))
+    return and_(ImageJob.status == 'processing', or_(*conditions))
+
+def _claimable(orphaned_workers=()):
+    # Abandonados só enquanto houver tentativas: um job que derruba o
+    # worker a cada vez não é reassumido para sempre
+    return or_(
+        ImageJob.status == 'pending',
+        and_(_abandoned(orphaned_workers), ImageJob.attempts < MAX_ATTEMPTS)
+    )
+
+def _fail_exhausted(orphaned_workers=(), job_id=None):
+    """Marca como 'failed' os jobs abandonados que esgotaram as tentativas"""
+    query = ImageJob.query.filter(_abandoned(orphaned_workers), ImageJob.attempts >= MAX_ATTEMPTS)
+    if job_id is not None:
+        query = query.filter(ImageJob.id == job_id)
+    jobs = query.all()
+    if not jobs:
+        return 0
+    for job in jobs:
+        job.status = 'failed'
+        job.error = EXHAUSTED_ERROR
+    db.session.commit()
+    for job in jobs:
+        _remove(job.raw_path)
+        _remove(progress_path(job))
+    return len(jobs)
+
+def dispatch_image_job(job_id, orphaned_workers=()):
+    """Assume o job (se ninguém o fez) e o envia ao pool
+
+    O UPDATE condicional garante que só um processo assume cada job.
+    """
+    claimed = ImageJob.query.filter(ImageJob.id == job_id, _claimable(orphaned_workers)).update({
+        ImageJob.status: 'processing',
+        ImageJob.progress: PROGRESS_CLAIMED,
+        ImageJob.worker: _worker_id(),
+        ImageJob.attempts: ImageJob.attempts + 1,
+        ImageJob.updated_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        return False
+
+    job = ImageJob.query.get(job_id)
+    app = current_app._get_current_object()
+    _remove(progress_path(job))
+    try:
+        future = get_image_executor().submit(process_image_file, job.raw_path, progress_path(job))
+    except BrokenProcessPool:
+        _reset_executor()
+        future = get_image_executor().submit(process_image_file, job.raw_path, progress_path(job))
+    # Só repassa o resultado: a thread do pool que entrega os resultados
+    # não pode ficar presa em commits, travas e reprocessamento
+    _start_finisher()
+    _track(1)
+    future.add_done_callback(lambda done: _results.put((app, job_id, done)))
+    return True
+
+def _start_finisher():
+    """Thread que grava os resultados do pool (uma por processo)"""
+    global _finisher_pid
+    with _finisher_lock:
+        if _finisher_pid == os.getpid():
+            return
+        _finisher_pid = os.getpid()
+        threading.Thread(target=_finish_jobs, name='image-jobs-finisher', daemon=True).start()
+
+def _finish_jobs():
+    while True:
+        app, job_id, future = _results.get()
+        try:
+            _finish_job(app, job_id, future)
+        finally:
+            _track(-1)
+
+def _track(delta):
+    global _in_flight
+    with _in_flight_done:
+        _in_flight += delta
+        _in_flight_done.notify_all()
+
+def wait_image_jobs(timeout=None):
+    """Aguarda os jobs enviados ao pool por este processo, inclusive as
+    novas tentativas, até o resultado ser gravado
+
+    Retorna False se o timeout expirar antes.
+    """
+    with _in_flight_done:
+        return _in_flight_done.wait_for(lambda: _in_flight == 0, timeout)
+
+def _finish_job(app, job_id, future):
+    """Grava o resultado do job (thread de _finish_jobs, no processo web)"""
+    with app.app_context():
+        try:
+            job = ImageJob.query.get(job_id)
+            if job is None or job.status != 'processing' or job.worker != _worker_id():
+                return  # job retomado por outro processo
+
+            try:
+                processed = future.result()
+            except ValueError as e:
+                job.status = 'failed'
+                job.error = str(e)
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    _reset_executor()
+                if job.attempts < MAX_ATTEMPTS:
+                    job.status = 'pending'
+                    job.progress = 0
+                else:
+                    job.status = 'failed'
+                    job.error = 'Erro ao processar imagem'
+            else:
+                # Com a trava até o commit, como no upload síncrono
+                with references_lock():
+                    filename, _, file_size = confirm_processed(processed, job.raw_path)
+                    vehicle = Vehicle.query.get(job.vehicle_id)
+                    vehicle_image = vehicle.add_image(
+                        filename=filename,
+                        original_filename=job.original_filename,
+                        file_path=os.path.join(UPLOAD_FOLDER, filename),
+                        file_size=file_size
+                    )
+                    db.session.flush()
+                    job.image_id = vehicle_image.id
+                    job.status = 'done'
+                    job.progress = 100
+                    bump_cache_version()
+                    db.session.commit()
+
+            db.session.commit()
+
+            if job.status in ('done', 'failed'):
+                _remove(job.raw_path)
+                _remove(progress_path(job))
+            elif job.status == 'pending':
+                dispatch_image_job(job_id)
+        except Exception:
+            db.session.rollback()
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def resume_if_stale(job):
+    """Retoma um job pendente ou abandonado (ex.: após reinício do worker)"""
+    if job.status == 'pending':
+        return dispatch_image_job(job.id)
+    if job.status != 'processing':
+        return False
+    orphaned_workers = [] if _worker_alive(job.worker) else [job.worker]
+    if not orphaned_workers and job.updated_at >= _stale_before():
+        return False
+    if job.attempts >= MAX_ATTEMPTS:
+        return _fail_exhausted(orphaned_workers, job.id) > 0
+    return dispatch_image_job(job.id, orphaned_workers)
+
+def recover_image_jobs():
+    """Reenvia ao pool os jobs que ficaram sem conclusão
+
+    Os que já esgotaram as tentativas são marcados como 'failed'.
+    """
+    orphaned_workers = _orphaned_workers()
+    _fail_exhausted(orphaned_workers)
+    job_ids = [job_id for (job_id,) in db.session.query(ImageJob.id).filter(_claimable(orphaned_workers))]
+    return sum(1 for job_id in job_ids if dispatch_image_job(job_id, orphaned_workers))
+
+_sweep_pid = None
+_next_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+def sweep_image_jobs():
+    """recover_image_jobs() na primeira chamada de cada processo e depois
+    no máximo a cada IMAGE_JOB_SWEEP_INTERVAL segundos
+
+    Chamado nas rotas administrativas, fora da inicialização para não
+    atrasar o boot dos workers.
+    """
+    global _sweep_pid, _next_sweep
+    now = time.monotonic()
+    if _sweep_pid == os.getpid() and now < _next_sweep:
+        return 0
+    with _sweep_lock:
+        if _sweep_pid == os.getpid() and now < _next_sweep:
+            return 0
+        _sweep_pid = os.getpid()
+        _next_sweep = now + current_app.config.get('IMAGE_JOB_SWEEP_INTERVAL', DEFAULT_SWEEP_INTERVAL)
+    try:
+        return recover_image_jobs()
+    except Exception:
+        # Tabela ainda inexistente (init-db não executado) ou banco indisponível
+        db.session.rollback()
+        return 0
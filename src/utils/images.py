@@ -0,0 +1,323 @@
+import fcntl
+import hashlib
+import io
+import os
+import time
+from contextlib import contextmanager
+from src.utils.metrics import registry, observe_image_processing
+
+# Validação e processamento de imagens, separados das rotas para poderem
+# rodar também nos processos do pool de imagens (src/utils/image_jobs.py).
+# PIL e python-magic são importados dentro das funções: só os workers que
+# recebem uploads pagam o custo de carregá-los.
+
+# Configurações de upload
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'uploads')
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
+ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png', 'image/webp'}
+MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+MAX_IMAGE_DIMENSION = 2048
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+# Tamanhos gerados
+FULL_SIZE = (1200, 800)
+THUMBNAIL_SIZE = (300, 200)
+
+# Trava entre processos para referências a arquivos compartilhados
+REFERENCES_LOCK_FILE = '.references.lock'
+
+# Formatos modernos gravados ao lado de cada JPEG (mesmo nome, outra extensão),
+# em ordem de preferência na negociação por Accept de serve_upload
+MODERN_FORMATS = (
+    ('avif', 'AVIF', 'image/avif', {'quality': 60, 'speed': 8}),
+    ('webp', 'WEBP', 'image/webp', {'quality': 80, 'method': 4}),
+)
+
+def allowed_file(filename):
+    """Verifica se a extensão do arquivo é permitida"""
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def check_upload(file):
+    """Verificações baratas (tamanho e tipo MIME), sem decodificar a imagem"""
+    # Verificar tamanho
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    if size > MAX_FILE_SIZE:
+        raise ValueError(f'Arquivo muito grande. Máximo permitido: {MAX_FILE_SIZE // (1024*1024)}MB')
+    
+    file.seek(0)
+    
+    # Verificar tipo MIME
+    import magic
+    mime_type = magic.from_buffer(file.read(1024), mime=True)
+    if mime_type not in ALLOWED_MIME_TYPES:
+        raise ValueError('Tipo de arquivo não permitido. Use apenas JPEG, PNG ou WebP')
+    
+    file.seek(0)
+    return True
+
+def validate_image_file(file):
+    """Valida o arquivo de imagem
+
+    Aqui só o cabeçalho é lido (formato e dimensões), para todos os formatos.
+    O PNG passa também por verify(), que confere os CRCs dos blocos sem
+    decodificar os pixels; o Pillow não tem verificação equivalente para JPEG
+    e WebP. Arquivos truncados ou corrompidos de qualquer formato são
+    rejeitados pela decodificação completa em process_image, antes de gravar
+    qualquer coisa.
+    """
+    from PIL import Image
+    check_upload(file)
+    
+    # Verificar se é uma imagem válida
+    try:
+        with Image.open(file) as img:
+            if img.format not in ALLOWED_FORMATS:
+                raise ValueError('Formato de imagem não suportado')
+            
+            # Verificar dimensões
+            if img.width > MAX_IMAGE_DIMENSION or img.height > MAX_IMAGE_DIMENSION:
+                raise ValueError(f'Imagem muito grande. Máximo: {MAX_IMAGE_DIMENSION}x{MAX_IMAGE_DIMENSION} pixels')
+            
+            # CRCs dos blocos do PNG (verify() não faz nada nos outros formatos)
+            if img.format == 'PNG':
+                img.verify()
+    except Exception as e:
+        raise ValueError('Arquivo de imagem inválido ou corrompido')
+    
+    file.seek(0)
+    return True
+
+def available_formats():
+    """Formatos modernos que o Pillow instalado consegue gravar"""
+    from PIL import Image
+    Image.init()
+    return [entry for entry in MODERN_FORMATS if entry[1] in Image.SAVE]
+
+def variant_filename(filename, extension):
+    """Nome da variante `extension` de um arquivo JPEG gravado"""
+    return f"{filename.rsplit('.', 1)[0]}.{extension}"
+
+def related_filenames(filename):
+    """Todos os arquivos gravados para uma imagem (original, thumbnail e variantes)"""
+    names = []
+    for name in (filename, f"thumb_{filename}"):
+        names.append(name)
+        names.extend(variant_filename(name, extension) for extension, _, _, _ in MODERN_FORMATS)
+    return names
+
+def save_image(img, filename, format_name, **options):
+    """Grava em arquivo temporário e renomeia, para nunca expor arquivo parcial"""
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    path = os.path.join(UPLOAD_FOLDER, filename)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        img.save(temp_path, format_name, **options)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def save_variants(img, filename):
+    """Grava as variantes WebP/AVIF de uma imagem já carregada"""
+    for extension, format_name, _, options in available_formats():
+        save_image(img, variant_filename(filename, extension), format_name, **options)
+
+def file_hash(file):
+    """SHA-256 do conteúdo enviado, usado como nome do arquivo processado"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+def find_processed(content_hash):
+    """Retorna (filename, thumbnail, tamanho) se esse conteúdo já foi processado
+
+    O thumbnail é o último arquivo gravado por process_image, então sua
+    existência indica um processamento completo.
+    """
+    filename = f"{content_hash}.jpg"
+    filepath = os.path.join(UPLOAD_FOLDER, filename)
+    thumbnail_filename = f"thumb_{filename}"
+    if os.path.exists(os.path.join(UPLOAD_FOLDER, thumbnail_filename)) and os.path.exists(filepath):
+        return filename, thumbnail_filename, os.path.getsize(filepath)
+    return None
+
+@contextmanager
+def references_lock():
+    """Serializa, entre os processos, novas referências e remoção de arquivos
+
+    Quem remove confere a contagem de VehicleImage e apaga os arquivos com a
+    trava; quem referencia confirma os arquivos (confirm_processed) e faz o
+    commit com ela. Assim um arquivo encontrado em disco não some entre a
+    verificação e o commit do novo registro.
+    """
+    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    with open(os.path.join(UPLOAD_FOLDER, REFERENCES_LOCK_FILE), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def confirm_processed(processed, source):
+    """Confirma (sob references_lock) que os arquivos de `processed` existem
+
+    Se a última referência foi removida por outro worker depois do
+    processamento ou de find_processed, gera os arquivos de novo a partir de
+    `source` (o arquivo enviado ou o caminho do arquivo bruto).
+    """
+    content_hash = processed[0].rsplit('.', 1)[0]
+    existing = find_processed(content_hash)
+    if existing is not None:
+        return existing
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            return process_image(file, content_hash)
+    source.seek(0)
+    return process_image(source, content_hash)
+
+def fit_size(size, box):
+    """Tamanho que cabe em `box` mantendo a proporção (sem ampliar)"""
+    width, height = size
+    scale = min(box[0] / width, box[1] / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def decode_image(file, box):
+    """Decodifica a imagem uma única vez, já reduzida quando possível
+
+    Para JPEG com pelo menos o dobro de `box`, o decoder entrega direto
+    uma versão em escala 1/2, 1/4 ou 1/8 (draft), nunca menor que o
+    tamanho final; o LANCZOS faz o restante. Com FULL_SIZE e o limite de
+    MAX_IMAGE_DIMENSION a escala fica em 1/1 (a imagem cheia é a base do
+    thumbnail); caixas menores decodificam já reduzidas.
+    """
+    from PIL import Image
+    try:
+        img = Image.open(file)
+        if img.format not in ALLOWED_FORMATS:
+            raise ValueError('Formato de imagem não suportado')
+        if img.width > MAX_IMAGE_DIMENSION or img.height > MAX_IMAGE_DIMENSION:
+            raise ValueError('Imagem muito grande')
+        
+        target = fit_size(img.size, box)
+        if img.format == 'JPEG':
+            img.draft('RGB', target)
+        img.load()
+    except Exception as e:
+        raise ValueError('Arquivo de imagem inválido ou corrompido')
+    
+    # Converter para RGB se necessário
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    return img
+
+# Progresso (%) reportado ao fim de cada etapa de process_image
+PROGRESS_DECODED = 30
+PROGRESS_RESIZED = 45
+PROGRESS_SAVED = 75
+PROGRESS_THUMBNAIL_SAVED = 95
+
+def process_image(file, content_hash=None, progress=None):
+    """Processa e salva a imagem e o thumbnail a partir de uma única decodificação
+
+    `progress`, se informado, é chamado com o percentual de cada etapa concluída.
+    """
+    from PIL import Image
+    started = time.perf_counter()
+    report = progress or (lambda value: None)
+    # Nome pelo hash do conteúdo: o mesmo arquivo enviado de novo reaproveita o resultado
+    content_hash = content_hash or file_hash(file)
+    filename = f"{content_hash}.jpg"  # Sempre salvar como JPEG
+    thumbnail_filename = f"thumb_{filename}"
+    
+    img = decode_image(file, FULL_SIZE)
+    report(PROGRESS_DECODED)
+    
+    # Redimensionar mantendo proporção se necessário
+    if img.width > FULL_SIZE[0] or img.height > FULL_SIZE[1]:
+        img.thumbnail(FULL_SIZE, Image.Resampling.LANCZOS)
+    
+    # Thumbnail a partir da imagem já redimensionada em memória
+    thumbnail = img.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+    report(PROGRESS_RESIZED)
+    
+    # Salvar com qualidade otimizada; o thumbnail JPEG é gravado por último
+    # (find_processed usa sua existência como marca de processamento completo)
+    save_image(img, filename, 'JPEG', quality=85, optimize=True)
+    save_variants(img, filename)
+    report(PROGRESS_SAVED)
+    save_variants(thumbnail, thumbnail_filename)
+    save_image(thumbnail, thumbnail_filename, 'JPEG', quality=80, optimize=True)
+    report(PROGRESS_THUMBNAIL_SAVED)
+    
+    observe_image_processing(time.perf_counter() - started)
+    return filename, thumbnail_filename, os.path.getsize(os.path.join(UPLOAD_FOLDER, filename))
+
+def process_upload(file, progress=None):
+    """Valida e processa um upload, a menos que o mesmo conteúdo já exista"""
+    content_hash = file_hash(file)
+    processed = find_processed(content_hash)
+    if processed is None:
+        validate_image_file(file)
+        processed = process_image(file, content_hash, progress)
+    return processed
+
+def write_progress(path, value):
+    """Grava o progresso de um job para o processo web (substituição atômica)"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as file:
+        file.write(str(value))
+    os.replace(temp_path, path)
+
+def read_progress(path):
+    """Último progresso gravado por write_progress (None se ainda não houver)"""
+    try:
+        with open(path) as file:
+            return int(file.read())
+    except (OSError, ValueError):
+        return None
+
+def process_image_file(path, progress_path=None):
+    """Valida e processa uma imagem salva em disco (executado no pool)
+
+    Com `progress_path`, cada etapa concluída é gravada nesse arquivo, lido
+    pelo status do job em qualquer worker.
+    """
+    progress = (lambda value: write_progress(progress_path, value)) if progress_path else None
+    try:
+        with open(path, 'rb') as file:
+            return process_upload(file, progress)
+    finally:
+        # O processo do pool não atende requisições: grava as métricas a cada imagem
+        registry.flush()
+
+def process_image_bytes(data):
+    """Valida e processa uma imagem recebida em memória (executado no pool)"""
+    try:
+        return process_upload(io.BytesIO(data))
+    finally:
+        registry.flush()
+
+def backfill_variants(filename):
+    """Gera as variantes que faltam para um JPEG já existente
+
+    Retorna a quantidade de arquivos criados.
+    """
+    missing = [
+        entry for entry in available_formats()
+        if not os.path.exists(os.path.join(UPLOAD_FOLDER, variant_filename(filename, entry[0])))
+    ]
+    if not missing:
+        return 0
+
+    from PIL import Image
+    with Image.open(os.path.join(UPLOAD_FOLDER, filename)) as img:
+        img = img.convert('RGB')
+        for extension, format_name, _, options in missing:
+            save_image(img, variant_filename(filename, extension), format_name, **options)
+    return len(missing)
@@ -0,0 +1,204 @@
+import csv
+import io
+import json
+from marshmallow import ValidationError
+from src.models.db import db
+from src.models.vehicle import Vehicle, VEHICLE_FIELDS
+from src.models.cache import bump_cache_version
+from src.utils.json_provider import dumps_bytes
+
+# Importação e exportação do estoque em CSV ou NDJSON (um objeto JSON por
+# linha). As duas pontas trabalham em fluxo: a importação valida linha a
+# linha e grava em lotes (uma transação por lote), e a exportação lê o
+# banco em blocos com yield_per, sem carregar a tabela inteira.
+#
+# Veículos com `external_id` são atualizados quando o código já existe
+# (upsert); sem ele, cada linha cria um veículo novo.
+
+FORMATS = ('csv', 'ndjson')
+DEFAULT_BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+IMAGE_SEPARATOR = '|'  # separador das URLs de `imagens` no CSV
+
+# Colunas exportadas; as geradas pelo sistema são ignoradas na importação
+EXPORT_COLUMNS = ('external_id',) + VEHICLE_FIELDS
+READ_ONLY_COLUMNS = {'id', 'is_active', 'created_at', 'updated_at'}
+
+# Campos gravados a partir de uma linha validada por VehicleSchema
+IMPORT_FIELDS = (
+    'marca', 'modelo', 'ano', 'preco', 'descricao', 'combustivel',
+    'cambio', 'cor', 'quilometragem', 'categoria'
+)
+
+def detect_format(format_name=None, filename=None, mimetype=None):
+    """Formato pedido explicitamente ou deduzido do nome/tipo do arquivo"""
+    if not format_name:
+        if filename and '.' in filename:
+            format_name = filename.rsplit('.', 1)[1].lower()
+        elif mimetype == 'text/csv':
+            format_name = 'csv'
+        elif mimetype in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+            format_name = 'ndjson'
+    if format_name in ('jsonl', 'json'):
+        format_name = 'ndjson'
+    if format_name not in FORMATS:
+        raise ValueError('Formato inválido: use csv ou ndjson')
+    return format_name
+
+def _clean_row(row):
+    """Remove colunas do sistema e valores vazios (tratados como ausentes)"""
+    return {
+        key: value for key, value in row.items()
+        if key not in READ_ONLY_COLUMNS and value not in ('', None)
+    }
+
+def read_rows(stream, format_name):
+    """Itera (linha, dados, erro) de um arquivo texto CSV ou NDJSON"""
+    if format_name == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            if None in row:
+                yield reader.line_num, None, 'Linha com mais colunas que o cabeçalho'
+                continue
+            row = _clean_row(row)
+            if 'imagens' in row:
+                row['imagens'] = [url for url in row['imagens'].split(IMAGE_SEPARATOR) if url]
+            yield reader.line_num, row, None
+        return
+
+    for number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, 'JSON inválido'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Cada linha deve ser um objeto JSON'
+            continue
+        yield number, _clean_row(row), None
+
+class ImportReport:
+    """Contagens da importação e os primeiros erros por linha"""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+def _write_batch(batch, report):
+    """Grava um lote de linhas válidas numa única transação"""
+    external_ids = {data['external_id'] for _, data in batch if data.get('external_id')}
+    existing = {}
+    if external_ids:
+        existing = {
+            vehicle.external_id: vehicle
+            for vehicle in Vehicle.query.filter(Vehicle.external_id.in_(external_ids))
+        }
+
+    created = updated = 0
+    try:
+        for _, data in batch:
+            external_id = data.get('external_id')
+            vehicle = existing.get(external_id) if external_id else None
+            if vehicle is None:
+                vehicle = Vehicle(external_id=external_id)
+                db.session.add(vehicle)
+                if external_id:
+                    existing[external_id] = vehicle
+                created += 1
+            else:
+                updated += 1
+
+            for field in IMPORT_FIELDS:
+                setattr(vehicle, field, data.get(field, 0 if field == 'quilometragem' else None))
+            if 'imagens' in data:
+                vehicle.set_imagens(data['imagens'])
+            # Presente no feed = disponível no estoque
+            vehicle.is_active = True
+
+        bump_cache_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        for row, _ in batch:
+            report.add_error(row, 'Erro ao gravar o lote')
+        return
+
+    report.created += created
+    report.updated += updated
+
+def import_vehicles(rows, schema, batch_size=DEFAULT_BATCH_SIZE, report=None):
+    """Valida cada linha com `schema` (VehicleSchema) e grava em lotes
+
+    `rows` vem de read_rows(). Lotes já gravados permanecem mesmo que um
+    lote posterior falhe.
+    """
+    report = report or ImportReport()
+    batch = []
+    for row, data, error in rows:
+        if error is None:
+            try:
+                data = schema.load(data)
+            except ValidationError as e:
+                error = e.messages
+        if error is not None:
+            report.add_error(row, error)
+            continue
+
+        batch.append((row, data))
+        if len(batch) >= batch_size:
+            _write_batch(batch, report)
+            batch = []
+
+    if batch:
+        _write_batch(batch, report)
+    return report
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return IMAGE_SEPARATOR.join(value)
+    return '' if value is None else value
+
+def export_vehicles(format_name, batch_size=DEFAULT_BATCH_SIZE):
+    """Gera o estoque completo em blocos de texto (CSV) ou bytes (NDJSON)"""
+    query = Vehicle.query.order_by(Vehicle.id).yield_per(batch_size)
+
+    if format_name == 'ndjson':
+        chunk = []
+        for vehicle in query:
+            chunk.append(dumps_bytes(vehicle.to_dict(EXPORT_COLUMNS)) + b'\n')
+            if len(chunk) >= batch_size:
+                yield b''.join(chunk)
+                chunk = []
+        if chunk:
+            yield b''.join(chunk)
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, vehicle in enumerate(query, 1):
+        data = vehicle.to_dict(EXPORT_COLUMNS)
+        writer.writerow([_csv_value(data[column]) for column in EXPORT_COLUMNS])
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
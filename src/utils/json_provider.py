@@ -0,0 +1,53 @@
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+
+# Serialização JSON com orjson quando disponível. A saída segue as regras do
+# provider padrão do Flask (chaves ordenadas, compacta, datas no formato
+# HTTP); a única diferença é emitir UTF-8 em vez de escapes \uXXXX.
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional
+    orjson = None
+
+class OrJSONProvider(DefaultJSONProvider):
+    """Provider JSON do Flask baseado em orjson"""
+
+    option = (
+        orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    ) if orjson is not None else 0
+
+    def dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.option)
+
+    def dumps(self, obj, **kwargs):
+        # Argumentos do json padrão (indent, ensure_ascii, ...) usam o caminho antigo
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Em debug (ou compact=False) o provider padrão gera JSON indentado
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """Usa o OrJSONProvider se o orjson estiver instalado"""
+    if orjson is not None:
+        app.json = OrJSONProvider(app)
+    return app.json
+
+def dumps_bytes(obj):
+    """Serializa para bytes com o provider da aplicação"""
+    provider = current_app.json
+    if isinstance(provider, OrJSONProvider):
+        return provider.dumps_bytes(obj)
+    return provider.dumps(obj).encode('utf-8')
@@ -0,0 +1,313 @@
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+import uuid
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Métricas por requisição no formato de texto do Prometheus, somadas entre
+# os workers do Passenger sem serviço externo: cada processo acumula os
+# valores em memória e grava periodicamente um arquivo próprio em
+# METRICS_DIR (<pid>-<id>.json). O /metrics soma os arquivos de todos os
+# processos; os de processos encerrados são incorporados a archive.json,
+# para que os contadores nunca diminuam.
+#
+# Os processos do pool de imagens também gravam seus arquivos (após cada
+# imagem), então o tempo de process_image aparece mesmo no modo assíncrono.
+
+METRICS_FOLDER = os.environ.get(
+    'METRICS_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'database', 'metrics')
+)
+DEFAULT_FLUSH_INTERVAL = 5  # segundos entre gravações do arquivo do processo
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+IMAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# nome -> (tipo, descrição, rótulos, buckets)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requisições HTTP por rota e status',
+        ('blueprint', 'endpoint', 'method', 'status'), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Duração das requisições HTTP',
+        ('blueprint', 'endpoint', 'method'), LATENCY_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', 'Consultas SQL por requisição',
+        ('blueprint', 'endpoint'), QUERY_COUNT_BUCKETS),
+    'http_request_db_duration_seconds': (
+        'histogram', 'Tempo em consultas SQL por requisição',
+        ('blueprint', 'endpoint'), LATENCY_BUCKETS),
+    'image_processing_duration_seconds': (
+        'histogram', 'Duração de process_image (redimensionamento e variantes)',
+        (), IMAGE_BUCKETS),
+}
+
+class Registry:
+    """Valores deste processo, gravados em METRICS_DIR a cada flush_interval"""
+
+    def __init__(self, directory=METRICS_FOLDER, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.enabled = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Também após o fork: o filho não herda (nem conta de novo) os valores do pai
+        self._pid = os.getpid()
+        self.filename = f'{self._pid}-{uuid.uuid4().hex[:8]}.json'
+        self.counters = {}      # (nome, rótulos) -> valor
+        self.histograms = {}    # (nome, rótulos) -> [por bucket..., +Inf, soma, total]
+        self._dirty = False
+        self._next_flush = time.monotonic() + self.flush_interval
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._check_pid()
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + amount
+            self._dirty = True
+
+    def observe(self, name, labels, value):
+        if not self.enabled:
+            return
+        buckets = METRICS[name][3]
+        with self._lock:
+            self._check_pid()
+            key = (name, labels)
+            entry = self.histograms.get(key)
+            if entry is None:
+                entry = self.histograms[key] = [0] * (len(buckets) + 3)
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    break
+            else:
+                index = len(buckets)
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+            self._dirty = True
+
+    def maybe_flush(self):
+        if self._dirty and time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        """Grava o arquivo deste processo (substituição atômica)"""
+        with self._lock:
+            self._check_pid()
+            if not self._dirty:
+                return
+            data = {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(entry)] for (name, labels), entry in self.histograms.items()],
+            }
+            self._dirty = False
+            self._next_flush = time.monotonic() + self.flush_interval
+            filename = self.filename
+        try:
+            write_json(os.path.join(self.directory, filename), data)
+        except OSError:
+            # Métricas nunca derrubam a requisição; tenta de novo no próximo flush
+            self._dirty = True
+
+registry = Registry()
+atexit.register(registry.flush)
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data.get('counters', ()):
+        key = (name, tuple(labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, entry in data.get('histograms', ()):
+        key = (name, tuple(labels))
+        current = histograms.get(key)
+        if current is None or len(current) != len(entry):
+            histograms[key] = list(entry)
+        else:
+            histograms[key] = [a + b for a, b in zip(current, entry)]
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+def collect(directory=None):
+    """Soma os valores de todos os processos (vivos e encerrados)
+
+    Retorna (counters, histograms) no mesmo formato do Registry.
+    """
+    directory = directory or registry.directory
+    os.makedirs(directory, exist_ok=True)
+    counters, histograms = {}, {}
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock:
+        # Uma coleta por vez: a compactação reescreve archive.json
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            archive_path = os.path.join(directory, ARCHIVE_FILE)
+            _merge(counters, histograms, _read_json(archive_path))
+
+            live, dead = [], []
+            for filename in os.listdir(directory):
+                if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                    continue
+                try:
+                    pid = int(filename.split('-', 1)[0])
+                except ValueError:
+                    continue
+                (live if _process_alive(pid) else dead).append(filename)
+
+            if dead:
+                archived_counters, archived_histograms = dict(counters), dict(histograms)
+                for filename in dead:
+                    _merge(archived_counters, archived_histograms, _read_json(os.path.join(directory, filename)))
+                write_json(archive_path, {
+                    'counters': [[name, list(labels), value] for (name, labels), value in archived_counters.items()],
+                    'histograms': [[name, list(labels), entry] for (name, labels), entry in archived_histograms.items()],
+                })
+                for filename in dead:
+                    os.remove(os.path.join(directory, filename))
+                counters, histograms = archived_counters, archived_histograms
+
+            for filename in live:
+                _merge(counters, histograms, _read_json(os.path.join(directory, filename)))
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return counters, histograms
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(counters, histograms):
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+    lines = []
+    for name, (kind, description, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(label_names, labels)} {_number(value)}')
+            continue
+        for (metric, labels), entry in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), entry):
+                cumulative += count
+                le = 'le="%s"' % bound
+                lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {_number(entry[-2])}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {entry[-1]}')
+    return '\n'.join(lines) + '\n'
+
+def export():
+    """Métricas de todos os processos, com as deste já gravadas"""
+    registry.flush()
+    return render(*collect())
+
+# Tempo e quantidade de consultas SQL da requisição em andamento (por thread)
+_current = threading.local()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['metrics_query_started'].pop()
+    _current.db_queries = getattr(_current, 'db_queries', 0) + 1
+    _current.db_seconds = getattr(_current, 'db_seconds', 0.0) + time.perf_counter() - started
+
+def observe_image_processing(seconds):
+    """Registra a duração de um process_image (web ou pool)"""
+    registry.observe('image_processing_duration_seconds', (), seconds)
+    _current.image_seconds = getattr(_current, 'image_seconds', 0.0) + seconds
+
+def server_timing(total, db_queries, db_seconds, image_seconds):
+    parts = [f'app;dur={total * 1000:.1f}', f'db;dur={db_seconds * 1000:.1f};desc="consultas: {db_queries}"']
+    if image_seconds:
+        parts.append(f'img;dur={image_seconds * 1000:.1f}')
+    return ', '.join(parts)
+
+def init_metrics(app):
+    """Instrumenta as requisições da aplicação
+
+    Chamado antes das demais extensões, para que a medição inclua os seus
+    before_request (rate limiting, JWT) e after_request (compressão).
+    """
+    registry.enabled = app.config.get('METRICS_ENABLED', True)
+    registry.directory = app.config.get('METRICS_DIR', METRICS_FOLDER)
+    registry.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+    if not registry.enabled:
+        return
+
+    @app.before_request
+    def start_request_timer():
+        g.metrics_started = time.perf_counter()
+        _current.db_queries = 0
+        _current.db_seconds = 0.0
+        _current.image_seconds = 0.0
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        db_queries = getattr(_current, 'db_queries', 0)
+        db_seconds = getattr(_current, 'db_seconds', 0.0)
+
+        blueprint = request.blueprint or 'app'
+        endpoint = request.endpoint or 'none'
+        registry.inc('http_requests_total', (blueprint, endpoint, request.method, str(response.status_code)))
+        registry.observe('http_request_duration_seconds', (blueprint, endpoint, request.method), total)
+        registry.observe('http_request_db_queries', (blueprint, endpoint), db_queries)
+        registry.observe('http_request_db_duration_seconds', (blueprint, endpoint), db_seconds)
+        registry.maybe_flush()
+
+        if current_app.config.get('SERVER_TIMING_ENABLED', True):
+            response.headers['Server-Timing'] = server_timing(
+                total, db_queries, db_seconds, getattr(_current, 'image_seconds', 0.0)
+            )
+        return response
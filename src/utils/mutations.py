@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+from marshmallow import ValidationError
+from src.models.db import db
+from src.models.vehicle import Vehicle, VehicleImage
+from src.models.cache import bump_cache_version
+from src.models.stats import STAT_FIELDS, apply_vehicle_changes
+
+# Operações administrativas em lote aplicadas com SQL por conjunto: o
+# estado atual de todos os veículos envolvidos é lido numa consulta, e as
+# alterações viram um único UPDATE ... SET coluna = CASE id WHEN ... por
+# tabela. Como o UPDATE não passa pelo ORM, os agregados do dashboard são
+# atualizados aqui com apply_vehicle_changes (src/models/stats.py).
+
+OPERATIONS = ('update', 'delete', 'activate', 'reorder_images')
+DEFAULT_MAX_OPERATIONS = 500
+
+def _parse_id(value):
+    if isinstance(value, bool):
+        raise ValueError('ID inválido')
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    raise ValueError('ID inválido')
+
+def parse_operation(operation, schema):
+    """Valida uma operação e retorna (op, vehicle_id, dados)"""
+    if not isinstance(operation, dict):
+        raise ValueError('Operação inválida')
+    op = operation.get('op')
+    if op not in OPERATIONS:
+        raise ValueError(f"Operação inválida: use {', '.join(OPERATIONS)}")
+    vehicle_id = _parse_id(operation.get('id'))
+
+    if op == 'update':
+        fields = operation.get('fields')
+        if not isinstance(fields, dict) or not fields:
+            raise ValueError('Informe os campos a atualizar')
+        data = schema.load(fields)
+        if 'imagens' in data:
+            data['imagens'] = json.dumps(data['imagens']) if data['imagens'] else None
+        return op, vehicle_id, data
+
+    if op == 'reorder_images':
+        image_ids = operation.get('image_ids')
+        if not isinstance(image_ids, list):
+            raise ValueError('Lista de IDs de imagens inválida')
+        return op, vehicle_id, [_parse_id(image_id) for image_id in image_ids]
+
+    return op, vehicle_id, None
+
+def ordered_images(images, image_ids):
+    """Nova ordem das imagens: as pedidas primeiro, depois as demais na ordem atual
+
+    IDs que não pertencem ao veículo são ignorados.
+    """
+    remaining = dict(images)
+    ordered = [(image_id, remaining.pop(image_id)) for image_id in image_ids if image_id in remaining]
+    return ordered + list(remaining.items())
+
+def _case_update(column, key, values):
+    return db.case(values, value=key, else_=column)
+
+def apply_vehicle_operations(operations, schema):
+    """Aplica as operações na transação atual e retorna o resultado de cada uma
+
+    `schema` valida as atualizações parciais (VehicleSchema com partial=True).
+    O commit fica a cargo de quem chama.
+    """
+    results = [None] * len(operations)
+    parsed = []
+    for index, operation in enumerate(operations):
+        try:
+            parsed.append((index, *parse_operation(operation, schema)))
+        except ValidationError as e:
+            results[index] = {'index': index, 'status': 'error', 'errors': e.messages}
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'error', 'error': str(e)}
+
+    # Estado atual de todos os veículos envolvidos, numa consulta
+    vehicle_ids = {vehicle_id for _, _, vehicle_id, _ in parsed}
+    states = {
+        row.id: {field: getattr(row, field) for field in STAT_FIELDS}
+        for row in db.session.query(Vehicle.id, *[getattr(Vehicle, field) for field in STAT_FIELDS])
+            .filter(Vehicle.id.in_(vehicle_ids))
+    } if vehicle_ids else {}
+
+    # Imagens atuais (id -> filename, na ordem atual) dos veículos a reordenar
+    images = {}
+    reorder_ids = {vehicle_id for _, op, vehicle_id, _ in parsed if op == 'reorder_images' and vehicle_id in states}
+    if reorder_ids:
+        rows = db.session.query(VehicleImage.vehicle_id, VehicleImage.id, VehicleImage.filename) \
+            .filter(VehicleImage.vehicle_id.in_(reorder_ids)) \
+            .order_by(VehicleImage.vehicle_id, VehicleImage.image_order, VehicleImage.id)
+        for vehicle_id, image_id, filename in rows:
+            images.setdefault(vehicle_id, {})[image_id] = filename
+
+    # Valores finais por coluna: {coluna: {vehicle_id: valor}}
+    values = {}
+    new_states = {vehicle_id: dict(state) for vehicle_id, state in states.items()}
+    image_orders = {}
+    for index, op, vehicle_id, data in parsed:
+        if vehicle_id not in states:
+            results[index] = {'index': index, 'op': op, 'id': vehicle_id, 'status': 'error',
+                              'error': 'Veículo não encontrado'}
+            continue
+
+        if op == 'update':
+            changes = data
+        elif op == 'delete':
+            changes = {'is_active': False}
+        elif op == 'activate':
+            changes = {'is_active': True}
+        else:
+            ordered = ordered_images(images.get(vehicle_id, {}), data)
+            images[vehicle_id] = dict(ordered)
+            image_orders.update((image_id, order) for order, (image_id, _) in enumerate(ordered))
+            urls = [f'/api/uploads/{filename}' for _, filename in ordered]
+            changes = {'imagens': json.dumps(urls) if urls else None}
+
+        for field, value in changes.items():
+            values.setdefault(field, {})[vehicle_id] = value
+            if field in STAT_FIELDS:
+                new_states[vehicle_id][field] = value
+        results[index] = {'index': index, 'op': op, 'id': vehicle_id, 'status': 'ok'}
+
+    if values:
+        touched = set().union(*values.values())
+        updates = {
+            getattr(Vehicle, field): _case_update(getattr(Vehicle, field), Vehicle.id, mapping)
+            for field, mapping in values.items()
+        }
+        updates[Vehicle.updated_at] = datetime.utcnow()
+        Vehicle.query.filter(Vehicle.id.in_(touched)).update(updates, synchronize_session=False)
+
+        changes = [(states[vehicle_id], new_states[vehicle_id]) for vehicle_id in touched
+                   if states[vehicle_id] != new_states[vehicle_id]]
+        if changes:
+            apply_vehicle_changes(db.session.connection(), changes)
+        bump_cache_version()
+
+    if image_orders:
+        VehicleImage.query.filter(VehicleImage.id.in_(image_orders)).update({
+            VehicleImage.image_order: _case_update(VehicleImage.image_order, VehicleImage.id, image_orders)
+        }, synchronize_session=False)
+
+    return results
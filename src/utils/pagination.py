@@ -0,0 +1,110 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import DateTime, String, literal, tuple_, type_coerce
+
+# Paginação por cursor (keyset): em vez de OFFSET, cada página continua a
+# partir do último (chave de ordenação, id) visto. O custo não cresce com a
+# profundidade da página e o COUNT(*) só roda se o cliente pedir.
+
+# No SQLite as datas são texto e a ordenação compara as strings gravadas.
+# Linhas gravadas sem fração de segundo ('2024-01-01 10:00:00', por SQL ou
+# legadas) não batem com a data que o SQLAlchemy envia como parâmetro
+# ('2024-01-01 10:00:00.000000'), então o cursor guarda o texto exatamente
+# como está no banco e o compara como texto.
+
+# Colunas aceitas como chave de ordenação no modo cursor (todas não nulas)
+CURSOR_SORT_KEYS = {'created_at', 'updated_at', 'preco', 'ano', 'quilometragem', 'id'}
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+def encode_cursor(sort_by, sort_order, value, last_id):
+    """Gera o cursor opaco que aponta para depois do último item da página"""
+    payload = {'s': sort_by, 'o': sort_order, 'v': _encode_value(value), 'id': last_id}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, sort_by, sort_order):
+    """Decodifica o cursor, validando que pertence à mesma ordenação
+
+    Retorna (valor, id) ou levanta ValueError se o cursor for inválido.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        value, last_id = _decode_value(payload['v']), int(payload['id'])
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+    if payload.get('s') != sort_by or payload.get('o') != sort_order:
+        raise ValueError('Cursor não corresponde à ordenação solicitada')
+
+    return value, last_id
+
+def _stored_as_text(query, column):
+    """Indica se a coluna de ordenação é uma data guardada como texto (SQLite)"""
+    return isinstance(column.type, DateTime) and query.session.get_bind().dialect.name == 'sqlite'
+
+def keyset_paginate(query, model, sort_by, sort_order, per_page, cursor=None, include_total=False):
+    """Pagina `query` por (sort_by, id) a partir de `cursor`
+
+    Retorna (itens, dados_de_paginação). `cursor` vazio ou None = primeira página.
+    """
+    if sort_by not in CURSOR_SORT_KEYS:
+        raise ValueError('Ordenação não suportada no modo cursor')
+
+    # Como no modo página: per_page zero ou negativo vira 1
+    per_page = max(per_page, 1)
+    sort_column = getattr(model, sort_by)
+    keyset = tuple_(sort_column, model.id)
+    text_key = _stored_as_text(query, sort_column)
+
+    total = query.order_by(None).count() if include_total else None
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        if text_key and isinstance(value, str):
+            value = literal(value, String)
+        if sort_order == 'asc':
+            query = query.filter(keyset > tuple_(value, last_id))
+        else:
+            query = query.filter(keyset < tuple_(value, last_id))
+
+    if sort_order == 'asc':
+        query = query.order_by(sort_column.asc(), model.id.asc())
+    else:
+        query = query.order_by(sort_column.desc(), model.id.desc())
+
+    if text_key:
+        # Valor de ordenação como gravado, para o próximo cursor
+        query = query.add_columns(type_coerce(sort_column, String))
+
+    # Um item extra indica se existe próxima página, sem COUNT(*)
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    items = [row[0] for row in rows] if text_key else rows
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        value = rows[-1][1] if text_key else getattr(last, sort_by)
+        next_cursor = encode_cursor(sort_by, sort_order, value, last.id)
+
+    pagination = {
+        'per_page': per_page,
+        'next_cursor': next_cursor,
+        'has_next': has_next
+    }
+    if include_total:
+        pagination['total'] = total
+
+    return items, pagination
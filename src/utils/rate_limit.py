@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import threading
+import time
+from flask import current_app, request
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+# Armazenamento do rate limiting compartilhado entre os workers do
+# Passenger, sem serviço externo: um arquivo SQLite próprio (separado do
+# banco da aplicação, para não disputar o lock de escrita com ela), com
+# contadores por janela e expiração.
+#
+# Registrado no `limits` pelo esquema da URI:
+#     RATELIMIT_STORAGE_URI=sqlite:////caminho/ratelimit.db
+# e usado com a estratégia 'sliding-window-counter'. Cada verificação é uma
+# transação BEGIN IMMEDIATE, então a contagem é exata entre processos.
+
+PURGE_INTERVAL = 60  # segundos entre limpezas das chaves expiradas
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key TEXT PRIMARY KEY,
+    count INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+INCR = """
+INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :expires_at)
+ON CONFLICT (key) DO UPDATE SET
+    count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END,
+    expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+RETURNING count
+"""
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Contadores de rate limit num arquivo SQLite compartilhado"""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, busy_timeout=5000, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = uri[len('sqlite:///'):]
+        self.busy_timeout = int(busy_timeout)
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def connection(self):
+        """Uma conexão por thread (e por processo, após o fork do Passenger)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Contadores são descartáveis: sem fsync a cada requisição
+            connection.execute('PRAGMA synchronous=OFF')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _transaction(self):
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        return connection
+
+    def _purge(self, connection, now):
+        if now - self._last_purge >= PURGE_INTERVAL:
+            self._last_purge = now
+            connection.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+
+    def _get(self, connection, key, now):
+        row = connection.execute(
+            'SELECT count FROM rate_limits WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def _incr(self, connection, key, expiry, amount, now):
+        return connection.execute(
+            INCR, {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now}
+        ).fetchone()[0]
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        connection = self._transaction()
+        try:
+            count = self._incr(connection, key, expiry, amount, now)
+            self._purge(connection, now)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return count
+
+    def get(self, key):
+        return self._get(self.connection, key, time.time())
+
+    def get_expiry(self, key):
+        row = self.connection.execute(
+            'SELECT expires_at FROM rate_limits WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self.connection.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self.connection.execute('DELETE FROM rate_limits').rowcount
+
+    def clear(self, key):
+        self.connection.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def _sliding_window(self, connection, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(connection, previous_key, now)
+        current_count = self._get(connection, current_key, now)
+        previous_ttl = 0.0 if previous_count == 0 else (1 - (((now - expiry) / expiry) % 1)) * expiry
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        connection = self._transaction()
+        try:
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(connection, key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            acquired = int(weighted_count) + amount <= limit
+            if acquired:
+                # A chave da janela atual ainda serve de "anterior" na próxima
+                _, current_key = self.sliding_window_keys(key, expiry, now)
+                self._incr(connection, current_key, 2 * expiry, amount, now)
+                self._purge(connection, now)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return acquired
+
+    def get_sliding_window(self, key, expiry):
+        return self._sliding_window(self.connection, key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self.connection.execute('DELETE FROM rate_limits WHERE key IN (?, ?)', (previous_key, current_key))
+
+# Peso de cada requisição no limite padrão da rota: consultas caras
+# consomem mais da cota que consultas simples
+DEFAULT_COST = 1
+ENDPOINT_COSTS = {
+    'vehicles.get_vehicles': 1,
+    'vehicles.get_vehicle': 1,
+    'vehicles.export_vehicles_feed': 10,
+    'vehicles.import_vehicles_feed': 10,
+}
+SEARCH_COST = 5  # listagem com busca textual (?search=)
+
+def request_cost():
+    """Custo da requisição atual no limite padrão (default_limits_cost)"""
+    endpoint = request.endpoint
+    cost = current_app.config.get('RATELIMIT_ENDPOINT_COSTS', ENDPOINT_COSTS).get(endpoint, DEFAULT_COST)
+    if endpoint == 'vehicles.get_vehicles' and request.args.get('search'):
+        cost = max(cost, current_app.config.get('RATELIMIT_SEARCH_COST', SEARCH_COST))
+    return cost
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+from flask import current_app
+from src.utils.json_provider import dumps_bytes
+
+# Cache de fragmentos JSON já serializados de veículos, por processo.
+# A chave inclui updated_at, que muda a cada alteração do veículo (inclusive
+# nas imagens), então entradas antigas nunca são servidas: só deixam de ser
+# usadas e saem pelo descarte LRU.
+
+DEFAULT_MAX_ENTRIES = 5000
+
+class FragmentCache:
+    """Cache LRU de bytes limitado pelo número de entradas"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            fragment = self._entries.get(key)
+            if fragment is not None:
+                self._entries.move_to_end(key)
+            return fragment
+
+    def set(self, key, fragment):
+        with self._lock:
+            self._entries[key] = fragment
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def get_fragment_cache():
+    """Retorna o cache de fragmentos desta aplicação (um por processo)"""
+    cache = current_app.extensions.get('vehicle_fragments')
+    if cache is None:
+        cache = FragmentCache(current_app.config.get('VEHICLE_FRAGMENT_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+        current_app.extensions['vehicle_fragments'] = cache
+    return cache
+
+def vehicle_fragment(vehicle, fields=None):
+    """JSON de vehicle.to_dict(fields), reaproveitado enquanto o veículo não mudar"""
+    if vehicle.updated_at is None:
+        return dumps_bytes(vehicle.to_dict(fields))
+
+    cache = get_fragment_cache()
+    key = (vehicle.id, vehicle.updated_at, fields)
+    fragment = cache.get(key)
+    if fragment is None:
+        fragment = dumps_bytes(vehicle.to_dict(fields))
+        cache.set(key, fragment)
+    return fragment
+
+def dumps_with_fragments(payload, fragments):
+    """Serializa `payload` inserindo bytes já serializados em `fragments`
+
+    Mantém as chaves ordenadas, como o provider JSON da aplicação.
+    """
+    parts = []
+    for key in sorted({**payload, **fragments}):
+        value = fragments[key] if key in fragments else dumps_bytes(payload[key])
+        parts.append(dumps_bytes(key) + b':' + value)
+    return b'{' + b','.join(parts) + b'}'
+
+def vehicles_response(vehicles, fields=None, **payload):
+    """Resposta JSON {'vehicles': [...], **payload} montada a partir dos fragmentos"""
+    fragments = {'vehicles': b'[' + b','.join(vehicle_fragment(vehicle, fields) for vehicle in vehicles) + b']'}
+    body = dumps_with_fragments(payload, fragments) + b'\n'
+    return current_app.response_class(body, mimetype='application/json')
+
+def vehicle_response(vehicle, fields=None):
+    """Resposta JSON {'vehicle': {...}} montada a partir do fragmento"""
+    body = dumps_with_fragments({}, {'vehicle': vehicle_fragment(vehicle, fields)}) + b'\n'
+    return current_app.response_class(body, mimetype='application/json')
@@ -0,0 +1,102 @@
+import hashlib
+import mimetypes
+import os
+import re
+from flask import current_app, request, send_file
+from src.utils.compression import ENCODINGS, compress, is_compressible, negotiate_encoding
+
+# Manifesto do build do frontend (src/static), montado uma vez na
+# inicialização: a rota catch-all consulta um dicionário em vez do disco.
+# Arquivos texto ficam em memória já comprimidos (gzip/brotli); os demais
+# são enviados do disco pelo caminho conhecido. Um novo deploy reinicia os
+# workers e, com isso, refaz o manifesto.
+
+INDEX_FILE = 'index.html'
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60  # 1 ano
+MIN_COMPRESS_SIZE = 1024  # abaixo disso a compressão não compensa
+
+# Nomes com hash de conteúdo gerados pelo bundler (ex.: index-3fac10be.js)
+HASHED_NAME = re.compile(r'[.-][0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+class StaticAsset:
+    """Um arquivo do build, com as variantes comprimidas em memória"""
+
+    def __init__(self, path, relative_path):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.immutable = relative_path.startswith('assets/') or bool(HASHED_NAME.search(relative_path))
+
+        with open(path, 'rb') as file:
+            data = file.read()
+        self.etag = hashlib.sha1(data).hexdigest()
+
+        # Só arquivos compressíveis ficam em memória
+        self.bodies = {}
+        if is_compressible(self.mimetype) or relative_path == INDEX_FILE:
+            self.bodies[None] = data
+            if len(data) >= MIN_COMPRESS_SIZE:
+                for encoding in ENCODINGS:
+                    compressed = compress(data, encoding)
+                    if len(compressed) < len(data):
+                        self.bodies[encoding] = compressed
+
+    def _cache_headers(self, response):
+        if self.immutable:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
+
+    def send(self):
+        """Resposta para a requisição atual (negocia a codificação e responde 304)"""
+        if not self.bodies:
+            response = send_file(self.path, mimetype=self.mimetype, etag=self.etag, conditional=True)
+            response.cache_control.no_cache = None
+            return self._cache_headers(response)
+
+        encoding = negotiate_encoding([name for name in self.bodies if name])
+        response = current_app.response_class(self.bodies[encoding], mimetype=self.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if len(self.bodies) > 1:
+            response.vary.add('Accept-Encoding')
+
+        # ETag forte distinta por codificação (representações diferentes)
+        response.set_etag(f'{self.etag}-{encoding}' if encoding else self.etag)
+        self._cache_headers(response)
+        return response.make_conditional(request)
+
+class StaticManifest:
+    """Índice caminho relativo -> StaticAsset do build do frontend"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}
+        if folder and os.path.isdir(folder):
+            for root, _, files in os.walk(folder):
+                for name in files:
+                    path = os.path.join(root, name)
+                    relative_path = os.path.relpath(path, folder).replace(os.sep, '/')
+                    self.assets[relative_path] = StaticAsset(path, relative_path)
+
+    @property
+    def index(self):
+        return self.assets.get(INDEX_FILE)
+
+    def get(self, path):
+        return self.assets.get(path)
+
+def init_static_manifest(app):
+    """Monta o manifesto de app.static_folder"""
+    manifest = StaticManifest(app.static_folder)
+    app.extensions['static_manifest'] = manifest
+    return manifest
+
+def get_static_manifest():
+    """Manifesto da aplicação atual, montado no primeiro acesso do processo"""
+    manifest = current_app.extensions.get('static_manifest')
+    if manifest is None:
+        manifest = init_static_manifest(current_app)
+    return manifest
@@ -0,0 +1,130 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from src.main import create_app
+from src.models.db import db
+from src.models.migrations import init_database, DEFAULT_ADMIN_EMAIL
+from src.models.user import User
+from src.models.vehicle import Vehicle
+from src.models.cache import bump_cache_version
+from src import cli
+from src.routes import uploads
+from src.utils import images, image_jobs
+from src.utils.metrics import registry
+
+# Uma aplicação por teste, com banco SQLite próprio em tmp_path (já migrado
+# e com o admin padrão). Rate limiting e métricas ficam isolados no mesmo
+# diretório; os testes que precisam deles ajustam a configuração.
+
+@pytest.fixture
+def app_config(tmp_path):
+    """Configuração passada a create_app(); sobrescreva no teste se preciso"""
+    return {
+        'TESTING': True,
+        'RATELIMIT_ENABLED': False,
+        'RATELIMIT_STORAGE_URI': 'memory://',
+        'METRICS_DIR': str(tmp_path / 'metrics'),
+    }
+
+@pytest.fixture
+def database(tmp_path):
+    """Arquivo SQLite da aplicação; sobrescreva para partir de um banco existente"""
+    return tmp_path / 'app.db'
+
+@pytest.fixture
+def replica_database():
+    """Arquivo da réplica de leitura (DATABASE_REPLICA_URL); nenhuma por padrão"""
+    return None
+
+@pytest.fixture
+def app(monkeypatch, app_config, database, replica_database):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{database}")
+    if replica_database:
+        monkeypatch.setenv('DATABASE_REPLICA_URL', f"sqlite:///{replica_database}")
+    else:
+        monkeypatch.delenv('DATABASE_REPLICA_URL', raising=False)
+    # Valores de métricas são do processo: zerados para cada teste
+    registry._reset()
+    app = create_app(app_config)
+    with app.app_context():
+        init_database()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app):
+    with app.app_context():
+        admin = User.query.filter_by(email=DEFAULT_ADMIN_EMAIL).one()
+        token = create_access_token(identity=str(admin.id))
+    return {'Authorization': f'Bearer {token}'}
+
+@pytest.fixture
+def make_vehicle(app):
+    """Cria um veículo (como as rotas administrativas) e retorna seu id"""
+    def make_vehicle(**fields):
+        values = {'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2020, 'preco': 30000.0}
+        values.update(fields)
+        with app.app_context():
+            vehicle = Vehicle(**values)
+            db.session.add(vehicle)
+            bump_cache_version()
+            db.session.commit()
+            return vehicle.id
+    return make_vehicle
+
+@pytest.fixture
+def capture_sql(app):
+    """Context manager que coleta os SQL executados no banco primário"""
+    @contextmanager
+    def capture_sql():
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', listener)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', listener)
+    return capture_sql
+
+@pytest.fixture
+def upload_folder(tmp_path, monkeypatch):
+    """Pasta de uploads temporária no lugar de uploads/ do projeto"""
+    folder = tmp_path / 'uploads'
+    folder.mkdir()
+    for module in (images, image_jobs, uploads, cli):
+        monkeypatch.setattr(module, 'UPLOAD_FOLDER', str(folder))
+    monkeypatch.setattr(image_jobs, 'PENDING_FOLDER', str(folder / '.pending'))
+    return folder
+
+@pytest.fixture
+def image_executor(monkeypatch):
+    """Pool de imagens em threads: processa com a pasta de uploads temporária"""
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(image_jobs, '_executor', executor)
+    yield executor
+    image_jobs.wait_image_jobs(timeout=30)
+    executor.shutdown(wait=True)
+
+@pytest.fixture
+def make_jpeg():
+    """Bytes de um JPEG; `seed` muda o conteúdo (e o hash)"""
+    def make_jpeg(width=1600, height=1000, seed=0, format_name='JPEG'):
+        from PIL import Image
+        img = Image.new('RGB', (width, height), (seed * 37 % 256, 120, 60))
+        img.paste((255, 255, 255), (0, 0, width // 3, height // 3))
+        buffer = io.BytesIO()
+        img.save(buffer, format_name)
+        return buffer.getvalue()
+    return make_jpeg
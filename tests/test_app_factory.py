@@ -0,0 +1,53 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import pytest
+from src.main import create_app
+from src.models.migrations import MIGRATIONS, DEFAULT_ADMIN_EMAIL
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_SCRIPT = '''
+import json, sys
+from src.main import create_app
+app = create_app({'TESTING': True, 'RATELIMIT_STORAGE_URI': 'memory://'})
+assert app.test_client().get('/').status_code == 200
+print(json.dumps(sorted(name for name in ('PIL', 'magic') if name in sys.modules)))
+'''
+
+def test_startup_loads_no_image_modules_and_touches_no_schema(tmp_path):
+    database = tmp_path / 'app.db'
+    env = {**os.environ, 'DATABASE_URL': f'sqlite:///{database}', 'METRICS_DIR': str(tmp_path / 'metrics')}
+    env.pop('AUTO_INIT_DB', None)
+    output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    assert json.loads(output.strip().splitlines()[-1]) == []
+    tables = []
+    if database.exists():
+        with sqlite3.connect(database) as connection:
+            tables = connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    assert tables == []
+
+@pytest.fixture
+def bare_app(tmp_path, monkeypatch, app_config):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.delenv('DATABASE_REPLICA_URL', raising=False)
+    return create_app(app_config)
+
+def test_init_db_command_creates_schema_and_admin_once(bare_app):
+    runner = bare_app.test_cli_runner()
+    result = runner.invoke(args=['init-db'])
+    assert result.exit_code == 0
+    assert f'Schema na versão {MIGRATIONS[-1][0]}' in result.output
+    assert DEFAULT_ADMIN_EMAIL in result.output
+
+    result = runner.invoke(args=['init-db'])
+    assert result.exit_code == 0 and DEFAULT_ADMIN_EMAIL not in result.output
+
+def test_auto_init_db_for_development(tmp_path, monkeypatch, app_config):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    app = create_app({**app_config, 'AUTO_INIT_DB': True})
+    response = app.test_client().post('/api/auth/login', json={'email': DEFAULT_ADMIN_EMAIL, 'password': 'admin123'})
+    assert response.status_code == 200
@@ -0,0 +1,60 @@
+from flask_jwt_extended import decode_token
+from src.models.db import db
+from src.models.migrations import DEFAULT_ADMIN_EMAIL
+from src.models.user import User
+from src.utils.auth_cache import AuthState
+
+def test_logout_revokes_token(app, client, admin_headers):
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 200
+    assert client.post('/api/auth/logout', headers=admin_headers).status_code == 200
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 401
+
+    # Um worker novo carrega a revogação do banco
+    app.extensions.pop('auth_state')
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 401
+
+def test_other_worker_sees_revocation_incrementally(app, client, admin_headers):
+    with app.app_context():
+        other_worker = AuthState(refresh_interval=0)
+        other_worker.refresh()
+        jti = decode_token(admin_headers['Authorization'].split()[1])['jti']
+        assert not other_worker.is_revoked(jti)
+
+    client.post('/api/auth/logout', headers=admin_headers)
+    with app.app_context():
+        assert other_worker.is_revoked(jti)
+
+def test_cached_principal_skips_database(client, admin_headers, capture_sql):
+    client.get('/api/auth/me', headers=admin_headers)
+    with capture_sql() as statements:
+        response = client.get('/api/auth/me', headers=admin_headers)
+    assert response.get_json()['user']['email'] == DEFAULT_ADMIN_EMAIL
+    assert not any('FROM users' in statement for statement in statements)
+
+def test_role_change_and_deactivation_invalidate_cache(app, client, admin_headers):
+    assert client.get('/api/admin/vehicles', headers=admin_headers).status_code == 200
+
+    with app.app_context():
+        User.query.filter_by(email=DEFAULT_ADMIN_EMAIL).one().role = 'editor'
+        db.session.commit()
+    assert client.get('/api/admin/vehicles', headers=admin_headers).status_code == 403
+
+    with app.app_context():
+        User.query.filter_by(email=DEFAULT_ADMIN_EMAIL).one().is_active = False
+        db.session.commit()
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 401
+
+def test_change_in_other_worker_reaches_this_one(app, client, admin_headers):
+    app.config['AUTH_REVOCATION_REFRESH_INTERVAL'] = 0
+    app.extensions.pop('auth_state', None)
+    client.get('/api/auth/me', headers=admin_headers)
+
+    # Alteração feita por outro worker: só o evento gravado chega a este
+    with app.app_context():
+        user = User.query.filter_by(email=DEFAULT_ADMIN_EMAIL).one()
+        state = app.extensions.pop('auth_state')
+        user.is_active = False
+        db.session.commit()
+        app.extensions['auth_state'] = state
+        assert user.id in state.principals
+    assert client.get('/api/auth/me', headers=admin_headers).status_code == 401
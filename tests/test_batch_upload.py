@@ -0,0 +1,69 @@
+import io
+from src.models.db import db
+from src.models.vehicle import Vehicle, VehicleImage
+
+def upload_batch(client, headers, vehicle_id, files):
+    return client.post(f'/api/admin/vehicles/{vehicle_id}/upload/batch', headers=headers,
+                       data={'images': [(io.BytesIO(data), name) for name, data in files]},
+                       content_type='multipart/form-data')
+
+def test_batch_reports_each_file_and_commits_once(app, client, admin_headers, make_vehicle, make_jpeg,
+                                                  upload_folder, image_executor, monkeypatch):
+    vehicle_id = make_vehicle()
+    files = [
+        ('a.jpg', make_jpeg(seed=1)),
+        ('b.png', make_jpeg(seed=2, format_name='PNG')),
+        ('notas.txt', b'texto'),
+        ('falso.jpg', b'nao e imagem' * 100),
+    ]
+    commits = []
+    commit = db.session.commit
+    monkeypatch.setattr(db.session, 'commit', lambda: commits.append(1) or commit())
+    response = upload_batch(client, admin_headers, vehicle_id, files)
+    assert response.status_code == 201
+    results = response.get_json()['results']
+    assert [result['success'] for result in results] == [True, True, False, False]
+    assert all(result['error'] for result in results[2:])
+    assert len(commits) == 1
+
+    with app.app_context():
+        vehicle = db.session.get(Vehicle, vehicle_id)
+        assert vehicle.get_imagens() == [results[0]['url'], results[1]['url']]
+        assert VehicleImage.query.filter_by(vehicle_id=vehicle_id).count() == 2
+    assert (upload_folder / results[0]['thumbnail_url'].rsplit('/', 1)[1]).exists()
+
+def test_batch_processes_repeated_content_once(client, admin_headers, make_vehicle, make_jpeg,
+                                               upload_folder, image_executor, monkeypatch):
+    submitted = []
+    submit = image_executor.submit
+    monkeypatch.setattr(image_executor, 'submit', lambda *args: submitted.append(args) or submit(*args))
+    vehicle_id = make_vehicle()
+    data = make_jpeg(seed=3)
+    results = upload_batch(client, admin_headers, vehicle_id, [('a.jpg', data), ('b.jpg', data)]).get_json()['results']
+    assert [result['success'] for result in results] == [True, True]
+    assert results[0]['url'] == results[1]['url']
+    assert len(submitted) == 1
+
+    # Conteúdo já em disco nem chega ao pool
+    results = upload_batch(client, admin_headers, vehicle_id, [('c.jpg', data)]).get_json()['results']
+    assert results[0]['success'] and len(submitted) == 1
+
+def test_batch_limits(app, client, admin_headers, make_vehicle, make_jpeg, upload_folder, image_executor):
+    app.config['BATCH_UPLOAD_MAX_FILES'] = 2
+    vehicle_id = make_vehicle()
+    files = [(f'{seed}.jpg', make_jpeg(seed=seed)) for seed in range(3)]
+    assert upload_batch(client, admin_headers, vehicle_id, files).status_code == 400
+    assert upload_batch(client, admin_headers, 999, files[:1]).status_code == 404
+    assert upload_batch(client, admin_headers, vehicle_id, []).status_code == 400
+
+    all_invalid = upload_batch(client, admin_headers, vehicle_id, [('x.gif', b'GIF89a')])
+    assert all_invalid.status_code == 400
+    assert all_invalid.get_json()['results'][0]['success'] is False
+
+def test_batch_over_size_limit_returns_413(app, client, admin_headers, make_vehicle, make_jpeg,
+                                           upload_folder, image_executor):
+    app.config['BATCH_UPLOAD_MAX_CONTENT_LENGTH'] = 10000
+    vehicle_id = make_vehicle()
+    response = upload_batch(client, admin_headers, vehicle_id, [('a.jpg', make_jpeg()), ('b.jpg', make_jpeg(seed=1))])
+    assert response.status_code == 413
+    assert response.get_json() == {'error': 'Arquivo muito grande'}
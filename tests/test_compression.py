@@ -0,0 +1,52 @@
+import gzip
+import json
+import pytest
+from src.utils import cache as response_cache
+from src.utils.compression import ENCODINGS
+
+@pytest.fixture
+def listing(make_vehicle):
+    for index in range(20):
+        make_vehicle(modelo=f'Uno {index}', descricao='Carro revisado, único dono. ' * 20)
+    return '/api/vehicles?per_page=20'
+
+def test_large_json_is_gzipped(client, listing):
+    plain = client.get(listing)
+    response = client.get(listing, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+    assert len(response.data) < len(plain.data)
+
+@pytest.mark.skipif('br' not in ENCODINGS, reason='brotli não instalado')
+def test_brotli_preferred(client, listing):
+    import brotli
+    response = client.get(listing, headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert json.loads(brotli.decompress(response.data))['vehicles']
+
+def test_small_responses_and_disabled_compression(app, client, listing):
+    small = client.get('/api/vehicles/1', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    app.config['COMPRESSION_ENABLED'] = False
+    assert 'Content-Encoding' not in client.get(listing, headers={'Accept-Encoding': 'gzip'}).headers
+
+def test_compressed_body_reused_from_response_cache(client, listing, monkeypatch):
+    calls = []
+    compress = response_cache.compress
+    monkeypatch.setattr(response_cache, 'compress', lambda *args: calls.append(args[1:]) or compress(*args))
+    first = client.get(listing, headers={'Accept-Encoding': 'gzip'})
+    second = client.get(listing, headers={'Accept-Encoding': 'gzip'})
+    assert first.data == second.data
+    assert calls == [('gzip', 6)]
+
+def test_configured_level_and_encoded_etag(app, client, listing, monkeypatch):
+    app.config['COMPRESSION_GZIP_LEVEL'] = 1
+    calls = []
+    compress = response_cache.compress
+    monkeypatch.setattr(response_cache, 'compress', lambda *args: calls.append(args[1:]) or compress(*args))
+    response = client.get(listing, headers={'Accept-Encoding': 'gzip'})
+    assert calls == [('gzip', 1)]
+    assert response.headers['ETag'].endswith('-gzip"')
+    revalidated = client.get(listing, headers={'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
@@ -0,0 +1,53 @@
+VEHICLE = {'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2020, 'preco': 30000}
+
+def test_vehicle_detail_revalidates_with_etag_and_date(client, make_vehicle):
+    vehicle_id = make_vehicle()
+    response = client.get(f'/api/vehicles/{vehicle_id}')
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    not_modified = client.get(f'/api/vehicles/{vehicle_id}', headers={'If-None-Match': etag})
+    assert not_modified.status_code == 304 and not_modified.data == b''
+    assert not_modified.headers['ETag'] == etag
+
+    since = response.headers['Last-Modified']
+    assert client.get(f'/api/vehicles/{vehicle_id}', headers={'If-Modified-Since': since}).status_code == 304
+
+def test_vehicle_detail_etag_changes_after_update(client, admin_headers, make_vehicle):
+    vehicle_id = make_vehicle()
+    etag = client.get(f'/api/vehicles/{vehicle_id}').headers['ETag']
+    client.put(f'/api/admin/vehicles/{vehicle_id}', json={**VEHICLE, 'preco': 1}, headers=admin_headers)
+
+    response = client.get(f'/api/vehicles/{vehicle_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_listing_revalidates_until_catalog_changes(client, admin_headers, make_vehicle):
+    vehicle_id = make_vehicle()
+    etag = client.get('/api/vehicles?per_page=5').headers['ETag']
+    assert client.get('/api/vehicles?per_page=5', headers={'If-None-Match': etag}).status_code == 304
+    # Outra consulta, outra representação
+    assert client.get('/api/vehicles?per_page=6', headers={'If-None-Match': etag}).status_code == 200
+
+    client.delete(f'/api/admin/vehicles/{vehicle_id}', headers=admin_headers)
+    response = client.get('/api/vehicles?per_page=5', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['vehicles'] == []
+
+def test_listing_validator_does_not_scan_vehicles(app, client, make_vehicle, capture_sql):
+    make_vehicle()
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    etag = client.get('/api/vehicles?cursor=').headers['ETag']
+
+    with capture_sql() as statements:
+        response = client.get('/api/vehicles?cursor=', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert not any('FROM vehicles' in statement for statement in statements)
+
+def test_cached_listing_answers_conditional_requests(client, make_vehicle):
+    make_vehicle()
+    etag = client.get('/api/vehicles').headers['ETag']
+    response = client.get('/api/vehicles', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['X-Cache'] == 'HIT'
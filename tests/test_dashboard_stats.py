@@ -0,0 +1,54 @@
+from datetime import datetime
+from src.models.db import db
+from src.models.stats import VehicleStat, rebuild_vehicle_stats
+
+VEHICLE = {'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2020, 'preco': 30000, 'categoria': 'Hatch'}
+
+def stats(client, admin_headers):
+    response = client.get('/api/admin/dashboard/stats', headers=admin_headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+def snapshot(app):
+    with app.app_context():
+        return sorted((stat.dimension, stat.value, stat.count) for stat in VehicleStat.query if stat.count)
+
+def test_counters_follow_create_update_and_delete(client, admin_headers):
+    created = client.post('/api/admin/vehicles', json=VEHICLE, headers=admin_headers).get_json()['vehicle']
+    client.post('/api/admin/vehicles', json={**VEHICLE, 'marca': 'Ford', 'categoria': 'SUV'}, headers=admin_headers)
+
+    result = stats(client, admin_headers)
+    assert result['total_vehicles'] == 2
+    assert {'name': 'Hatch', 'count': 1} in result['categories']
+
+    client.put(f"/api/admin/vehicles/{created['id']}", json={**VEHICLE, 'categoria': 'SUV'}, headers=admin_headers)
+    result = stats(client, admin_headers)
+    assert result['categories'] == [{'name': 'SUV', 'count': 2}]
+
+    client.delete(f"/api/admin/vehicles/{created['id']}", headers=admin_headers)
+    result = stats(client, admin_headers)
+    assert result['total_vehicles'] == 1
+    assert result['total_inactive'] == 1
+    assert result['brands'] == [{'name': 'Ford', 'count': 1}]
+
+    today = datetime.utcnow().date().isoformat()
+    day = next(entry for entry in result['history'] if entry['date'] == today)
+    assert (day['added'], day['removed']) == (2, 1)
+
+def test_incremental_counters_match_a_full_rebuild(app, client, admin_headers, make_vehicle):
+    for marca in ('Fiat', 'Fiat', 'Honda'):
+        make_vehicle(marca=marca, categoria='Hatch')
+    vehicle_id = make_vehicle(marca='Ford', categoria='SUV')
+    client.delete(f'/api/admin/vehicles/{vehicle_id}', headers=admin_headers)
+
+    incremental = snapshot(app)
+    with app.app_context():
+        rebuild_vehicle_stats()
+        db.session.commit()
+    assert snapshot(app) == incremental
+
+def test_dashboard_does_not_scan_vehicles(client, admin_headers, make_vehicle, capture_sql):
+    make_vehicle()
+    with capture_sql() as statements:
+        stats(client, admin_headers)
+    assert statements and not any('FROM vehicles' in statement for statement in statements)
@@ -0,0 +1,52 @@
+import sqlite3
+import pytest
+from src.models.db import db, engine_options, normalize_database_url
+from src.models.user import User
+from src.models.vehicle import Vehicle
+
+def test_relative_sqlite_paths_resolve_from_project_root():
+    assert normalize_database_url('sqlite:///src/database/app.db', '/srv/app') == 'sqlite:////srv/app/src/database/app.db'
+    assert normalize_database_url('sqlite:////tmp/app.db', '/srv/app') == 'sqlite:////tmp/app.db'
+    assert normalize_database_url('sqlite:///:memory:', '/srv/app') == 'sqlite:///:memory:'
+    assert normalize_database_url('postgresql://u@h/db', '/srv/app') == 'postgresql://u@h/db'
+
+def test_pool_options_only_for_server_databases():
+    assert engine_options('sqlite:////tmp/app.db', {}) == {}
+    options = engine_options('postgresql://u@h/db', {'DB_POOL_SIZE': '3'})
+    assert options['pool_size'] == 3 and options['pool_pre_ping']
+
+def test_models_share_one_engine(app, database):
+    assert User.metadata is Vehicle.metadata is db.metadata
+    with app.app_context():
+        assert db.engine.url.database == str(database)
+
+class TestReadReplica:
+    @pytest.fixture
+    def replica_database(self, tmp_path):
+        return tmp_path / 'replica.db'
+
+    @pytest.fixture
+    def vehicle_id(self, app, make_vehicle, database, replica_database):
+        vehicle_id = make_vehicle()
+        # Réplica = cópia do primário, com uma diferença para identificar a origem
+        with app.app_context():
+            db.session.remove()
+            db.engines[None].dispose()
+        with sqlite3.connect(database) as primary, sqlite3.connect(replica_database) as replica:
+            primary.backup(replica)
+            replica.execute("UPDATE vehicles SET modelo = 'Réplica'")
+        return vehicle_id
+
+    def test_public_reads_go_to_replica(self, client, vehicle_id):
+        assert client.get(f'/api/vehicles/{vehicle_id}').get_json()['vehicle']['modelo'] == 'Réplica'
+        assert client.get('/api/vehicles').get_json()['vehicles'][0]['modelo'] == 'Réplica'
+
+    def test_admin_reads_and_writes_use_primary(self, client, admin_headers, vehicle_id, replica_database):
+        vehicles = client.get('/api/admin/vehicles', headers=admin_headers).get_json()['vehicles']
+        assert [vehicle['modelo'] for vehicle in vehicles] == ['Uno']
+
+        client.delete(f'/api/admin/vehicles/{vehicle_id}', headers=admin_headers)
+        with sqlite3.connect(replica_database) as replica:
+            assert replica.execute('SELECT is_active FROM vehicles').fetchone() == (1,)
+        vehicles = client.get('/api/admin/vehicles', headers=admin_headers).get_json()['vehicles']
+        assert vehicles[0]['is_active'] is False
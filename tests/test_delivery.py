@@ -0,0 +1,44 @@
+import pytest
+from werkzeug.exceptions import NotFound
+from src.utils.delivery import send_upload
+
+@pytest.fixture
+def stored_file(upload_folder):
+    (upload_folder / 'abc.jpg').write_bytes(b'\xff\xd8' + bytes(range(256)) * 4)
+    return 'abc.jpg'
+
+def test_flask_mode_sends_immutable_file_with_range(client, stored_file):
+    response = client.get(f'/api/uploads/{stored_file}')
+    assert response.status_code == 200
+    assert response.cache_control.immutable and response.cache_control.public
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+
+    partial = client.get(f'/api/uploads/{stored_file}', headers={'Range': 'bytes=0-9'})
+    assert partial.status_code == 206
+    assert partial.data == response.data[:10]
+    assert partial.headers['Content-Range'] == f'bytes 0-9/{len(response.data)}'
+
+    revalidated = client.get(f'/api/uploads/{stored_file}', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+
+@pytest.mark.parametrize('mode, header, expected', [
+    ('x-sendfile', 'X-Sendfile', lambda folder: str(folder / 'abc.jpg')),
+    ('x-accel-redirect', 'X-Accel-Redirect', lambda folder: '/protected-uploads/abc.jpg'),
+])
+def test_front_server_modes_send_no_body(app, client, upload_folder, stored_file, mode, header, expected):
+    app.config['UPLOADS_DELIVERY_MODE'] = mode
+    response = client.get(f'/api/uploads/{stored_file}')
+    assert response.status_code == 200
+    assert response.data == b''
+    assert response.headers[header] == expected(upload_folder)
+    assert response.mimetype == 'image/jpeg'
+    assert response.cache_control.immutable
+
+@pytest.mark.parametrize('mode', ['flask', 'x-sendfile', 'x-accel-redirect'])
+def test_missing_or_escaping_paths_are_404(app, client, upload_folder, mode):
+    app.config['UPLOADS_DELIVERY_MODE'] = mode
+    assert client.get('/api/uploads/nada.png').status_code == 404
+    (upload_folder.parent / 'app.txt').write_text('fora da pasta')
+    with app.test_request_context():
+        with pytest.raises(NotFound):
+            send_upload(str(upload_folder), '../app.txt')
@@ -0,0 +1,48 @@
+def facets(client, **params):
+    response = client.get('/api/vehicles', query_string=params)
+    assert response.status_code == 200
+    return response.get_json()['facets']
+
+def stock(make_vehicle):
+    make_vehicle(marca='Fiat', categoria='Hatch', combustivel='Flex', ano=2018, preco=25000)
+    make_vehicle(marca='Fiat', categoria='Sedan', combustivel='Flex', ano=2020, preco=60000)
+    make_vehicle(marca='Honda', categoria='SUV', combustivel='Gasolina', ano=2022, preco=160000)
+    make_vehicle(marca='Honda', categoria='SUV', combustivel='Gasolina', ano=2022, preco=170000,
+                 is_active=False)
+
+def test_catalog_facets_count_active_vehicles(client, make_vehicle):
+    stock(make_vehicle)
+    result = facets(client, facets='all')
+
+    assert result['marca'] == [{'value': 'Fiat', 'count': 2}, {'value': 'Honda', 'count': 1}]
+    assert result['ano'] == {'min': 2018, 'max': 2022, 'values': [
+        {'value': 2022, 'count': 1}, {'value': 2020, 'count': 1}, {'value': 2018, 'count': 1}
+    ]}
+    assert result['preco'] == [
+        {'min': 0, 'max': 30000, 'count': 1},
+        {'min': 50000, 'max': 75000, 'count': 1},
+        {'min': 150000, 'max': 200000, 'count': 1},
+    ]
+
+def test_facets_follow_filters(client, make_vehicle):
+    stock(make_vehicle)
+    result = facets(client, facets='categoria,combustivel', marca='Fiat')
+    assert set(result) == {'categoria', 'combustivel'}
+    assert result['categoria'] == [{'value': 'Hatch', 'count': 1}, {'value': 'Sedan', 'count': 1}]
+    assert result['combustivel'] == [{'value': 'Flex', 'count': 2}]
+
+def test_catalog_facets_refresh_after_write(client, admin_headers, make_vehicle):
+    stock(make_vehicle)
+    assert facets(client, facets='marca')['marca'][1] == {'value': 'Honda', 'count': 1}
+    client.post('/api/admin/vehicles', headers=admin_headers,
+                json={'marca': 'Honda', 'modelo': 'Fit', 'ano': 2015, 'preco': 40000})
+    assert {'value': 'Honda', 'count': 2} in facets(client, facets='marca')['marca']
+
+def test_unknown_facet_is_rejected(client):
+    response = client.get('/api/vehicles?facets=marca,cor')
+    assert response.status_code == 400
+    assert 'cor' in response.get_json()['error']
+
+def test_facets_are_optional(client, make_vehicle):
+    make_vehicle()
+    assert 'facets' not in client.get('/api/vehicles').get_json()
@@ -0,0 +1,42 @@
+import pytest
+from src.utils.fields import parse_fields
+
+CARD = ['ano', 'id', 'imagem', 'marca', 'modelo', 'preco', 'quilometragem']
+
+def test_parse_fields():
+    assert parse_fields(None) is None
+    assert parse_fields('full') is None
+    assert parse_fields('preco, id,preco') == ('id', 'preco')
+    assert list(parse_fields('card')) == CARD
+    with pytest.raises(ValueError):
+        parse_fields('id,senha')
+
+def test_card_preset_serializes_only_card_fields(client, make_vehicle):
+    make_vehicle(imagens='["/api/uploads/a.jpg", "/api/uploads/b.jpg"]', descricao='texto longo')
+    vehicle = client.get('/api/vehicles?fields=card').get_json()['vehicles'][0]
+    assert sorted(vehicle) == CARD
+    assert vehicle['imagem'] == '/api/uploads/a.jpg'
+
+def test_card_listing_does_not_load_descricao(client, make_vehicle, capture_sql):
+    make_vehicle(descricao='texto longo')
+    with capture_sql() as statements:
+        client.get('/api/vehicles?fields=card&nocache=1')
+    # A contagem da paginação não lê os valores das colunas
+    selects = [statement for statement in statements
+               if statement.startswith('SELECT vehicles.') and 'FROM vehicles' in statement]
+    assert selects and not any('descricao' in statement for statement in selects)
+
+def test_detail_projection_and_cursor_listing(client, make_vehicle):
+    vehicle_id = make_vehicle()
+    assert sorted(client.get(f'/api/vehicles/{vehicle_id}?fields=preco').get_json()['vehicle']) == ['preco']
+    body = client.get('/api/vehicles?fields=marca&sort_by=preco&cursor=').get_json()
+    assert [sorted(vehicle) for vehicle in body['vehicles']] == [['marca']]
+
+def test_invalid_field_is_400(client):
+    assert client.get('/api/vehicles?fields=senha').status_code == 400
+
+def test_projections_are_cached_separately(client, make_vehicle):
+    make_vehicle()
+    full = client.get('/api/vehicles').get_json()['vehicles'][0]
+    card = client.get('/api/vehicles?fields=card').get_json()['vehicles'][0]
+    assert 'descricao' in full and 'descricao' not in card
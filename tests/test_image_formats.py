@@ -0,0 +1,53 @@
+import io
+import pytest
+from src.utils.images import available_formats, process_upload
+
+@pytest.fixture
+def stored_image(upload_folder, make_jpeg):
+    """Imagem processada em disco; retorna o nome do JPEG"""
+    filename, _, _ = process_upload(io.BytesIO(make_jpeg()))
+    return filename
+
+def test_variants_written_next_to_jpeg(upload_folder, stored_image):
+    stem = stored_image.rsplit('.', 1)[0]
+    for extension, _, _, _ in available_formats():
+        assert (upload_folder / f'{stem}.{extension}').exists()
+        assert (upload_folder / f'thumb_{stem}.{extension}').exists()
+
+@pytest.mark.parametrize('accept, expected', [
+    ('image/avif,image/webp,*/*', 'image/avif'),
+    ('image/webp,*/*;q=0.8', 'image/webp'),
+    ('image/avif;q=0,image/webp', 'image/webp'),
+    ('*/*', 'image/jpeg'),
+    (None, 'image/jpeg'),
+])
+def test_serve_upload_negotiates_format(client, stored_image, accept, expected):
+    if expected == 'image/avif' and not any(entry[0] == 'avif' for entry in available_formats()):
+        pytest.skip('Pillow sem suporte a AVIF')
+    headers = {'Accept': accept} if accept else {}
+    response = client.get(f'/api/uploads/{stored_image}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == expected
+    assert 'Accept' in response.vary
+
+def test_serve_upload_falls_back_to_jpeg_without_variant(client, upload_folder, stored_image):
+    (upload_folder / stored_image.replace('.jpg', '.webp')).unlink()
+    (upload_folder / stored_image.replace('.jpg', '.avif')).unlink(missing_ok=True)
+    response = client.get(f'/api/uploads/{stored_image}', headers={'Accept': 'image/avif,image/webp'})
+    assert response.mimetype == 'image/jpeg'
+
+def test_serve_upload_missing_file(client, upload_folder):
+    assert client.get('/api/uploads/nada.jpg').status_code == 404
+
+def test_backfill_command_creates_missing_variants(app, upload_folder, stored_image):
+    for extension, _, _, _ in available_formats():
+        (upload_folder / stored_image.replace('.jpg', f'.{extension}')).unlink()
+
+    result = app.test_cli_runner().invoke(args=['images-backfill-formats'])
+    assert result.exit_code == 0
+    assert f'{len(available_formats())} variante(s) criada(s), 0 falha(s)' in result.output
+    assert (upload_folder / stored_image.replace('.jpg', '.webp')).exists()
+
+    # Segunda execução não refaz nada
+    result = app.test_cli_runner().invoke(args=['images-backfill-formats'])
+    assert '0 variante(s) criada(s)' in result.output
@@ -0,0 +1,134 @@
+import io
+import socket
+import subprocess
+import sys
+import threading
+from datetime import datetime
+from src.models.db import db
+from src.models.image_job import ImageJob
+from src.utils import image_jobs
+from src.utils.images import process_image, read_progress
+
+def upload_async(client, admin_headers, vehicle_id, data):
+    return client.post(f'/api/admin/vehicles/{vehicle_id}/upload?async=1', headers=admin_headers,
+                       data={'image': (io.BytesIO(data), 'foto.jpg')}, content_type='multipart/form-data')
+
+def dead_worker():
+    """Identificador de um worker deste host que já encerrou"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return f'{socket.gethostname()}:{process.pid}'
+
+def add_job(app, upload_folder, vehicle_id, data, **fields):
+    pending = upload_folder / '.pending'
+    pending.mkdir(exist_ok=True)
+    raw_path = pending / 'job.raw'
+    raw_path.write_bytes(data)
+    with app.app_context():
+        db.session.add(ImageJob(id='a' * 32, vehicle_id=vehicle_id, raw_path=str(raw_path),
+                                original_filename='foto.jpg', **fields))
+        db.session.commit()
+    return 'a' * 32
+
+def test_async_upload_completes_in_pool(client, admin_headers, make_vehicle, make_jpeg,
+                                        upload_folder, image_executor):
+    vehicle_id = make_vehicle()
+    response = upload_async(client, admin_headers, vehicle_id, make_jpeg())
+    assert response.status_code == 202
+    job = response.get_json()['job']
+    assert job['status'] == 'processing'
+
+    assert image_jobs.wait_image_jobs(timeout=30)
+    job = client.get(job['status_url'], headers=admin_headers).get_json()['job']
+    assert (job['status'], job['progress']) == ('done', 100)
+    assert job['image']['vehicle_id'] == vehicle_id
+    assert client.get(f'/api/vehicles/{vehicle_id}').get_json()['vehicle']['imagens'] == [job['image']['url']]
+    # Arquivo bruto e de progresso removidos
+    assert list((upload_folder / '.pending').iterdir()) == []
+
+def test_invalid_image_fails_job(client, admin_headers, make_vehicle, make_jpeg, upload_folder, image_executor):
+    vehicle_id = make_vehicle()
+    # JPEG truncado: cabeçalho válido (passa na checagem do upload), mas não decodifica
+    response = upload_async(client, admin_headers, vehicle_id, make_jpeg()[:600])
+    assert response.status_code == 202
+
+    assert image_jobs.wait_image_jobs(timeout=30)
+    job = client.get(response.get_json()['job']['status_url'], headers=admin_headers).get_json()['job']
+    assert (job['status'], job['error']) == ('failed', 'Arquivo de imagem inválido ou corrompido')
+    assert list((upload_folder / '.pending').iterdir()) == []
+
+def test_process_image_reports_each_step(upload_folder, make_jpeg):
+    steps = []
+    process_image(io.BytesIO(make_jpeg()), progress=steps.append)
+    assert steps == sorted(steps) and len(steps) == 4 and steps[-1] < 100
+
+def test_status_reports_progress_written_by_pool(app, client, admin_headers, make_vehicle, make_jpeg,
+                                                 upload_folder):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='processing', progress=10,
+                     worker=image_jobs._worker_id(), updated_at=datetime.utcnow())
+    with app.app_context():
+        path = image_jobs.progress_path(db.session.get(ImageJob, job_id))
+    with open(path, 'w') as file:
+        file.write('75')
+    assert read_progress(path) == 75
+
+    job = client.get(f'/api/admin/image-jobs/{job_id}', headers=admin_headers).get_json()['job']
+    assert (job['status'], job['progress']) == ('processing', 75)
+
+def test_sweep_resumes_job_of_dead_worker_without_waiting_for_timeout(app, client, admin_headers, make_vehicle, make_jpeg,
+                                                                      upload_folder, image_executor,
+                                                                      monkeypatch):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='processing', progress=10,
+                     worker=dead_worker(), attempts=1, updated_at=datetime.utcnow())
+    # Rotas públicas não varrem os jobs; as administrativas sim (primeira deste processo)
+    monkeypatch.setattr(image_jobs, '_sweep_pid', None)
+    client.get('/api/vehicles')
+    assert image_jobs._sweep_pid is None
+    client.get('/api/admin/image-jobs/inexistente', headers=admin_headers)
+
+    assert image_jobs.wait_image_jobs(timeout=30)
+    with app.app_context():
+        job = db.session.get(ImageJob, job_id)
+        assert (job.status, job.attempts, job.worker) == ('done', 2, image_jobs._worker_id())
+
+def test_live_worker_job_is_left_alone(app, make_vehicle, make_jpeg, upload_folder, image_executor):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='processing', progress=10,
+                     worker=image_jobs._worker_id(), updated_at=datetime.utcnow())
+    with app.app_context():
+        assert image_jobs.recover_image_jobs() == 0
+        assert db.session.get(ImageJob, job_id).status == 'processing'
+
+def test_recovery_fails_jobs_out_of_attempts(app, make_vehicle, make_jpeg, upload_folder, image_executor):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='processing', progress=10,
+                     worker=dead_worker(), attempts=image_jobs.MAX_ATTEMPTS, updated_at=datetime.utcnow())
+    with app.app_context():
+        assert image_jobs.recover_image_jobs() == 0
+        job = db.session.get(ImageJob, job_id)
+        assert (job.status, job.attempts, job.error) == ('failed', image_jobs.MAX_ATTEMPTS, image_jobs.EXHAUSTED_ERROR)
+    assert list((upload_folder / '.pending').iterdir()) == []
+
+def test_pool_callback_only_hands_off_result(app, make_vehicle, make_jpeg, upload_folder, image_executor,
+                                             monkeypatch):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='pending')
+    finished = []
+    monkeypatch.setattr(image_jobs, '_finish_job', lambda app, job_id, future: finished.append(
+        (job_id, threading.current_thread().name)))
+    with app.app_context():
+        assert image_jobs.dispatch_image_job(job_id)
+    assert image_jobs.wait_image_jobs(timeout=30)
+    assert finished == [(job_id, 'image-jobs-finisher')]
+
+def test_recover_command_waits_for_resumed_jobs(app, make_vehicle, make_jpeg, upload_folder, image_executor):
+    vehicle_id = make_vehicle()
+    job_id = add_job(app, upload_folder, vehicle_id, make_jpeg(), status='processing', progress=10,
+                     worker=dead_worker(), attempts=1, updated_at=datetime.utcnow())
+    result = app.test_cli_runner().invoke(args=['image-jobs-recover'])
+    assert result.exit_code == 0
+    assert '1 job(s) retomado(s)' in result.output
+    with app.app_context():
+        assert db.session.get(ImageJob, job_id).status == 'done'
@@ -0,0 +1,51 @@
+import io
+import pytest
+from PIL import Image
+from src.utils import images
+from src.utils.images import FULL_SIZE, THUMBNAIL_SIZE, decode_image, fit_size, process_upload
+
+def upload(client, headers, vehicle_id, data, name='foto.jpg'):
+    return client.post(f'/api/admin/vehicles/{vehicle_id}/upload', headers=headers,
+                       data={'image': (io.BytesIO(data), name)}, content_type='multipart/form-data')
+
+def test_single_decode_produces_both_sizes(upload_folder, make_jpeg, monkeypatch):
+    opened = []
+    image_open = Image.open
+    monkeypatch.setattr(Image, 'open', lambda *args, **kwargs: opened.append(args) or image_open(*args, **kwargs))
+    filename, thumbnail_filename, _ = process_upload(io.BytesIO(make_jpeg(2000, 1500)))
+    # Um Image.open na validação (cabeçalho) e um na decodificação
+    assert len(opened) == 2
+
+    with image_open(upload_folder / filename) as img:
+        assert img.size == (1067, 800)
+    with image_open(upload_folder / thumbnail_filename) as img:
+        assert img.width <= THUMBNAIL_SIZE[0] and img.height <= THUMBNAIL_SIZE[1]
+
+def test_small_image_is_not_enlarged(upload_folder, make_jpeg):
+    filename, _, _ = process_upload(io.BytesIO(make_jpeg(640, 480)))
+    with Image.open(upload_folder / filename) as img:
+        assert img.size == (640, 480)
+
+def test_jpeg_draft_decodes_reduced_but_not_below_box(make_jpeg):
+    data = make_jpeg(2000, 1500)
+    img = decode_image(io.BytesIO(data), THUMBNAIL_SIZE)
+    # Escala 1/4 do decoder: menor que o original, ainda cobrindo a caixa
+    assert img.size == (500, 375)
+    target = fit_size((2000, 1500), THUMBNAIL_SIZE)
+    assert img.width >= target[0] and img.height >= target[1]
+    # Sem o dobro da caixa, decodifica em tamanho cheio
+    assert decode_image(io.BytesIO(data), FULL_SIZE).size == (2000, 1500)
+
+@pytest.mark.parametrize('format_name, name', [('JPEG', 'foto.jpg'), ('PNG', 'foto.png'), ('WEBP', 'foto.webp')])
+def test_truncated_image_rejected_for_every_format(client, admin_headers, make_vehicle, make_jpeg,
+                                                   upload_folder, format_name, name):
+    data = make_jpeg(800, 600, format_name=format_name)
+    response = upload(client, admin_headers, make_vehicle(), data[:len(data) // 2], name)
+    assert response.status_code == 400
+    assert [path.name for path in upload_folder.iterdir() if not path.name.startswith('.')] == []
+
+def test_oversized_dimensions_rejected(client, admin_headers, make_vehicle, make_jpeg, upload_folder):
+    data = make_jpeg(images.MAX_IMAGE_DIMENSION + 1, 100)
+    response = upload(client, admin_headers, make_vehicle(), data)
+    assert response.status_code == 400
+    assert [path.name for path in upload_folder.iterdir() if not path.name.startswith('.')] == []
@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+
+CSV_FEED = (
+    'external_id,marca,modelo,ano,preco,imagens\n'
+    'A1,Fiat,Uno,2018,25000,/api/uploads/a.jpg|/api/uploads/b.jpg\n'
+    'A2,VW,Gol,1800,30000,\n'
+    ',Ford,Ka,2019,32000,\n'
+)
+
+def import_feed(client, headers, body, mimetype, **params):
+    return client.post('/api/admin/vehicles/import', headers=headers, data=body,
+                       content_type=mimetype, query_string=params)
+
+def test_csv_import_reports_rows_and_upserts(client, admin_headers):
+    report = import_feed(client, admin_headers, CSV_FEED, 'text/csv').get_json()
+    assert (report['created'], report['updated'], report['failed']) == (2, 0, 1)
+    assert report['errors'][0]['row'] == 3 and 'ano' in report['errors'][0]['errors']
+
+    ndjson = json.dumps({'external_id': 'A1', 'marca': 'Fiat', 'modelo': 'Uno Way', 'ano': 2018, 'preco': 24000})
+    report = import_feed(client, admin_headers, ndjson + '\n', 'application/x-ndjson').get_json()
+    assert (report['created'], report['updated']) == (0, 1)
+
+    vehicles = client.get('/api/vehicles?search=Uno').get_json()['vehicles']
+    assert [(vehicle['modelo'], vehicle['preco']) for vehicle in vehicles] == [('Uno Way', 24000.0)]
+
+def test_import_batches_are_independent_transactions(client, admin_headers):
+    feed = 'marca,modelo,ano,preco\n' + ''.join(f'Fiat,Uno,20{index:02d},{30000 + index}\n' for index in range(5))
+    report = import_feed(client, admin_headers, feed, 'text/csv', batch_size=2).get_json()
+    assert report['created'] == 5
+    assert client.get('/api/vehicles').get_json()['pagination']['total'] == 5
+
+def test_import_rejects_bad_format_and_requires_admin(client, admin_headers):
+    assert import_feed(client, admin_headers, 'x', 'text/plain').status_code == 400
+    assert client.post('/api/admin/vehicles/import', data=CSV_FEED, content_type='text/csv').status_code == 401
+
+def test_export_streams_csv_and_ndjson(client, admin_headers, make_vehicle):
+    make_vehicle(external_id='X1', imagens='["/api/uploads/a.jpg", "/api/uploads/b.jpg"]')
+    make_vehicle(modelo='Palio')
+
+    response = client.get('/api/admin/vehicles/export', headers=admin_headers)
+    assert response.is_streamed and response.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [row['modelo'] for row in rows] == ['Uno', 'Palio']
+    assert rows[0]['external_id'] == 'X1' and rows[0]['imagens'] == '/api/uploads/a.jpg|/api/uploads/b.jpg'
+
+    response = client.get('/api/admin/vehicles/export?format=ndjson', headers=admin_headers)
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['modelo'] for line in lines] == ['Uno', 'Palio']
+
+def test_exported_csv_imports_back_as_updates(client, admin_headers, make_vehicle):
+    make_vehicle(external_id='X1')
+    exported = client.get('/api/admin/vehicles/export', headers=admin_headers).get_data(as_text=True)
+    report = import_feed(client, admin_headers, exported, 'text/csv').get_json()
+    assert (report['created'], report['updated'], report['failed']) == (0, 1, 0)
+
+def test_import_over_size_limit_returns_413(app, client, admin_headers):
+    app.config['IMPORT_MAX_CONTENT_LENGTH'] = 100
+    feed = CSV_FEED * 5
+    response = import_feed(client, admin_headers, feed, 'text/csv')
+    assert response.status_code == 413
+    assert response.get_json() == {'error': 'Arquivo muito grande'}
+
+    response = client.post('/api/admin/vehicles/import', headers=admin_headers,
+                           data={'file': (io.BytesIO(feed.encode()), 'estoque.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 413
@@ -0,0 +1,51 @@
+import json
+from datetime import datetime
+from src.models.db import db
+from src.models.vehicle import Vehicle
+from src.utils.json_provider import OrJSONProvider
+from src.utils.serialization import get_fragment_cache
+
+def test_app_uses_orjson_provider(app):
+    assert isinstance(app.json, OrJSONProvider)
+
+def test_output_matches_default_provider_rules(app):
+    with app.app_context():
+        data = {'b': 1, 'a': 'São Paulo', 'data': datetime(2024, 1, 2, 3, 4, 5)}
+        text = app.json.dumps(data)
+        assert text == '{"a":"São Paulo","b":1,"data":"Tue, 02 Jan 2024 03:04:05 GMT"}'
+        assert app.json.loads(text)['a'] == 'São Paulo'
+        # Argumentos do json padrão continuam funcionando
+        assert app.json.dumps({'b': 1, 'a': 2}, indent=2) == json.dumps({'a': 2, 'b': 1}, indent=2)
+
+def test_listing_assembled_from_fragments_matches_to_dict(app, client, make_vehicle):
+    ids = [make_vehicle(modelo=f'Uno {index}') for index in range(3)]
+    body = client.get('/api/vehicles?per_page=10').get_json()
+    with app.app_context():
+        expected = [db.session.get(Vehicle, vehicle_id).to_dict() for vehicle_id in reversed(ids)]
+    assert sorted(body['vehicles'], key=lambda v: v['id']) == sorted(expected, key=lambda v: v['id'])
+    assert body['pagination']['total'] == 3
+
+def test_fragment_reused_until_vehicle_changes(app, client, admin_headers, make_vehicle, monkeypatch):
+    vehicle_id = make_vehicle()
+    client.get(f'/api/vehicles/{vehicle_id}')
+
+    built = []
+    to_dict = Vehicle.to_dict
+    monkeypatch.setattr(Vehicle, 'to_dict', lambda self, *args: built.append(self.id) or to_dict(self, *args))
+    client.get(f'/api/vehicles/{vehicle_id}?nocache=1')
+    assert built == []
+
+    client.put(f'/api/admin/vehicles/{vehicle_id}', headers=admin_headers,
+               json={'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2020, 'preco': 31000.0})
+    built.clear()
+    assert client.get(f'/api/vehicles/{vehicle_id}').get_json()['vehicle']['preco'] == 31000.0
+    assert built == [vehicle_id]
+
+def test_fragment_cache_is_bounded(app):
+    app.config['VEHICLE_FRAGMENT_CACHE_SIZE'] = 2
+    app.extensions.pop('vehicle_fragments', None)
+    with app.app_context():
+        cache = get_fragment_cache()
+        for key in range(3):
+            cache.set(key, b'{}')
+        assert cache.get(0) is None and cache.get(2) == b'{}'
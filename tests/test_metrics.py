@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from src.main import create_app
+
+def metric_value(text, prefix):
+    values = [float(line.rsplit(' ', 1)[1]) for line in text.splitlines() if line.startswith(prefix)]
+    return sum(values)
+
+def test_requests_counted_and_exposed(client, admin_headers, make_vehicle):
+    make_vehicle()
+    for _ in range(3):
+        client.get('/api/vehicles')
+    response = client.get('/metrics', headers=admin_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert metric_value(text, 'http_requests_total{blueprint="vehicles",endpoint="vehicles.get_vehicles",method="GET",status="200"}') == 3
+    assert metric_value(text, 'http_request_db_queries_count{blueprint="vehicles",endpoint="vehicles.get_vehicles"}') == 3
+
+def test_server_timing_header(client):
+    header = client.get('/api/vehicles').headers['Server-Timing']
+    assert header.startswith('app;dur=') and 'db;dur=' in header
+
+def test_values_of_finished_processes_are_kept(client, admin_headers, app_config):
+    # Um processo que gravou seu arquivo e terminou
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    data = {'counters': [['http_requests_total', ['auth', 'auth.login', 'POST', '200'], 7]], 'histograms': []}
+    os.makedirs(app_config['METRICS_DIR'], exist_ok=True)
+    with open(os.path.join(app_config['METRICS_DIR'], f'{process.pid}-abc.json'), 'w') as file:
+        json.dump(data, file)
+
+    label = 'http_requests_total{blueprint="auth",endpoint="auth.login",method="POST",status="200"}'
+    for _ in range(2):
+        text = client.get('/metrics', headers=admin_headers).get_data(as_text=True)
+        assert metric_value(text, label) == 7
+
+def test_metrics_require_admin(client):
+    assert client.get('/metrics').status_code == 401
+
+class TestMetricsToken:
+    @pytest.fixture
+    def app_config(self, app_config):
+        return {**app_config, 'METRICS_TOKEN': 'segredo'}
+
+    @pytest.mark.parametrize('authorization, status', [
+        ('Bearer segredo', 200),
+        ('Bearer errado', 401),
+        ('Bearer señor-ção', 401),
+    ])
+    def test_bearer_token(self, client, authorization, status):
+        response = client.get('/metrics', headers={'Authorization': authorization})
+        assert response.status_code == status
+
+def test_empty_token_disables_token_access(tmp_path, monkeypatch, app_config):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv('METRICS_TOKEN', '')
+    app = create_app(app_config)
+    assert app.config['METRICS_TOKEN'] is None
+    assert app.test_client().get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 401
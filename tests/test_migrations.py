@@ -0,0 +1,98 @@
+import sqlite3
+import pytest
+from sqlalchemy import inspect
+from src.models.db import db
+from src.models.migrations import (
+    MIGRATIONS, QUERY_PLAN_CASES, current_version, explain_query_plans, is_full_scan
+)
+from src.models.vehicle import Vehicle, VehicleImage
+
+@pytest.mark.parametrize('detail, expected', [
+    ('SCAN vehicles', True),
+    ('SCAN TABLE vehicles', True),
+    ('SCAN vehicles USING INDEX ix_vehicles_created_at', False),
+    ('SCAN TABLE vehicles USING COVERING INDEX ix_vehicles_active_preco', False),
+    ('SEARCH vehicles USING INDEX ix_vehicles_active_created (is_active=?)', False),
+    ('SCAN vehicle_images', False),
+    ('USE TEMP B-TREE FOR ORDER BY', False),
+])
+def test_is_full_scan_handles_old_and_new_sqlite_output(detail, expected):
+    assert is_full_scan(detail) is expected
+
+def test_common_queries_use_indexes(app):
+    with app.app_context():
+        plans = explain_query_plans()
+    assert set(plans) == set(QUERY_PLAN_CASES)
+    full_scans = {name: details for name, (details, full_scan) in plans.items() if full_scan}
+    assert full_scans == {}
+
+# Schema criado pelo create_all() da versão anterior às migrações
+BASELINE_SCHEMA = (
+    """CREATE TABLE users (
+        id INTEGER NOT NULL PRIMARY KEY,
+        email VARCHAR(120) NOT NULL UNIQUE,
+        password_hash VARCHAR(255) NOT NULL,
+        role VARCHAR(50),
+        is_active BOOLEAN,
+        created_at DATETIME,
+        last_login DATETIME,
+        failed_login_attempts INTEGER,
+        locked_until DATETIME
+    )""",
+    """CREATE TABLE vehicles (
+        id INTEGER NOT NULL PRIMARY KEY,
+        marca VARCHAR(100) NOT NULL,
+        modelo VARCHAR(100) NOT NULL,
+        ano INTEGER NOT NULL,
+        preco FLOAT NOT NULL,
+        descricao TEXT,
+        combustivel VARCHAR(50),
+        cambio VARCHAR(50),
+        cor VARCHAR(50),
+        quilometragem INTEGER,
+        categoria VARCHAR(50),
+        imagens TEXT,
+        is_active BOOLEAN,
+        created_at DATETIME,
+        updated_at DATETIME
+    )""",
+    """CREATE TABLE vehicle_images (
+        id INTEGER NOT NULL PRIMARY KEY,
+        vehicle_id INTEGER NOT NULL REFERENCES vehicles (id),
+        filename VARCHAR(255) NOT NULL,
+        original_filename VARCHAR(255),
+        file_path VARCHAR(500) NOT NULL,
+        file_size INTEGER,
+        mime_type VARCHAR(100),
+        image_order INTEGER,
+        created_at DATETIME
+    )""",
+    """INSERT INTO vehicles (marca, modelo, ano, preco, categoria, imagens, is_active, created_at, updated_at)
+       VALUES ('Fiat', 'Uno', 2015, 25000.0, 'Hatch', '[]', 1, '2024-01-01 10:00:00', '2024-01-01 10:00:00')""",
+)
+
+class TestUpgradeFromBaseline:
+    @pytest.fixture
+    def database(self, tmp_path):
+        path = tmp_path / 'app.db'
+        connection = sqlite3.connect(path)
+        for statement in BASELINE_SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        connection.close()
+        return path
+
+    def test_all_migrations_apply_to_baseline_database(self, app, client):
+        with app.app_context():
+            assert current_version() == MIGRATIONS[-1][0]
+            inspector = inspect(db.engine)
+            assert 'external_id' in {column['name'] for column in inspector.get_columns('vehicles')}
+            indexes = {index['name'] for index in inspector.get_indexes('vehicles')}
+            assert indexes >= {index.name for index in Vehicle.__table__.indexes}
+            image_indexes = {index['name'] for index in inspector.get_indexes('vehicle_images')}
+            assert image_indexes >= {index.name for index in VehicleImage.__table__.indexes}
+            assert not any(full_scan for _, full_scan in explain_query_plans().values())
+
+        # Dados existentes continuam acessíveis (busca e agregados incluídos)
+        assert client.get('/api/vehicles?search=Uno').get_json()['pagination']['total'] == 1
+        assert client.get('/api/vehicles/1').get_json()['vehicle']['ano'] == 2015
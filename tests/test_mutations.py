@@ -0,0 +1,64 @@
+from src.models.db import db
+from src.models.vehicle import Vehicle
+
+def batch(client, headers, operations):
+    return client.post('/api/admin/vehicles/batch', headers=headers, json={'operations': operations})
+
+def add_images(app, vehicle_id, filenames):
+    with app.app_context():
+        vehicle = db.session.get(Vehicle, vehicle_id)
+        images = [vehicle.add_image(filename=name, original_filename=name, file_path=name, file_size=1)
+                  for name in filenames]
+        db.session.commit()
+        return [image.id for image in images]
+
+def test_operations_applied_with_one_update_per_table(app, client, admin_headers, make_vehicle, capture_sql):
+    first, second, third = make_vehicle(), make_vehicle(modelo='Palio'), make_vehicle(modelo='Siena')
+    image_ids = add_images(app, third, ['a.jpg', 'b.jpg', 'c.jpg'])
+    client.delete(f'/api/admin/vehicles/{second}', headers=admin_headers)
+
+    with capture_sql() as statements:
+        response = batch(client, admin_headers, [
+            {'op': 'update', 'id': first, 'fields': {'preco': 28000, 'categoria': 'Hatch'}},
+            {'op': 'activate', 'id': second},
+            {'op': 'reorder_images', 'id': third, 'image_ids': [image_ids[2], image_ids[0]]},
+            {'op': 'delete', 'id': 999},
+            {'op': 'update', 'id': first, 'fields': {'ano': 1800}},
+            {'op': 'explode', 'id': first},
+        ])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert [result['status'] for result in body['results']] == ['ok', 'ok', 'ok', 'error', 'error', 'error']
+    assert 'ano' in body['results'][4]['errors']
+    assert (body['succeeded'], body['failed']) == (3, 3)
+    assert sum(statement.startswith('UPDATE vehicles ') for statement in statements) == 1
+    assert sum(statement.startswith('UPDATE vehicle_images ') for statement in statements) == 1
+
+    vehicle = client.get(f'/api/vehicles/{first}').get_json()['vehicle']
+    assert (vehicle['preco'], vehicle['categoria'], vehicle['modelo']) == (28000.0, 'Hatch', 'Uno')
+    assert client.get(f'/api/vehicles/{second}').status_code == 200
+    assert client.get(f'/api/vehicles/{third}').get_json()['vehicle']['imagens'] == [
+        '/api/uploads/c.jpg', '/api/uploads/a.jpg', '/api/uploads/b.jpg']
+
+def test_dashboard_counters_follow_batch(client, admin_headers, make_vehicle):
+    ids = [make_vehicle(categoria='SUV') for _ in range(3)]
+    batch(client, admin_headers, [{'op': 'delete', 'id': vehicle_id} for vehicle_id in ids[:2]]
+          + [{'op': 'update', 'id': ids[2], 'fields': {'categoria': 'Sedan'}}])
+    stats = client.get('/api/admin/dashboard/stats', headers=admin_headers).get_json()
+    assert (stats['total_vehicles'], stats['total_inactive']) == (1, 2)
+    assert stats['categories'] == [{'name': 'Sedan', 'count': 1}]
+
+def test_reorder_endpoint_uses_batch_path(app, client, admin_headers, make_vehicle):
+    vehicle_id = make_vehicle()
+    image_ids = add_images(app, vehicle_id, ['a.jpg', 'b.jpg'])
+    response = client.put(f'/api/admin/vehicles/{vehicle_id}/images/reorder', headers=admin_headers,
+                          json={'image_ids': list(reversed(image_ids))})
+    assert response.status_code == 200
+    images = client.get(f'/api/admin/vehicles/{vehicle_id}/images', headers=admin_headers).get_json()['images']
+    assert [image['filename'] for image in images] == ['b.jpg', 'a.jpg']
+
+def test_batch_validation(app, client, admin_headers):
+    assert batch(client, admin_headers, []).status_code == 400
+    app.config['BATCH_MUTATION_MAX_OPERATIONS'] = 1
+    assert batch(client, admin_headers, [{'op': 'delete', 'id': 1}] * 2).status_code == 400
+    assert batch(client, admin_headers, [{'op': 'delete', 'id': 'x'}]).status_code == 400
@@ -0,0 +1,78 @@
+import pytest
+from src.models.db import db
+from src.models.cache import bump_cache_version
+from src.utils.pagination import encode_cursor, decode_cursor
+
+def walk(client, url, params, headers=None, limit=200):
+    """Segue next_cursor até o fim; retorna os ids na ordem recebida"""
+    ids, cursor = [], ''
+    for _ in range(limit):
+        response = client.get(url, query_string={**params, 'cursor': cursor}, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        data = response.get_json()
+        ids.extend(int(vehicle['id']) for vehicle in data['vehicles'])
+        cursor = data['pagination']['next_cursor']
+        assert data['pagination']['has_next'] is (cursor is not None)
+        if cursor is None:
+            return ids
+    pytest.fail('next_cursor não chegou ao fim')
+
+def insert_raw(app, rows):
+    """Insere veículos por SQL, com datas sem fração de segundo (como linhas legadas)"""
+    with app.app_context():
+        db.session.execute(db.text(
+            "INSERT INTO vehicles (marca, modelo, ano, preco, quilometragem, is_active, created_at, updated_at) "
+            "VALUES ('Fiat', 'Uno', 2020, :preco, 0, 1, :created_at, :created_at)"
+        ), rows)
+        bump_cache_version()
+        db.session.commit()
+
+def test_walks_every_page_once(client, make_vehicle):
+    created = [make_vehicle(preco=1000 * i) for i in range(23)]
+    ids = walk(client, '/api/vehicles', {'per_page': 5})
+    assert ids == sorted(created, reverse=True)
+
+def test_walks_rows_without_fractional_seconds(app, client, make_vehicle):
+    # Vários veículos no mesmo segundo, gravados sem microssegundos
+    insert_raw(app, [{'preco': 1000 + i, 'created_at': f'2024-01-0{1 + i % 3} 10:00:00'} for i in range(30)])
+    make_vehicle()
+
+    ids = walk(client, '/api/vehicles', {'per_page': 5})
+    assert len(ids) == len(set(ids)) == 31
+
+def test_walks_ascending_by_price_and_date(app, client):
+    insert_raw(app, [{'preco': 1000 * (i % 4), 'created_at': '2024-01-01 10:00:00'} for i in range(17)])
+
+    ids = walk(client, '/api/vehicles', {'per_page': 4, 'sort_by': 'created_at', 'sort_order': 'asc'})
+    assert ids == sorted(ids) and len(ids) == 17
+    ids = walk(client, '/api/vehicles', {'per_page': 4, 'sort_by': 'preco', 'sort_order': 'asc'})
+    assert len(set(ids)) == 17
+
+def test_admin_listing_walks_inactive_vehicles_too(client, admin_headers, make_vehicle):
+    created = [make_vehicle(is_active=i % 2 == 0) for i in range(9)]
+    assert walk(client, '/api/admin/vehicles', {'per_page': 4}, admin_headers) == sorted(created, reverse=True)
+
+def test_total_only_when_requested(client, make_vehicle):
+    make_vehicle()
+    pagination = client.get('/api/vehicles?cursor=').get_json()['pagination']
+    assert 'total' not in pagination
+    pagination = client.get('/api/vehicles?cursor=&include_total=1').get_json()['pagination']
+    assert pagination['total'] == 1
+
+def test_cursor_is_bound_to_its_ordering(client):
+    cursor = encode_cursor('preco', 'asc', 1000, 5)
+    assert decode_cursor(cursor, 'preco', 'asc') == (1000, 5)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'preco', 'desc')
+    assert client.get('/api/vehicles', query_string={'cursor': cursor}).status_code == 400
+    assert client.get('/api/vehicles?cursor=lixo').status_code == 400
+
+@pytest.mark.parametrize('per_page', [0, -1])
+def test_cursor_mode_clamps_non_positive_per_page(client, admin_headers, make_vehicle, per_page):
+    ids = [make_vehicle() for _ in range(2)]
+    for url, headers in (('/api/vehicles', None), ('/api/admin/vehicles', admin_headers)):
+        response = client.get(url, headers=headers, query_string={'cursor': '', 'per_page': per_page})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert [int(vehicle['id']) for vehicle in body['vehicles']] == [ids[-1]]
+        assert body['pagination']['has_next'] is True
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import time
+import sys
+import pytest
+from flask import Flask
+from limits import parse
+from limits.strategies import SlidingWindowCounterRateLimiter
+from src.main import load_config
+from src.utils.rate_limit import SQLiteStorage
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+def test_counters_shared_between_storages_on_same_file(storage_uri):
+    worker_a, worker_b = SQLiteStorage(storage_uri), SQLiteStorage(storage_uri)
+    assert worker_a.incr('login', 60) == 1
+    assert worker_b.incr('login', 60, amount=2) == 3
+    assert worker_a.get('login') == 3
+    worker_b.clear('login')
+    assert worker_a.get('login') == 0
+
+def test_counters_expire(storage_uri, monkeypatch):
+    storage = SQLiteStorage(storage_uri)
+    storage.incr('chave', 10)
+    now = time.time()
+    monkeypatch.setattr('time.time', lambda: now + 11)
+    assert storage.get('chave') == 0
+    assert storage.incr('chave', 10) == 1
+
+def test_sliding_window_limit_across_processes(storage_uri):
+    limiter = SlidingWindowCounterRateLimiter(SQLiteStorage(storage_uri))
+    limit = parse('5 per minute')
+    script = (
+        'import sys; from limits import parse; '
+        'from limits.strategies import SlidingWindowCounterRateLimiter; '
+        'from src.utils.rate_limit import SQLiteStorage; '
+        'limiter = SlidingWindowCounterRateLimiter(SQLiteStorage(sys.argv[1])); '
+        "print(sum(limiter.hit(parse('5 per minute'), 'ip') for _ in range(3)))"
+    )
+    output = subprocess.run([sys.executable, '-c', script, storage_uri], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == '3'
+    assert [limiter.hit(limit, 'ip') for _ in range(3)] == [True, True, False]
+
+class TestLimitsOnRoutes:
+    @pytest.fixture
+    def app_config(self, app_config, storage_uri):
+        return {**app_config, 'RATELIMIT_ENABLED': True, 'RATELIMIT_STORAGE_URI': storage_uri}
+
+    def test_login_limit(self, client):
+        statuses = [client.post('/api/auth/login', json={'email': 'x@y.com', 'password': 'errada'}).status_code
+                    for _ in range(6)]
+        assert statuses[:5] == [401] * 5 and statuses[5] == 429
+
+    def test_search_costs_more_of_the_default_limit(self, client):
+        statuses = [client.get('/api/vehicles?search=uno').status_code for _ in range(21)]
+        assert statuses[:20] == [200] * 20 and statuses[20] == 429
+        # Listagem simples custa 1: a cota já consumida vale para ela também
+        assert client.get('/api/vehicles').status_code == 429
+
+def test_relative_storage_path_resolved_from_project_root(monkeypatch):
+    monkeypatch.setenv('RATELIMIT_STORAGE_URI', 'sqlite:///src/database/ratelimit.db')
+    app = Flask(__name__)
+    load_config(app)
+    assert app.config['RATELIMIT_STORAGE_URI'] == f"sqlite:///{os.path.join(PROJECT_ROOT, 'src', 'database', 'ratelimit.db')}"
@@ -0,0 +1,69 @@
+from src.main import create_app
+from src.utils.cache import ResponseCache, CachedResponse
+
+VEHICLE = {'marca': 'Fiat', 'modelo': 'Uno', 'ano': 2020, 'preco': 30000}
+
+def test_second_request_is_served_from_cache(client, make_vehicle):
+    make_vehicle()
+    first = client.get('/api/vehicles?per_page=5')
+    second = client.get('/api/vehicles?per_page=5')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+
+def test_equivalent_query_strings_share_an_entry(client):
+    client.get('/api/vehicles?per_page=5&page=1')
+    assert client.get('/api/vehicles?page=1&per_page=5&marca=').headers['X-Cache'] == 'HIT'
+
+def test_admin_write_invalidates_cache(client, admin_headers, make_vehicle):
+    vehicle_id = make_vehicle()
+    client.get('/api/vehicles')
+    client.get(f'/api/vehicles/{vehicle_id}')
+
+    response = client.put(f'/api/admin/vehicles/{vehicle_id}', json={**VEHICLE, 'modelo': 'Mobi'},
+                          headers=admin_headers)
+    assert response.status_code == 200
+
+    listing = client.get('/api/vehicles')
+    detail = client.get(f'/api/vehicles/{vehicle_id}')
+    assert listing.headers['X-Cache'] == detail.headers['X-Cache'] == 'MISS'
+    assert detail.get_json()['vehicle']['modelo'] == 'Mobi'
+
+def test_write_in_another_worker_invalidates_cache(app, app_config, client, admin_headers):
+    # Outra aplicação no mesmo banco faz o papel de outro worker do Passenger
+    other = create_app(app_config).test_client()
+    assert client.get('/api/vehicles').get_json()['vehicles'] == []
+
+    assert other.post('/api/admin/vehicles', json=VEHICLE, headers=admin_headers).status_code == 201
+
+    response = client.get('/api/vehicles')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert len(response.get_json()['vehicles']) == 1
+
+def test_errors_are_not_cached(client):
+    client.get('/api/vehicles/999')
+    assert 'X-Cache' not in client.get('/api/vehicles/999').headers
+
+def test_cache_can_be_disabled(app, client):
+    app.config['RESPONSE_CACHE_ENABLED'] = False
+    client.get('/api/vehicles')
+    assert 'X-Cache' not in client.get('/api/vehicles').headers
+
+def test_cache_evicts_least_recently_used_by_size():
+    cache = ResponseCache(max_bytes=25, max_entry_bytes=20)
+    cache.set('a', 1, CachedResponse(b'x' * 10, 200, []))
+    cache.set('b', 1, CachedResponse(b'x' * 10, 200, []))
+    cache.get('a', 1)
+    cache.set('c', 1, CachedResponse(b'x' * 10, 200, []))
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None and cache.get('c', 1) is not None
+    assert cache.size == 20
+
+    cache.set('big', 1, CachedResponse(b'x' * 21, 200, []))
+    assert cache.get('big', 1) is None
+
+def test_new_version_empties_cache():
+    cache = ResponseCache()
+    cache.set('a', 1, CachedResponse(b'{}', 200, []))
+    assert cache.get('a', 2) is None
+    assert cache.size == 0
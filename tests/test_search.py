@@ -0,0 +1,56 @@
+from src.models.db import db
+from src.models.vehicle import Vehicle
+from src.models.cache import bump_cache_version
+from src.models.search import build_match_query, search_enabled
+
+def search_ids(client, term, **params):
+    response = client.get('/api/vehicles', query_string={'search': term, **params})
+    assert response.status_code == 200
+    return [int(vehicle['id']) for vehicle in response.get_json()['vehicles']]
+
+def test_fts_index_is_created_by_migrations(app):
+    with app.app_context():
+        assert search_enabled()
+
+def test_build_match_query_quotes_each_token_as_prefix():
+    assert build_match_query('gol 1.0') == '"gol"* "1"* "0"*'
+    assert build_match_query('"; DROP') == '"DROP"*'
+    assert build_match_query('  ... ') is None
+
+def test_search_ignores_accents_and_matches_prefixes(client, make_vehicle):
+    automatic = make_vehicle(marca='Toyota', modelo='Corolla', descricao='Câmbio automático')
+    make_vehicle(marca='Fiat', modelo='Uno', descricao='Manual')
+
+    assert search_ids(client, 'automatico') == [automatic]
+    assert search_ids(client, 'coro') == [automatic]
+
+def test_search_ranks_brand_and_model_above_description(client, make_vehicle):
+    in_description = make_vehicle(marca='Fiat', modelo='Toro', descricao='Melhor que um Civic')
+    in_model = make_vehicle(marca='Honda', modelo='Civic', descricao='Sedan')
+
+    assert search_ids(client, 'civic') == [in_model, in_description]
+
+def test_index_follows_updates_and_soft_delete(app, client, make_vehicle):
+    vehicle_id = make_vehicle(marca='Ford', modelo='Ka')
+    assert search_ids(client, 'ka') == [vehicle_id]
+
+    with app.app_context():
+        vehicle = db.session.get(Vehicle, vehicle_id)
+        vehicle.modelo = 'EcoSport'
+        bump_cache_version()
+        db.session.commit()
+    assert search_ids(client, 'ka') == []
+    assert search_ids(client, 'ecosport') == [vehicle_id]
+
+    with app.app_context():
+        db.session.get(Vehicle, vehicle_id).is_active = False
+        bump_cache_version()
+        db.session.commit()
+    assert search_ids(client, 'ecosport') == []
+
+def test_search_without_searchable_words_matches_nothing(client, make_vehicle):
+    for modelo in ('Uno', 'Palio', 'Siena'):
+        make_vehicle(modelo=modelo)
+    assert search_ids(client, '!!!') == []
+    assert search_ids(client, '!!!', cursor='') == []
+    assert len(search_ids(client, '')) == 3
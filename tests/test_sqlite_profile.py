@@ -0,0 +1,53 @@
+import sqlite3
+import pytest
+from src.main import create_app
+from src.models.db import db
+from src.models.sqlite_profile import CheckpointTimer
+
+def pragmas(app, *names):
+    with app.app_context(), db.engine.connect() as connection:
+        return [connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names]
+
+def test_production_profile_pragmas(app):
+    journal_mode, synchronous, busy_timeout, cache_size = pragmas(
+        app, 'journal_mode', 'synchronous', 'busy_timeout', 'cache_size')
+    assert journal_mode == 'wal'
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout == 5000
+    assert cache_size == -16 * 1024
+
+class TestDefaultProfile:
+    @pytest.fixture
+    def app_config(self, app_config):
+        return {**app_config, 'SQLITE_PROFILE': 'default', 'SQLITE_BUSY_TIMEOUT': 1234}
+
+    def test_only_busy_timeout(self, app):
+        assert pragmas(app, 'journal_mode', 'busy_timeout') == ['delete', 1234]
+
+def test_invalid_profile_is_rejected(app_config):
+    with pytest.raises(RuntimeError):
+        create_app({**app_config, 'SQLITE_PROFILE': 'turbo'})
+
+def test_readers_not_blocked_by_open_write_transaction(client, make_vehicle, database):
+    make_vehicle()
+    writer = sqlite3.connect(database, timeout=0)
+    try:
+        writer.execute('BEGIN IMMEDIATE')
+        writer.execute("UPDATE vehicles SET modelo = 'Mobi'")
+        response = client.get('/api/vehicles?nocache=1')
+        assert response.status_code == 200
+        assert response.get_json()['vehicles'][0]['modelo'] == 'Uno'
+    finally:
+        writer.rollback()
+        writer.close()
+
+def test_checkpoint_timer():
+    timer = CheckpointTimer(3600)
+    assert not timer.due()
+    assert CheckpointTimer(0).due()
+
+def test_checkpoint_command(app, make_vehicle):
+    make_vehicle()
+    result = app.test_cli_runner().invoke(args=['db-checkpoint'])
+    assert result.exit_code == 0
+    assert 'Checkpoint:' in result.output
@@ -0,0 +1,53 @@
+import gzip
+import os
+import pytest
+from src.utils.compression import ENCODINGS
+
+INDEX_HTML = '<!doctype html><html><body>' + '<div>vitrine</div>' * 200 + '</body></html>'
+
+@pytest.fixture
+def static_folder(app, tmp_path, monkeypatch):
+    folder = tmp_path / 'static'
+    (folder / 'assets').mkdir(parents=True)
+    (folder / 'index.html').write_text(INDEX_HTML)
+    (folder / 'assets' / 'index-3fac10be.js').write_text('console.log("ok");' * 100)
+    (folder / 'favicon.ico').write_bytes(b'\x00\x00\x01\x00' * 10)
+    monkeypatch.setattr(app, 'static_folder', str(folder))
+    app.extensions.pop('static_manifest', None)
+    return folder
+
+def test_index_served_from_memory_with_etag(client, static_folder, monkeypatch):
+    first = client.get('/')
+    # Depois de montado, o manifesto não consulta o disco
+    monkeypatch.setattr(os.path, 'exists', None)
+    monkeypatch.setattr(os.path, 'isfile', None)
+    response = client.get('/carros/123')
+    assert response.data == first.data == INDEX_HTML.encode()
+    assert response.cache_control.no_cache
+    assert client.get('/', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+
+def test_hashed_assets_are_immutable(client, static_folder):
+    response = client.get('/assets/index-3fac10be.js')
+    assert response.mimetype in ('text/javascript', 'application/javascript')
+    assert response.cache_control.immutable and response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert not client.get('/favicon.ico').cache_control.immutable
+
+def test_precompressed_variants_negotiated(client, static_folder):
+    response = client.get('/assets/index-3fac10be.js', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.data) == (static_folder / 'assets' / 'index-3fac10be.js').read_bytes()
+    plain = client.get('/assets/index-3fac10be.js', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['ETag'] != response.headers['ETag']
+
+@pytest.mark.skipif('br' not in ENCODINGS, reason='brotli não instalado')
+def test_brotli_preferred_when_accepted(client, static_folder):
+    import brotli
+    response = client.get('/', headers={'Accept-Encoding': 'gzip, br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == INDEX_HTML.encode()
+
+def test_missing_index(client, static_folder):
+    (static_folder / 'index.html').unlink()
+    assert client.get('/qualquer').status_code == 404
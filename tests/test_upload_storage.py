@@ -0,0 +1,79 @@
+import io
+import threading
+from src.models.db import db
+from src.models.vehicle import Vehicle
+from src.routes import uploads
+from src.utils.images import references_lock
+
+def upload(client, headers, vehicle_id, data):
+    return client.post(f'/api/admin/vehicles/{vehicle_id}/upload', headers=headers,
+                       data={'image': (io.BytesIO(data), 'foto.jpg')}, content_type='multipart/form-data')
+
+def test_same_content_shares_files_until_last_reference(client, admin_headers, make_vehicle, make_jpeg,
+                                                        upload_folder, monkeypatch):
+    first, second = make_vehicle(), make_vehicle(modelo='Palio')
+    data = make_jpeg()
+    image = upload(client, admin_headers, first, data).get_json()
+    filename = image['url'].rsplit('/', 1)[1]
+
+    # Segundo envio do mesmo conteúdo não reprocessa
+    monkeypatch.setattr(uploads, 'process_image', None)
+    again = upload(client, admin_headers, second, data).get_json()
+    assert again['url'] == image['url']
+
+    client.delete(f"/api/admin/images/{image['image']['id']}", headers=admin_headers)
+    assert (upload_folder / filename).exists()
+    client.delete(f"/api/admin/images/{again['image']['id']}", headers=admin_headers)
+    assert not (upload_folder / filename).exists()
+    assert not (upload_folder / f'thumb_{filename}').exists()
+
+def test_upload_recreates_files_removed_after_find_processed(client, admin_headers, make_vehicle, make_jpeg,
+                                                             upload_folder, monkeypatch):
+    vehicle_id = make_vehicle()
+    data = make_jpeg()
+    filename = upload(client, admin_headers, vehicle_id, data).get_json()['url'].rsplit('/', 1)[1]
+
+    # Outro worker apaga a última referência logo depois da verificação
+    find_processed = uploads.find_processed
+    def find_then_lose_files(content_hash):
+        found = find_processed(content_hash)
+        for path in upload_folder.glob(f'*{content_hash}*'):
+            path.unlink()
+        return found
+    monkeypatch.setattr(uploads, 'find_processed', find_then_lose_files)
+
+    response = upload(client, admin_headers, make_vehicle(modelo='Palio'), data)
+    assert response.status_code == 201
+    assert (upload_folder / filename).exists()
+    assert (upload_folder / f'thumb_{filename}').exists()
+
+def test_removal_waits_for_reference_being_committed(app, client, admin_headers, make_vehicle, make_jpeg,
+                                                     upload_folder):
+    data = make_jpeg()
+    filename = upload(client, admin_headers, make_vehicle(), data).get_json()['url'].rsplit('/', 1)[1]
+    other_id = make_vehicle(modelo='Palio')
+    # Arquivos em disco sem nenhuma referência
+    with app.app_context():
+        db.session.execute(db.text('DELETE FROM vehicle_images'))
+        db.session.commit()
+
+    removed = []
+    def remove():
+        with app.app_context():
+            removed.append(uploads.remove_unreferenced_files(filename))
+
+    with app.app_context():
+        with references_lock():
+            thread = threading.Thread(target=remove)
+            thread.start()
+            thread.join(0.3)
+            assert thread.is_alive()  # aguardando a trava
+
+            vehicle = db.session.get(Vehicle, other_id)
+            vehicle.add_image(filename=filename, original_filename='foto.jpg',
+                              file_path=str(upload_folder / filename), file_size=1)
+            db.session.commit()
+    thread.join()
+
+    assert removed == [False]
+    assert (upload_folder / filename).exists()